@@ -0,0 +1,142 @@
+"""Paquete compacto con los ABI de los contratos, generado a partir del build de truffle.
+
+Los artefactos de truffle incluyen bytecode, source maps, AST y el código fuente, pero
+el servidor solo necesita el ABI y la dirección desplegada en cada red. Este módulo
+los extrae, junto con los topics de los eventos ya calculados, a un único archivo
+pickle que se carga mucho más rápido:
+
+    python abibundle.py --build_dir ../contract/build/contracts
+
+`ContractRegistry` lo usa en lugar de los artefactos si existe y es más nuevo que ellos.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import tempfile
+
+from eth_utils import collapse_if_tuple, event_abi_to_log_topic
+
+CONTRACTS = ("CFPFactory", "CFP", "Multicall")
+BUNDLE_FORMAT = 1
+
+
+def signature(abi):
+    """
+    Get the canonical signature of a function or event, e.g. `register()`.
+
+    Args:
+        abi (dict): The ABI entry.
+
+    Returns:
+        str: The name followed by the types of its inputs.
+    """
+    types = ",".join(collapse_if_tuple(item) for item in abi.get("inputs", []))
+    return f"{abi['name']}({types})"
+
+
+def compact(artifact):
+    """
+    Keep only what the server needs from a truffle artifact.
+
+    Args:
+        artifact (dict): The parsed truffle build artifact.
+
+    Returns:
+        dict: The `abi`, the `networks` (network id to deployed address) and the
+        hex `topics` of its events, by signature.
+    """
+    abi = artifact["abi"]
+    return {
+        "abi": abi,
+        "networks": {
+            network_id: network["address"]
+            for network_id, network in artifact.get("networks", {}).items()
+            if "address" in network
+        },
+        "topics": {
+            signature(item): "0x" + event_abi_to_log_topic(item).hex()
+            for item in abi
+            if item.get("type") == "event" and not item.get("anonymous")
+        },
+    }
+
+
+def build_bundle(build_dir, names=CONTRACTS):
+    """
+    Build the bundle of the contracts found in a truffle build directory.
+
+    Args:
+        build_dir (str): Directory with the truffle build artifacts.
+        names (tuple): Contracts to include; the missing ones are skipped.
+
+    Returns:
+        dict: The bundle, with the compacted contracts under `contracts`.
+    """
+    contracts = {}
+    for name in names:
+        path = os.path.join(build_dir, f"{name}.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as artifact:
+            contracts[name] = compact(json.load(artifact))
+    return {"format": BUNDLE_FORMAT, "contracts": contracts}
+
+
+def write_bundle(bundle, path):
+    """
+    Write a bundle atomically, so a running server never reads half a file.
+
+    Args:
+        bundle (dict): The bundle returned by `build_bundle`.
+        path (str): Destination file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as output:
+        pickle.dump(bundle, output, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(output.name, path)
+
+
+def load_bundle(path):
+    """
+    Read a bundle written by `write_bundle`.
+
+    Args:
+        path (str): The bundle file.
+
+    Returns:
+        dict: The compacted contracts, by name.
+
+    Raises:
+        ValueError: If the file was written by an incompatible version.
+    """
+    with open(path, "rb") as bundle_file:
+        bundle = pickle.load(bundle_file)
+    if bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Formato de paquete de ABI desconocido: {path}")
+    return bundle["contracts"]
+
+
+def default_bundle_file(build_dir):
+    """Get the bundle path that goes with a truffle build directory."""
+    return os.path.join(os.path.dirname(os.path.normpath(build_dir)), "abi-bundle.pickle")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--build_dir",
+        default="../contract/build/contracts",
+        help="Directorio con los artefactos de truffle",
+    )
+    parser.add_argument(
+        "--output",
+        help="Archivo del paquete (por defecto build/abi-bundle.pickle)",
+    )
+    args = parser.parse_args()
+
+    output_file = args.output or default_bundle_file(args.build_dir)
+    result = build_bundle(args.build_dir)
+    write_bundle(result, output_file)
+    print(f"{', '.join(result['contracts'])} -> {output_file}")
@@ -1,109 +1,447 @@
 """Server that provides an API for interacting with the CFPFactory contract."""
 
-import argparse
+import functools
 import json
-from datetime import datetime
-import re
-from web3 import Web3, HTTPProvider
+import logging
+import os
+import sys
+import threading
+import time
 from eth_account import Account
-from eth_account.messages import encode_defunct
+import chain
+import config
 import messages
-from flask import Flask, request, jsonify
+from batching import BatchResult, RPCBatch, encode_call
+from blockcache import BlockCache
+from chainhead import ChainHead
+from contracts import ContractRegistry, logged_proposals, proposals_fitting
+from eventhub import EventHub, TooManySubscribers
+from indexer import CallIndex, ChainIndexer
+from multicall import read_all
+import metrics
+from responsecache import ResponseCache, make_etag
+from scheduler import ClosingSchedule, OpenCall
+from signatures import SignatureVerifier
+from timestamps import TimestampFormatter
+from txmanager import FileNonces, TransactionManager
+from validators import (
+    Field,
+    ValidationError,
+    does_exist,
+    is_valid_mimetype,
+    parse_address,
+    parse_bytes32,
+    parse_fields,
+    parse_listing_query,
+    parse_proposal_batch,
+    parse_signature,
+    parse_timestamp,
+)
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from pytz import timezone
 
 # pylint: disable=W0718, E0601, E1120
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 CORS(app)
-w3 = Web3(HTTPProvider("HTTP://127.0.0.1:7545"))
-CPF_FACTORY_FILE = "../contract/build/contracts/CFPFactory.json"
-CFP_FILE = "../contract/build/contracts/CFP.json"
+EXPORT_CHUNK_SIZE = 200
+# Cada cuanto se envia un comentario a los clientes de /events para detectar los caidos
+EVENTS_HEARTBEAT_SECONDS = 15
+# Segundos que se le sugiere esperar a un cliente de /events rechazado por el tope
+EVENTS_RETRY_AFTER = 5
+DEFAULT_CLOSING_WITHIN = 3600
+# Lo que ya existe en la cadena no cambia: el cliente puede reusarlo sin preguntar
+IMMUTABLE_CACHE_CONTROL = "public, max-age=86400, immutable"
+# Los listados cambian con cada llamado nuevo: se revalidan con If-None-Match
+LISTING_CACHE_CONTROL = "no-cache"
+
+# Configuracion por linea de comandos o variables de entorno (ver config.py)
+settings = config.load(sys.argv[1:] if __name__ == "__main__" else None)
+
+# `http` usa el nodo de settings.node_url; `tester` una cadena en memoria para pruebas
+w3 = chain.connect(
+    settings.chain_backend,
+    settings.node_url,
+    pool_size=settings.node_pool_size,
+    timeout=settings.node_timeout,
+    read_timeout=settings.node_read_timeout,
+    write_pin=settings.node_write_pin,
+    # Los procesos del servidor comparten la hora de la ultima escritura en un archivo
+    write_mark=(
+        None if settings.index_file == ":memory:" else f"{settings.index_file}.write"
+    ),
+)
+w3.middleware_onion.add(metrics.middleware, "metrics")
+
+# La cadena en memoria arranca vacia: una cuenta nueva despliega los contratos al
+# arrancar los servicios y es la duena
+deployer = Account.create() if settings.chain_backend == "tester" else None
+
+# Los contratos, el indice y los servicios que dependen de ellos se crean en
+# start_services: los procesos del pool de firmas (spawn) vuelven a ejecutar este
+# archivo como `__mp_main__` al correr `python apiserver.py`, y no deben desplegar
+# contratos ni abrir el indice
+
+# Las fechas se devuelven en la zona configurada; el texto de cada segundo se recuerda
+timestamps = TimestampFormatter(settings.timezone)
+
+
+def notify_closed(closed_calls):
+    """Send a `CallClosed` event to the clients of /events for each closed call."""
+    event_hub.notify(
+        "CallClosed",
+        [
+            (
+                call.call_id,
+                call.creator,
+                {
+                    "callId": call.call_id,
+                    "creator": call.creator,
+                    "cfp": call.cfp,
+                    "closingTime": timestamps.iso(call.closing_time),
+                },
+            )
+            for call in closed_calls
+        ],
+    )
 
-# Instancio el contrato CFPFactory
-with open(CPF_FACTORY_FILE, encoding="utf-8") as f:
-    cfp_factory = json.load(f)
-    cfp_abi = cfp_factory["abi"]
-    cfp_address = cfp_factory["networks"]["5777"]["address"]
 
-    cfp_factory_contract = w3.eth.contract(address=cfp_address, abi=cfp_abi)
+# Ultimo bloque de la cadena, consultado por un unico hilo en segundo plano
+chain_head = ChainHead(w3)
 
+# Los flags de cada direccion se sirven de memoria hasta que se ve un bloque nuevo
+flag_cache = BlockCache(lambda: chain_head.number)
 
-@app.post("/create")
-def create():
+# Las firmas ya verificadas se recuerdan; las nuevas se recuperan en otros procesos
+verifier = SignatureVerifier(workers=settings.signature_workers)
+
+# Respuestas ya serializadas de los endpoints de lectura, con su ETag
+response_cache = ResponseCache()
+
+# Tiempo a partir del cual se loguea una peticion con el detalle de sus fases
+slow_request_seconds = (
+    None if settings.slow_request_ms is None else settings.slow_request_ms / 1000
+)
+
+metrics.CACHES.watch("flags", flag_cache)
+metrics.CACHES.watch("signatures", verifier)
+metrics.CACHES.watch("responses", response_cache)
+metrics.CACHES.watch("timestamps", timestamps)
+
+
+@app.before_request
+def start_request_metrics():
+    """Start tracking the JSON-RPC calls and phases of the request."""
+    metrics.start_request()
+
+
+@app.before_request
+def reload_artifacts():
+    """Pick up new build artifacts after a `truffle migrate` without restarting."""
+    if registry.reload_if_changed():
+        # Las respuestas cacheadas son de los contratos anteriores
+        response_cache.clear()
+
+
+@app.after_request
+def record_request_metrics(response):
     """
-    Create a new contract.
+    Record the request in the metrics and report its JSON-RPC calls in the
+    `X-RPC-Calls` and `X-RPC-Round-Trips` headers.
+    """
+    endpoint = request.url_rule.rule if request.url_rule else "unknown"
+    stats = metrics.finish_request(endpoint, request.method, response.status_code)
+    if stats is None:
+        return response
+
+    response.headers["X-RPC-Calls"] = str(sum(stats["calls"].values()))
+    response.headers["X-RPC-Round-Trips"] = str(stats["round_trips"])
+    if slow_request_seconds is not None and stats["duration"] >= slow_request_seconds:
+        logger.warning(
+            "Petición lenta: %s %s tardó %.1f ms (%s)",
+            request.method,
+            request.path,
+            stats["duration"] * 1000,
+            metrics.format_phases(stats),
+        )
+    return response
+
+
+# Valores que reciben los endpoints y el error que se responde si no son validos
+ADDRESS = Field(parse_address, messages.INVALID_ADDRESS)
+CALL_ID = Field(parse_bytes32, messages.INVALID_CALLID)
+KNOWN_CALL_ID = Field(
+    parse_bytes32,
+    messages.INVALID_CALLID,
+    missing=messages.CALLID_NOT_FOUND,
+    missing_status=404,
+)
+PROPOSAL = Field(parse_bytes32, messages.INVALID_PROPOSAL)
 
-    This endpoint is used to create a new contract by providing the necessary data in request body.
+
+def require_call(call_id):
+    """
+    Check that a call exists, before the values declared after it are validated.
+
+    Parameters:
+    call_id (HexValue): The ID of the call.
+
+    Raises:
+    ValidationError: With code 404 if the call does not exist.
+    """
+    if not does_exist(lookup_call(call_id)[0]):
+        raise ValidationError(messages.CALLID_NOT_FOUND, 404)
+
+
+# Como antes de declarar los campos, una propuesta invalida de un llamado que no
+# existe se responde con el 404 del llamado
+EXISTING_CALL_ID = Field(
+    parse_bytes32,
+    messages.INVALID_CALLID,
+    missing=messages.CALLID_NOT_FOUND,
+    missing_status=404,
+    check=require_call,
+)
+SIGNATURE = Field(parse_signature, messages.INVALID_SIGNATURE)
+CLOSING_TIME = Field(parse_timestamp, messages.INVALID_TIME_FORMAT)
+TX_HASH = Field(parse_bytes32, messages.INVALID_TX_HASH)
+PROPOSAL_BATCH = Field(parse_proposal_batch, messages.INVALID_PROPOSALS)
+
+
+def validated(body=None, **path):
+    """
+    Validate the request before calling the handler.
+
+    The mimetype is checked first, then the values in the order they are declared
+    (path parameters before body members), and the first invalid one is answered
+    with its error message and code 400 (or the `missing_status` of its field if it
+    is absent, or the status of its `check`).
+
+    Args:
+        body (dict): The `Field` of each member of the JSON body. The request must be
+            `application/json` and the handler gets the typed members in `body`.
+        **path: The `Field` of each path parameter. The handler gets the typed
+            values instead of the strings of the URL.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(**kwargs):
+            try:
+                if body is not None and not is_valid_mimetype(request.mimetype):
+                    raise ValidationError(messages.INVALID_MIMETYPE)
+                kwargs.update(parse_fields(path, kwargs))
+                if body is not None:
+                    data = request.get_json(silent=True)
+                    kwargs["body"] = parse_fields(
+                        body, data if isinstance(data, dict) else {}
+                    )
+            except ValidationError as error:
+                return (
+                    jsonify({"message": error.message}),
+                    error.status,
+                    {"Content-Type": "application/json"},
+                )
+            return handler(**kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def cached(version=None, query=None, block=None):
+    """
+    Serve the response from `response_cache` while the data it was built from does
+    not change, with its `ETag`, and answer a matching `If-None-Match` with 304.
+
+    Only responses with code 200 are stored, and a stored response is sent without
+    calling the handler, so it does not touch the chain. While the version is not
+    known the handler is called, but the client still gets the ETag of the body.
+
+    Responses are keyed by the parsed arguments the handler gets, so requests that
+    only differ in how they spell them (case, order or defaults of the query
+    string) share an entry.
+
+    Args:
+        version (callable): Returns the current version of the data from the
+            arguments of the handler, or None if it is not known and the handler
+            must be called. If not given, the data never changes once its block is
+            final, and the response is then sent with `IMMUTABLE_CACHE_CONTROL`
+            instead of `LISTING_CACHE_CONTROL`.
+        query (callable): Parses the query string, raising `ValidationError` if it
+            is not valid; the handler gets the result in `query`.
+        block (callable): Returns the block the data was recorded in, from the
+            arguments of the handler, or None if it is not known. Until that block
+            is final the response is neither stored nor sent as immutable.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(**kwargs):
+            if query is not None:
+                try:
+                    kwargs["query"] = query()
+                except ValidationError as error:
+                    return (
+                        jsonify({"message": error.message}),
+                        error.status,
+                        {"Content-Type": "application/json"},
+                    )
+            current = 0 if version is None else version(**kwargs)
+            key = (handler.__name__, *sorted(cache_key_items(kwargs)))
+            entry = None if current is None else response_cache.get(key, current)
+            cache_control = (
+                IMMUTABLE_CACHE_CONTROL if version is None else LISTING_CACHE_CONTROL
+            )
+            if entry is None:
+                response = app.make_response(handler(**kwargs))
+                if response.status_code != 200:
+                    return response
+                immutable = version is None and block is not None
+                if immutable and not is_final(block(**kwargs)):
+                    # Un reorg todavia puede cambiarla: se revalida en cada lectura
+                    current = None
+                    cache_control = LISTING_CACHE_CONTROL
+                if current is None:
+                    # Sin version no se guarda, pero el cliente igual se ahorra el cuerpo
+                    response.set_etag(make_etag(response.get_data()))
+                else:
+                    entry = response_cache.put(key, current, response.get_data())
+            if entry is not None:
+                response = Response(entry.body, 200, content_type="application/json")
+                response.set_etag(entry.etag)
+            response.headers["Cache-Control"] = cache_control
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
+
+
+def cache_key_items(kwargs):
+    """
+    Get the arguments of a handler as they identify its response in the cache.
+
+    Parameters:
+    kwargs (dict): The parsed arguments of the handler.
 
     Returns:
-        A JSON response with a success message and code 201 if the contract is created successfully.
-        A JSON response with an error message and code 400 or 403 if there are any validation errors
-        A JSON response with an error message and code 500 if there is an internal server error.
+    Iterator: (name, value) pairs; hex values are compared by their bytes.
     """
+    for name, value in kwargs.items():
+        yield name, getattr(value, "raw", value)
 
-    if not is_valid_mimetype(request.mimetype):
-        return (
-            jsonify({"message": messages.INVALID_MIMETYPE}),
-            400,
-            {"Content-Type": "application/json"},
-        )
 
-    data = request.get_json()
-    call_id = data["callId"]
-    closing_time_data = data["closingTime"]
-    signature = data["signature"]
+def is_final(block_number):
+    """
+    Check if a block is deep enough in the chain not to be undone by a reorg.
+
+    Parameters:
+    block_number (int): The block, or None if it is not known.
 
-    if not (
-        all(c in "0123456789abcdefABCDEF" for c in signature[2:])
-        and len(signature[2:]) == 130
-    ):
-        return (
-            jsonify({"message": messages.INVALID_SIGNATURE}),
-            400,
-            {"Content-Type": "application/json"},
-        )
+    Returns:
+    bool: True if there are at least `--final_depth` blocks on top of it.
+    """
+    head = chain_head.number
+    if block_number is None or head is None:
+        return False
+    return head - block_number >= settings.final_depth
 
-    if not is_valid_call_id(call_id):
-        return (
-            jsonify({"message": messages.INVALID_CALLID}),
-            400,
-            {"Content-Type": "application/json"},
-        )
 
-    try:
-        closing_time_data = datetime.fromisoformat(closing_time_data)
-    except ValueError:
-        return (
-            jsonify({"message": messages.INVALID_TIME_FORMAT}),
-            400,
-            {"Content-Type": "application/json"},
-        )
+def listing_query():
+    """
+    Parse the query string of the `/calls` listing (see `parse_listing_query`).
+
+    Returns:
+    ListingQuery: The expanded fields, the creator (or None), the page and whether
+    the listing is paginated.
+
+    Raises:
+    ValidationError: If any parameter is not valid.
+    """
+    return parse_listing_query(request.args)
 
-    message = f"{cfp_address}{call_id[2:]}"
-    message_hex = Web3.to_hex(text=message)
-    encoded_msg = encode_defunct(hexstr=message_hex)
-    owner_address = w3.eth.account.recover_message(encoded_msg, signature=signature)
 
-    owner_is_authorized = cfp_factory_contract.functions.isAuthorized(
-        w3.to_checksum_address(owner_address.lower())
-    ).call()
+def listing_version(query):
+    """
+    Get the version of the index the `/calls` listing is built from.
 
-    if not owner_is_authorized:
+    Parameters:
+    query (ListingQuery): The parameters of the listing.
+
+    Returns:
+    tuple: The versions of the calls and, if their counts are expanded, of the
+    proposals; None if the index is behind the node and the listing is read from
+    the chain.
+    """
+    if not indexer.is_synced():
+        return None
+    if "proposalCount" in query.expand:
+        return (call_index.calls_version, call_index.proposals_version)
+    return (call_index.calls_version,)
+
+
+def call_block(call_id):
+    """Get the block a call was created in, if it is indexed."""
+    return call_index.get_call_block(call_id)
+
+
+def proposal_block(call_id, proposal):
+    """Get the block a proposal was registered in, if it is indexed."""
+    data = call_index.get_proposal(call_id, proposal)
+    return None if data is None else data[1]
+
+
+@app.post("/create")
+@validated(body={"signature": SIGNATURE, "callId": CALL_ID, "closingTime": CLOSING_TIME})
+def create(body):
+    """
+    Create a new contract.
+
+    This endpoint is used to create a new contract by providing the necessary data in request body.
+
+    Returns:
+        A JSON response with a success message and code 201 if the contract is created successfully.
+        A JSON response with an error message and code 400 or 403 if there are any validation errors
+        A JSON response with an error message and code 500 if there is an internal server error.
+    """
+    call_id = body["callId"]
+    closing_time_data = body["closingTime"]
+    signature = body["signature"]
+
+    message = f"{registry.factory_address}{call_id[2:]}"
+    with metrics.phase("signature"):
+        owner_address = verifier.recover(message, signature)
+
+    # Las consultas son independientes: se envian al nodo en un solo POST
+    batch = RPCBatch(w3)
+    owner_is_authorized = read_flag(
+        "isAuthorized", w3.to_checksum_address(owner_address.lower()), batch
+    )
+    cfp = lookup_call(call_id, batch)
+    head = chain_head.current()
+    if head is None:
+        latest_block = batch.get_block("latest")
+    else:
+        latest_block = BatchResult.resolved(head)
+
+    if not owner_is_authorized.get():
         return (
             jsonify({"message": messages.UNAUTHORIZED}),
             403,
             {"Content-Type": "application/json"},
         )
 
-    cfp = cfp_factory_contract.functions.calls(call_id).call()
+    cfp = cfp.get()
     if does_exist(cfp[0]):
         return (
             jsonify({"message": messages.ALREADY_CREATED}),
             403,
             {"Content-Type": "application/json"},
         )
-    if w3.eth.get_block("latest").timestamp >= closing_time_data.timestamp():
+    if latest_block.get().timestamp >= closing_time_data.timestamp():
         return (
             jsonify({"message": messages.INVALID_CLOSING_TIME}),
             400,
@@ -111,9 +449,12 @@ def create():
         )
 
     try:
-        cfp_factory_contract.functions.createFor(
-            call_id, int(closing_time_data.timestamp()), owner_address
-        ).transact({"from": owner.address})
+        return send_transaction(
+            registry.factory.functions.createFor(
+                call_id.raw, int(closing_time_data.timestamp()), owner_address
+            ),
+            201,
+        )
     except Exception:
         return (
             jsonify({"message": messages.INTERNAL_ERROR}),
@@ -121,11 +462,10 @@ def create():
             {"Content-Type": "application/json"},
         )
 
-    return jsonify({"message": messages.OK}), 201, {"Content-Type": "application/json"}
-
 
 @app.post("/register")
-def register():
+@validated(body={"address": ADDRESS, "signature": SIGNATURE})
+def register(body):
     """
     Endpoint for user registration.
 
@@ -138,39 +478,11 @@ def register():
             A JSON response with an error message and code 403 if the user is already registered.
             A JSON response with an error message and code 500 if there is an internal server error.
     """
+    address = body["address"]
+    signature = body["signature"]
 
-    if not is_valid_mimetype(request.mimetype):
-        return (
-            jsonify({"message": messages.INVALID_MIMETYPE}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    data = request.get_json()
-    address = data["address"]
-    signature = data["signature"]
-
-    if not is_valid_address(address):
-        return (
-            jsonify({"message": messages.INVALID_ADDRESS}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    if not (
-        all(c in "0123456789abcdefABCDEF" for c in signature[2:])
-        and len(signature[2:]) == 130
-    ):
-        return (
-            jsonify({"message": messages.INVALID_SIGNATURE}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    contract_address_hex = Web3.to_hex(text=cfp_address)
-    encoded_msg = encode_defunct(hexstr=contract_address_hex)
-    address_recovered = w3.eth.account.recover_message(encoded_msg, signature=signature)
-    address = w3.to_checksum_address(address.lower())
+    with metrics.phase("signature"):
+        address_recovered = verifier.recover(registry.factory_address, signature)
 
     if address_recovered != address:
         return (
@@ -179,22 +491,18 @@ def register():
             {"Content-Type": "application/json"},
         )
 
-    is_registered = cfp_factory_contract.functions.isRegistered(
-        w3.to_checksum_address(address)
-    ).call()
+    is_registered = read_flag("isRegistered", address).get()
     if is_registered:
         return (
-            jsonify(
-                {
-                    "message": "El usuario ya se encuentra registrado. No se hacen cambios."
-                }
-            ),
+            jsonify({"message": messages.USER_ALREADY_REGISTERED}),
             403,
             {"Content-Type": "application/json"},
         )
 
     try:
-        cfp_factory_contract.functions.register().transact({"from": address})
+        with metrics.phase("transaction"):
+            registry.factory.functions.register().transact({"from": address})
+        flag_cache.invalidate(flag_key("isRegistered", address))
     except Exception:
         return (
             jsonify({"message": messages.INTERNAL_ERROR}),
@@ -206,7 +514,8 @@ def register():
 
 
 @app.post("/register-proposal")
-def register_proposal():
+@validated(body={"callId": EXISTING_CALL_ID, "proposal": PROPOSAL})
+def register_proposal(body):
     """
     Register a proposal for a specific call.
 
@@ -214,74 +523,155 @@ def register_proposal():
         A JSON response with a success message and code 201 if the proposal is registered.
         A JSON response with an error message and code 400, 403, 404, or 500 if there are any errors
     """
-    if not is_valid_mimetype(request.mimetype):
-        return (
-            jsonify({"message": messages.INVALID_MIMETYPE}),
-            400,
-            {"Content-Type": "application/json"},
-        )
+    call_id = body["callId"]
+    proposal = body["proposal"]
 
-    data = request.get_json()
-    call_id = data["callId"]
-    proposal = data.get("proposal")
+    # @validated ya comprobo que el llamado existe
+    cfp = lookup_call(call_id)
+    cfp_contract = registry.cfp(cfp[1])
 
-    if call_id is None:
-        return (
-            jsonify({"message": messages.CALLID_NOT_FOUND}),
-            404,
-            {"Content-Type": "application/json"},
-        )
-    if not is_valid_call_id(call_id):
+    # Obtengo la data del cfp en cuestion
+    proposal_data_data = cfp_contract.functions.proposalData(proposal.raw).call()
+
+    if does_exist(proposal_data_data[0]):
         return (
-            jsonify({"message": messages.INVALID_CALLID}),
-            400,
+            jsonify({"message": messages.ALREADY_REGISTERED}),
+            403,
             {"Content-Type": "application/json"},
         )
 
-    cfp = cfp_factory_contract.functions.calls(call_id).call()
-
-    if not does_exist(cfp[0]):
-        return (
-            jsonify({"message": messages.CALLID_NOT_FOUND}),
-            404,
-            {"Content-Type": "application/json"},
+    # Luego de todas las validaciones, registramos la propuesta
+    try:
+        return send_transaction(
+            cfp_contract.functions.registerProposal(proposal.raw), 201
         )
-    if not is_valid_call_id(proposal):
+    except Exception as e:
         return (
-            jsonify({"message": messages.INVALID_PROPOSAL}),
-            400,
+            jsonify({"message": str(e)}),
+            500,
             {"Content-Type": "application/json"},
         )
 
-    with open(CFP_FILE, encoding="utf-8") as cfp_file:
-        cfp_data = json.load(cfp_file)
-        abi = cfp_data["abi"]
 
-        cfp_contract = w3.eth.contract(address=cfp[1], abi=abi)
+@app.post("/register-proposals")
+@validated(body={"callId": KNOWN_CALL_ID, "proposals": PROPOSAL_BATCH})
+def register_proposals(body):
+    """
+    Register a list of proposals for a specific call.
 
-    # Obtengo la data del cfp en cuestion
-    proposal_data_data = cfp_contract.functions.proposalData(proposal).call()
+    Every proposal is validated and checked against the contract before sending
+    anything, and the new ones are registered through `CFP.registerProposals`, in
+    transactions of as many proposals as fit in a block (see
+    `proposals_per_transaction`).
 
-    if does_exist(proposal_data_data[0]):
+    Returns:
+        A JSON response with the result of each proposal and code 200, or 202 if the
+        client sent `Prefer: respond-async`. The `status` of each result is one of
+        `registered`, `queued`, `alreadyRegistered`, `duplicate`, `invalid` or `failed`.
+        A JSON response with an error message and code 400 or 404 if there are any errors
+    """
+    call_id = body["callId"]
+    proposals = body["proposals"]
+
+    cfp = lookup_call(call_id)
+
+    if not does_exist(cfp[0]):
         return (
-            jsonify({"message": messages.ALREADY_REGISTERED}),
-            403,
+            jsonify({"message": messages.CALLID_NOT_FOUND}),
+            404,
             {"Content-Type": "application/json"},
         )
 
-    # Luego de todas las validaciones, registramos la propuesta
-    try:
-        cfp_contract.functions.registerProposal(proposal).transact(
-            {"from": owner.address}
-        )
-    except Exception as e:
+    cfp_contract = registry.cfp(cfp[1])
+
+    # Validamos todas las propuestas en una sola pasada
+    results = [{"proposal": proposal} for proposal in proposals]
+    seen = set()
+    candidates = []
+    for result in results:
+        try:
+            proposal = result["proposal"] = parse_bytes32(result["proposal"])
+        except ValueError:
+            result["status"] = "invalid"
+            continue
+        if proposal.raw in seen:
+            result["status"] = "duplicate"
+        else:
+            seen.add(proposal.raw)
+            candidates.append(result)
+
+    # Descartamos las ya registradas: primero el indice, y el resto en una lectura agregada
+    unknown = []
+    for result in candidates:
+        indexed = call_index.get_proposal(call_id, result["proposal"])
+        if indexed is None:
+            unknown.append(result)
+        elif does_exist(indexed[0]):
+            result["status"] = "alreadyRegistered"
+    proposals_data = read_all(
+        w3,
+        [
+            cfp_contract.functions.proposalData(result["proposal"].raw)
+            for result in unknown
+        ],
+        registry.multicall,
+    )
+    for result, proposal_data_data in zip(unknown, proposals_data):
+        if proposal_data_data is not None and does_exist(proposal_data_data[0]):
+            result["status"] = "alreadyRegistered"
+
+    pending = [result for result in candidates if "status" not in result]
+    chunk_size = proposals_per_transaction() if pending else 1
+    chunks = [
+        pending[start : start + chunk_size]
+        for start in range(0, len(pending), chunk_size)
+    ]
+
+    # Los lotes se firman y encolan uno detras de otro, sin esperar a que se minen
+    submitted = []
+    for chunk in chunks:
+        try:
+            with metrics.phase("transaction"):
+                tx_hash = tx_manager.submit(
+                    cfp_contract.functions.registerProposals(
+                        [result["proposal"].raw for result in chunk]
+                    )
+                )
+        except Exception as e:
+            for result in chunk:
+                result.update({"status": "failed", "error": str(e)})
+            continue
+        for result in chunk:
+            result.update({"status": "queued", "txHash": tx_hash})
+        submitted.append((tx_hash, chunk))
+
+    if prefers_async():
         return (
-            jsonify({"message": str(e)}),
-            500,
+            jsonify({"message": messages.OK, "results": results}),
+            202,
             {"Content-Type": "application/json"},
         )
 
-    return jsonify({"message": messages.OK}), 201, {"Content-Type": "application/json"}
+    for tx_hash, chunk in submitted:
+        try:
+            with metrics.phase("transaction"):
+                receipt = tx_manager.wait(tx_hash)
+        except Exception as e:
+            for result in chunk:
+                result.update({"status": "failed", "error": str(e)})
+            continue
+        # El contrato saltea sin revertir las que otra transaccion registro mientras
+        # tanto: solo las que tienen su evento en el recibo son de este pedido
+        logged = logged_proposals(cfp_contract, receipt)
+        for result in chunk:
+            registered = result["proposal"].raw in logged
+            result["status"] = "registered" if registered else "alreadyRegistered"
+
+    return (
+        jsonify({"message": messages.OK, "results": results}),
+        200,
+        {"Content-Type": "application/json"},
+    )
 
 
 @app.get("/pending-users")
@@ -293,7 +683,7 @@ def pending():
         A JSON response containing the list of pending calls.
     """
     try:
-        pending_users = cfp_factory_contract.functions.getAllPending().call()
+        pending_users = registry.factory.functions.getAllPending().call()
     except Exception as e:
         return (
             jsonify({"message": str(e)}),
@@ -309,6 +699,7 @@ def pending():
 
 
 @app.get("/authorized/<address>")
+@validated(address=ADDRESS)
 def authorized(address):
     """
     Retrieves the authorization status for a given address.
@@ -319,16 +710,7 @@ def authorized(address):
     Returns:
     - dict: A JSON response containing the authorization status of the address.
     """
-    if not is_valid_address(address):
-        return (
-            jsonify({"message": messages.INVALID_ADDRESS}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    response_body = cfp_factory_contract.functions.isAuthorized(
-        w3.to_checksum_address(address)
-    ).call()
+    response_body = read_flag("isAuthorized", address).get()
     return (
         jsonify({"authorized": response_body}),
         200,
@@ -337,6 +719,7 @@ def authorized(address):
 
 
 @app.post("/authorize/<address>")
+@validated(address=ADDRESS)
 def authorize(address):
     """
     Authorizes the given address.
@@ -347,16 +730,7 @@ def authorize(address):
     Returns:
     - response (json): A JSON response indicating the result of the authorization process.
     """
-    if not is_valid_address(address):
-        return (
-            jsonify({"message": messages.INVALID_ADDRESS}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    is_authorized = cfp_factory_contract.functions.isAuthorized(
-        w3.to_checksum_address(address)
-    ).call()
+    is_authorized = read_flag("isAuthorized", address).get()
     if is_authorized:
         return (
             jsonify({"message": messages.ALREADY_AUTHORIZED}),
@@ -365,9 +739,11 @@ def authorize(address):
         )
 
     try:
-        cfp_factory_contract.functions.authorize(
-            w3.to_checksum_address(address)
-        ).transact({"from": owner.address})
+        return send_transaction(
+            registry.factory.functions.authorize(address),
+            200,
+            invalidate=[flag_key("isAuthorized", address)],
+        )
     except Exception as e:
         return (
             jsonify({"message": str(e)}),
@@ -375,10 +751,9 @@ def authorize(address):
             {"Content-Type": "application/json"},
         )
 
-    return jsonify({"message": messages.OK}), 200, {"Content-Type": "application/json"}
-
 
 @app.post("/unauthorize/<address>")
+@validated(address=ADDRESS)
 def unauthorize(address):
     """
     Unauthorizes the given address.
@@ -389,16 +764,7 @@ def unauthorize(address):
     Returns:
     - response (json): A JSON response indicating the result of the authorization process.
     """
-    if not is_valid_address(address):
-        return (
-            jsonify({"message": messages.INVALID_ADDRESS}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    is_authorized = cfp_factory_contract.functions.isAuthorized(
-        w3.to_checksum_address(address)
-    ).call()
+    is_authorized = read_flag("isAuthorized", address).get()
     if not is_authorized:
         return (
             jsonify(
@@ -411,9 +777,11 @@ def unauthorize(address):
         )
 
     try:
-        cfp_factory_contract.functions.authorize(
-            w3.to_checksum_address(address)
-        ).transact({"from": owner.address})
+        return send_transaction(
+            registry.factory.functions.unauthorize(address),
+            200,
+            invalidate=[flag_key("isAuthorized", address)],
+        )
     except Exception as e:
         return (
             jsonify({"message": str(e)}),
@@ -421,19 +789,39 @@ def unauthorize(address):
             {"Content-Type": "application/json"},
         )
 
-    return jsonify({"message": messages.OK}), 200, {"Content-Type": "application/json"}
-
 
 @app.get("/calls")
-def get_calls():
+@cached(listing_version, query=listing_query)
+def get_calls(query):
     """
     Retrieve the list of calls from the smart contract.
 
+    Query parameters:
+    - expand (str): Optional comma separated list of extra fields to include in each
+      call: `closingTime` (ISO formatted) and/or `proposalCount`. Proposal counts of
+      every call are read in a single aggregated call to the node.
+    - creator (str): Optional address; only the calls created by it are listed.
+    - offset (int): Position of the first call to return (defaults to 0).
+    - limit (int): Maximum number of calls to return (defaults to 100, at most 1000).
+
+    If any of `creator`, `offset` or `limit` is given the listing is paginated: the
+    response also includes `total` and `nextOffset`, the offset of the next page or
+    null on the last one.
+
     Returns:
-        A JSON response containing the list of calls.
+        A JSON response containing the list of calls, with an `ETag`; code 304 and no
+        body if it matches the `If-None-Match` of the request.
+        A JSON response with an error message and code 400 if any parameter is invalid.
     """
+    expand, creator, offset, limit, paginated = query
+
     try:
-        calls = cfp_factory_contract.functions.callsList().call()
+        if paginated:
+            calls, total = fetch_calls_page(creator, offset, limit)
+        elif indexer.is_synced():
+            calls = call_index.calls_list()
+        else:
+            calls = registry.factory.functions.callsList().call()
     except Exception as e:
         return (
             jsonify({"message": str(e)}),
@@ -451,10 +839,112 @@ def get_calls():
                 "timestamp": call[3],
             }
         )
-    return jsonify({"callsList": calls_list}), 200, {"Content-Type": "application/json"}
+
+    if "closingTime" in expand:
+        # El timestamp del llamado es el tiempo de cierre con el que se creo el CFP
+        closing_times = timestamps.iso_many(call[3] for call in calls)
+        for call_data, closing_time_iso in zip(calls_list, closing_times):
+            call_data["closingTime"] = closing_time_iso
+
+    if "proposalCount" in expand:
+        try:
+            counts = read_all(
+                w3,
+                [registry.cfp(call[1]).functions.proposalCount() for call in calls],
+                registry.multicall,
+            )
+        except Exception as e:
+            return (
+                jsonify({"message": str(e)}),
+                500,
+                {"Content-Type": "application/json"},
+            )
+        for call_data, count in zip(calls_list, counts):
+            call_data["proposalCount"] = count
+
+    response_body = {"callsList": calls_list}
+    if paginated:
+        next_offset = offset + len(calls)
+        response_body["total"] = total
+        response_body["nextOffset"] = next_offset if next_offset < total else None
+
+    return jsonify(response_body), 200, {"Content-Type": "application/json"}
+
+
+@app.get("/calls/open")
+def open_calls():
+    """
+    List the calls that are still open, the first to close first.
+
+    Returns:
+        A JSON response with the `callsList`, shaped as in `/calls?expand=closingTime`.
+    """
+    return open_calls_response(None)
+
+
+@app.get("/calls/closing-soon")
+def closing_soon():
+    """
+    List the open calls that close soon, the first to close first.
+
+    Query parameters:
+    - within (int): Length of the window in seconds (defaults to 3600).
+
+    Returns:
+        A JSON response with the `callsList`, shaped as in `/calls?expand=closingTime`.
+        A JSON response with an error message and code 400 if `within` is invalid.
+    """
+    within = request.args.get("within", str(DEFAULT_CLOSING_WITHIN))
+    if not within.isdigit() or int(within) == 0:
+        return (
+            jsonify({"message": messages.INVALID_WITHIN}),
+            400,
+            {"Content-Type": "application/json"},
+        )
+    return open_calls_response(int(within))
+
+
+def open_calls_response(within):
+    """
+    Build the response of `/calls/open` and `/calls/closing-soon`.
+
+    Parameters:
+    within (int): Only list the calls that close in the next `within` seconds, or
+    None for every open call.
+
+    Returns:
+    tuple: The response JSON, status code, and headers.
+    """
+    try:
+        calls = fetch_open_calls(within)
+    except Exception as e:
+        return (
+            jsonify({"message": str(e)}),
+            500,
+            {"Content-Type": "application/json"},
+        )
+
+    closing_times = timestamps.iso_many(call.closing_time for call in calls)
+    calls_list = [
+        {
+            "owner": call.creator,
+            "callCfp": call.cfp,
+            "callId": call.call_id.removeprefix("0x"),
+            "timestamp": call.closing_time,
+            "closingTime": closing_time_iso,
+        }
+        for call, closing_time_iso in zip(calls, closing_times)
+    ]
+    return (
+        jsonify({"callsList": calls_list}),
+        200,
+        {"Content-Type": "application/json"},
+    )
 
 
 @app.get("/calls/<call_id>")
+@validated(call_id=CALL_ID)
+@cached(block=call_block)
 def get_call(call_id):
     """
     Retrieves information about a specific call.
@@ -465,15 +955,8 @@ def get_call(call_id):
     Returns:
     - response (tuple): A tuple containing the response JSON, status code, and headers.
     """
-    if not is_valid_call_id(call_id):
-        return (
-            jsonify({"message": messages.INVALID_CALLID}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
     # Obtengo el CFP
-    cfp = cfp_factory_contract.functions.calls(call_id).call()
+    cfp = lookup_call(call_id)
 
     if not does_exist(cfp[0]):
         return (
@@ -493,6 +976,8 @@ def get_call(call_id):
 
 
 @app.get("/closing-time/<call_id>")
+@validated(call_id=CALL_ID)
+@cached(block=call_block)
 def closing_time(call_id):
     """
     Get the closing time for a given call ID.
@@ -503,14 +988,7 @@ def closing_time(call_id):
     Returns:
     - response (tuple): A tuple containing the JSON response, status code, and headers.
     """
-    if not is_valid_call_id(call_id):
-        return (
-            jsonify({"message": messages.INVALID_CALLID}),
-            400,
-            {"Content-Type": "application/json"},
-        )
-
-    cfp = cfp_factory_contract.functions.calls(call_id).call()
+    cfp = lookup_call(call_id)
 
     if not does_exist(cfp[0]):
         return (
@@ -519,19 +997,12 @@ def closing_time(call_id):
             {"Content-Type": "application/json"},
         )
 
-    # Necesito acceder al contrato CFP para obtener mas informacion
-    with open(CFP_FILE, encoding="utf-8") as cfp_file:
-        cfp_data = json.load(cfp_file)
-        abi = cfp_data["abi"]
-
-        cfp_contract = w3.eth.contract(address=cfp[1], abi=abi)
-
-    closing_time_data = cfp_contract.functions.closingTime().call()
-    closing_time_data = datetime.fromtimestamp(
-        closing_time_data, timezone("America/Argentina/Buenos_Aires")
-    )
-
-    response = jsonify({"closingTime": closing_time_data.isoformat()})
+    closing_time_data = call_index.get_closing_time(call_id)
+    if closing_time_data is None:
+        # Necesito acceder al contrato CFP para obtener mas informacion
+        cfp_contract = registry.cfp(cfp[1])
+        closing_time_data = cfp_contract.functions.closingTime().call()
+    response = jsonify({"closingTime": timestamps.iso(closing_time_data)})
     return response, 200, {"Content-Type": "application/json"}
 
 
@@ -543,7 +1014,11 @@ def contract_address():
     Returns:
             A JSON response containing the contract address.
     """
-    return jsonify({"address": cfp_address}), 200, {"Content-Type": "application/json"}
+    return (
+        jsonify({"address": registry.factory_address}),
+        200,
+        {"Content-Type": "application/json"},
+    )
 
 
 @app.get("/contract-owner")
@@ -562,6 +1037,8 @@ def contract_owner():
 
 
 @app.get("/proposal-data/<call_id>/<proposal>")
+@validated(call_id=EXISTING_CALL_ID, proposal=PROPOSAL)
+@cached(block=proposal_block)
 def proposal_data(call_id, proposal):
     """
     Retrieves data for a given call ID and proposal.
@@ -573,158 +1050,555 @@ def proposal_data(call_id, proposal):
     Returns:
             tuple: A tuple containing the response JSON, status code, and headers.
     """
-    if not is_valid_call_id(call_id):
+    proposal_data_data = call_index.get_proposal(call_id, proposal)
+    if proposal_data_data is None:
+        # Connect to the CFP contract to retrieve the data; @validated already
+        # checked that the call exists
+        cfp_contract = registry.cfp(lookup_call(call_id)[1])
+
+        # Call the internal function of the contract
+        proposal_data_data = cfp_contract.functions.proposalData(proposal.raw).call()
+
+    # If the proposal does not exist, return a 404
+    if not does_exist(proposal_data_data[0]):
         return (
-            jsonify({"message": messages.INVALID_CALLID}),
-            400,
+            jsonify({"message": messages.PROPOSAL_NOT_FOUND}),
+            404,
             {"Content-Type": "application/json"},
         )
 
-    cfp = cfp_factory_contract.functions.calls(call_id).call()
+    response = jsonify(
+        {
+            "timestamp": timestamps.iso(proposal_data_data[2]),
+            "sender": str(proposal_data_data[0]),
+            "blockNumber": proposal_data_data[1],
+        }
+    )
+    return response, 200, {"Content-Type": "application/json"}
 
-    if not does_exist(cfp[0]):
+
+@app.get("/head")
+def head():
+    """
+    Get the latest block seen by the server.
+
+    Returns:
+    - A JSON response with the `number`, `hash` and `timestamp` of the block and
+      code 200.
+    - A JSON response with an error message and code 503 if no block was seen yet.
+    """
+    block = chain_head.current()
+    if block is None:
         return (
-            jsonify({"message": messages.CALLID_NOT_FOUND}),
-            404,
+            jsonify({"message": messages.HEAD_UNAVAILABLE}),
+            503,
             {"Content-Type": "application/json"},
         )
-    if not is_valid_call_id(proposal):
+
+    response = jsonify(
+        {
+            "number": block.number,
+            "hash": block.hash.hex(),
+            "timestamp": timestamps.iso(block.timestamp),
+        }
+    )
+    return response, 200, {"Content-Type": "application/json"}
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Expose the server metrics in the Prometheus text format.
+
+    Returns:
+    - The latency histogram of each endpoint, the JSON-RPC calls and round-trip
+      times per method, and the hits and misses of each cache, with code 200.
+    """
+    return Response(
+        metrics.render(), 200, content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/transactions/<tx_hash>")
+@validated(tx_hash=TX_HASH)
+def transaction_status(tx_hash):
+    """
+    Get the status of a transaction sent by the server.
+
+    Parameters:
+    - tx_hash (str): The hash returned in the `txHash` field of a write endpoint.
+
+    Returns:
+    - A JSON response with the `status` (`queued`, `failed`, `pending`, `mined` or
+      `reverted`) and, once mined, the `blockNumber`, with code 200.
+    - A JSON response with an error message and code 400 if the hash is invalid.
+    - A JSON response with an error message and code 404 if the transaction is unknown.
+    """
+    status = tx_manager.status(tx_hash.lower())
+    if status is None:
         return (
-            jsonify({"message": messages.INVALID_PROPOSAL}),
-            400,
+            jsonify({"message": messages.TX_NOT_FOUND}),
+            404,
             {"Content-Type": "application/json"},
         )
 
-    # Connect to the CFP contract to retrieve the data
-    with open(CFP_FILE, encoding="utf-8") as cfp_file:
-        cfp_data = json.load(cfp_file)
-        abi = cfp_data["abi"]
+    return jsonify(status), 200, {"Content-Type": "application/json"}
 
-        cfp_contract = w3.eth.contract(address=cfp[1], abi=abi)
 
-    # Call the internal function of the contract
-    proposal_data_data = cfp_contract.functions.proposalData(proposal).call()
+@app.get("/events")
+def events():
+    """
+    Stream the calls and proposals as they are indexed, as Server-Sent Events.
 
-    # If the proposal does not exist, return a 404
-    if not does_exist(proposal_data_data[0]):
+    Every `CFPCreated` and `ProposalRegistered` event carries the same fields as
+    `/calls/<call_id>` and `/proposal-data`, plus the `callId` and `blockNumber`.
+    After the events of each block the block number is sent as the event ID, so a
+    client that reconnects resumes after the last block it saw.
+
+    Query parameters:
+    - creator (str): Optional address; only its calls and their proposals are sent.
+    - callId (str): Optional call ID; only that call and its proposals are sent.
+    - since (int): Optional block number; the events after it are sent first. The
+      `Last-Event-ID` header, sent by `EventSource` on reconnection, does the same.
+
+    Each client holds a request thread, so at most `--max_event_clients` are served
+    at once.
+
+    Returns:
+        A `text/event-stream` response with code 200.
+        A JSON response with an error message and code 400 if any parameter is invalid.
+        A JSON response with an error message and code 503 if there are already
+        `--max_event_clients` clients connected.
+    """
+    last_event_id = request.headers.get("Last-Event-ID", request.args.get("since"))
+    try:
+        creator = request.args.get("creator")
+        creator = None if creator is None else ADDRESS.load(creator)
+        call_id = request.args.get("callId")
+        call_id = None if call_id is None else CALL_ID.load(call_id)
+        if last_event_id is not None and not last_event_id.isdigit():
+            raise ValidationError(messages.INVALID_EVENT_ID)
+    except ValidationError as error:
         return (
-            jsonify({"message": messages.PROPOSAL_NOT_FOUND}),
-            404,
+            jsonify({"message": error.message}),
+            error.status,
             {"Content-Type": "application/json"},
         )
 
-    closing_time_data = datetime.fromtimestamp(
-        proposal_data_data[2], timezone("America/Argentina/Buenos_Aires")
+    try:
+        subscription, cursor = event_hub.subscribe(creator, call_id)
+    except TooManySubscribers:
+        return (
+            jsonify({"message": messages.TOO_MANY_EVENT_CLIENTS}),
+            503,
+            {"Content-Type": "application/json", "Retry-After": str(EVENTS_RETRY_AFTER)},
+        )
+
+    def generate():
+        yield b"retry: 2000\n\n"
+        if last_event_id is not None:
+            for block in event_hub.replay(int(last_event_id), cursor):
+                yield subscription.frames(*block)
+        while not subscription.dropped:
+            block = subscription.get(EVENTS_HEARTBEAT_SECONDS)
+            # El comentario tambien sirve para notar que el cliente se desconecto
+            yield b": ping\n\n" if block is None else subscription.frames(*block)
+
+    response = Response(
+        generate(),
+        200,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    response = jsonify(
-        {
-            "timestamp": closing_time_data.isoformat(),
-            "sender": str(proposal_data_data[0]),
-            "blockNumber": proposal_data_data[1],
-        }
+    # Se libera aunque el cliente se vaya antes de leer el primer mensaje, cuando el
+    # generador todavia no empezo y un finally dentro de el no se ejecutaria
+    response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+    return response
+
+
+@app.get("/export/proposals")
+def export_proposals():
+    """
+    Export every proposal of every call as newline delimited JSON.
+
+    The response is streamed: each line is a JSON object with `callId`, `proposal`,
+    `sender`, `blockNumber` and `timestamp` (ISO formatted), and proposals are read
+    `EXPORT_CHUNK_SIZE` at a time, so memory use does not depend on how many
+    proposals there are.
+
+    Returns:
+        A streamed `application/x-ndjson` response with code 200.
+    """
+    proposals = (
+        call_index.iter_proposals(EXPORT_CHUNK_SIZE)
+        if indexer.is_synced()
+        else iter_chain_proposals(EXPORT_CHUNK_SIZE)
+    )
+
+    def generate():
+        for call_id, proposal, sender, block_number, timestamp in proposals:
+            line = {
+                "callId": call_id,
+                "proposal": proposal,
+                "sender": sender,
+                "blockNumber": block_number,
+                "timestamp": timestamps.iso(timestamp),
+            }
+            yield json.dumps(line) + "\n"
+
+    return Response(
+        stream_with_context(generate()), 200, mimetype="application/x-ndjson"
     )
-    return response, 200, {"Content-Type": "application/json"}
 
 
 # ----------------------------------------------------------------
 
 
-def does_exist(element):
+def flag_key(function_name, address):
     """
-    Check if the given element exists.
+    Build the `flag_cache` key of a per-address flag of the factory.
 
     Parameters:
-    element (str): The element to check.
+    function_name (str): `isAuthorized` or `isRegistered`.
+    address (str): The checksummed address.
 
     Returns:
-    bool: True if the element exists, False otherwise.
+    tuple: The key, scoped to the current factory address.
     """
-    return element != "0x0000000000000000000000000000000000000000"
+    return (registry.factory_address, function_name, address)
 
 
-def is_valid_mimetype(mimetype):
+def read_flag(function_name, address, batch=None):
     """
-    Check if the given mimetype is valid.
+    Read a per-address flag of the factory, going through `flag_cache`.
 
-    Args:
-        mimetype (str): The mimetype to check.
+    On a cache miss the `latest` block is queued before the call, so the value is
+    cached with a block number that is never newer than the state it was read at.
+
+    Parameters:
+    function_name (str): `isAuthorized` or `isRegistered`.
+    address (str): The checksummed address.
+    batch (RPCBatch): Optional batch where the read is queued on a cache miss.
 
     Returns:
-        bool: True if the mimetype is "application/json", False otherwise.
+    BatchResult: The pending (or already known) value of the flag.
     """
-    return mimetype == "application/json"
+    key = flag_key(function_name, address)
+    value = flag_cache.get(key)
+    if value is not None:
+        return BatchResult.resolved(value)
+
+    batch = batch or RPCBatch(w3)
+    block = batch.get_block("latest")
+    result = batch.call(getattr(registry.factory.functions, function_name)(address))
+
+    def store(value):
+        chain_head.observe(block.get())
+        flag_cache.put(key, value, block.get().number)
 
+    result.add_done_callback(store)
+    return result
 
-def is_valid_address(address):
+
+def prefers_async():
     """
-    Check if the given address is a valid Ethereum address.
+    Check whether the client asked not to wait for its transactions to be mined.
 
-    Args:
-        address (str): The address to be checked.
+    Returns:
+    bool: True if the request has a `Prefer: respond-async` header.
+    """
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
+def proposals_per_transaction():
+    """
+    Get how many proposals a single `CFP.registerProposals` transaction can take.
+
+    The gas limit of a block is read from the chain head kept by the poller,
+    without a round-trip to the node (see `contracts.proposals_fitting`).
+
+    Returns:
+    int: Between 1 and `contracts.PROPOSALS_PER_TRANSACTION`.
+    """
+    block = chain_head.current()
+    gas_limit = None if block is None else block.get("gasLimit")
+    if gas_limit is None:
+        # Todavia no se vio ningun bloque completo
+        gas_limit = w3.eth.get_block("latest")["gasLimit"]
+    return proposals_fitting(gas_limit)
+
+
+def send_transaction(contract_function, status_code, invalidate=()):
+    """
+    Send a transaction signed by the factory owner and build the response.
+
+    The transaction is signed locally and queued by the transaction manager. If the
+    client sent `Prefer: respond-async`, the response is returned right away with
+    code 202; otherwise it is returned once the transaction is mined.
+
+    Parameters:
+    contract_function (ContractFunction): The bound function to call.
+    status_code (int): Status code of the response once the transaction is mined.
+    invalidate (list): Keys of `flag_cache` changed by the transaction.
 
     Returns:
-        bool: True if the address is valid, False otherwise.
+    tuple: The JSON response, including the `txHash`, status code and headers.
     """
-    return re.match(r"^0x[a-fA-F0-9]{40}$", address)
+    with metrics.phase("transaction"):
+        tx_hash = tx_manager.submit(contract_function)
+    for key in invalidate:
+        flag_cache.invalidate(key)
+    if prefers_async():
+        status_code = 202
+    else:
+        with metrics.phase("transaction"):
+            tx_manager.wait(tx_hash)
+        # Se vuelve a invalidar por si se leyo el valor viejo mientras se minaba
+        for key in invalidate:
+            flag_cache.invalidate(key)
+
+    return (
+        jsonify({"message": messages.OK, "txHash": tx_hash}),
+        status_code,
+        {"Content-Type": "application/json"},
+    )
 
 
-def is_valid_call_id(call_id):
+def fetch_calls_page(creator, offset, limit):
     """
-    Check if a given call ID is valid.
+    Get a page of the calls, optionally only the ones created by `creator`.
 
     Parameters:
-    - call_id (str): The call ID to be validated.
+    creator (str): Checksum address of the creator, or None for every call.
+    offset (int): Position of the first call of the page.
+    limit (int): Maximum number of calls in the page.
 
     Returns:
-    - bool: True if the call ID is valid, False otherwise.
+    tuple: The calls of the page, shaped as in `CFPFactory.calls()`, and the total
+    number of calls that match.
     """
-    # Si no es un string o no empieza con 0x, no es un hash valido
-    if not isinstance(call_id, str) or not call_id.startswith("0x"):
-        return False
+    if indexer.is_synced():
+        return call_index.calls_page(creator, offset, limit)
+
+    # La pagina y el total se piden juntos en un solo POST
+    batch = RPCBatch(w3)
+    functions = registry.factory.functions
+    if creator is None:
+        total = batch.call(functions.callsCount())
+        page = batch.call(functions.callsPage(offset, limit))
+    else:
+        total = batch.call(functions.createdByCount(creator))
+        page = batch.call(functions.createdByPage(creator, offset, limit))
+    return page.get(), total.get()
+
+
+def fetch_open_calls(within=None):
+    """
+    Get the open calls, from the closing schedule if the index is up to date.
+
+    Parameters:
+    within (int): Only get the calls that close in the next `within` seconds, or
+    None for every open call.
 
-    # Si no matchea con el regex (alfanumerico y de 64 caracteres), no es un hash valido
-    return re.match(r"^0x[0-9a-fA-F]{64}$", call_id)
+    Returns:
+    list: The `OpenCall` of each call, the first to close first.
+    """
+    if indexer.is_synced():
+        if within is None:
+            return schedule.open_calls()
+        return schedule.closing_within(within)
+
+    # El calendario puede no tener los ultimos llamados: se recorren los de la cadena
+    now = time.time()
+    until = float("inf") if within is None else now + within
+    return sorted(
+        OpenCall(call[3], "0x" + call[2].hex(), call[0], call[1])
+        for call in registry.factory.functions.callsList().call()
+        if now < call[3] <= until
+    )
 
 
-def is_valid_mnemonic(mnemonic_value):
+def iter_chain_proposals(chunk_size):
     """
-    Checks if a given mnemonic is valid.
+    Iterate over every proposal of every call, reading them from the contracts.
 
-    Args:
-        mnemonic_value (str): The mnemonic to be checked.
+    Calls are listed page by page and the proposals of each call are read in
+    aggregated chunks of `chunk_size`, so there is at most one chunk in flight.
+
+    Parameters:
+    chunk_size (int): Number of proposals read per round-trip to the node.
+
+    Yields:
+    tuple: (call_id, proposal, sender, block_number, timestamp).
+    """
+    offset = 0
+    while True:
+        calls, total = fetch_calls_page(None, offset, chunk_size)
+        counts = read_all(
+            w3,
+            [registry.cfp(call[1]).functions.proposalCount() for call in calls],
+            registry.multicall,
+        )
+        for call, count in zip(calls, counts):
+            call_id = "0x" + bytes(call[2]).hex()
+            cfp_contract = registry.cfp(call[1])
+            for start in range(0, count or 0, chunk_size):
+                indexes = range(start, min(count, start + chunk_size))
+                hashes = read_all(
+                    w3,
+                    [cfp_contract.functions.proposals(i) for i in indexes],
+                    registry.multicall,
+                )
+                hashes = [proposal for proposal in hashes if proposal is not None]
+                data = read_all(
+                    w3,
+                    [cfp_contract.functions.proposalData(h) for h in hashes],
+                    registry.multicall,
+                )
+                for proposal, (sender, block_number, timestamp) in zip(hashes, data):
+                    yield call_id, "0x" + proposal.hex(), sender, block_number, timestamp
+
+        offset += len(calls)
+        if not calls or offset >= total:
+            return
+
+
+def lookup_call(call_id, batch=None):
+    """
+    Get the call with the given ID, from the local index if possible.
+
+    Parameters:
+    call_id (str): The ID of the call.
+    batch (RPCBatch): Optional batch where the chain lookup is queued on a miss.
 
     Returns:
-        bool: True if the mnemonic is valid (contains exactly 12 words), False otherwise.
+    tuple: The call as returned by `CFPFactory.calls()`, or a `BatchResult` for
+    it if a batch was given.
+    """
+    cfp = call_index.get_call(call_id)
+    if batch is not None:
+        if cfp is not None:
+            return BatchResult.resolved(cfp)
+        return batch.call(registry.factory.functions.calls(call_id))
+    if cfp is None:
+        # El indice puede ir detras del nodo, asi que el fallo se consulta a la cadena
+        cfp = registry.factory.functions.calls(call_id).call()
+    return cfp
+
+
+def warm_up():
+    """
+    Load what the first requests need, so they do not pay for it.
+
+    Parses the build artifacts, starts the signature worker processes and encodes
+    one call of each factory view, which builds web3's ABI codecs.
     """
-    return len(mnemonic_value.split()) == 12
+    try:
+        verifier.warm()
+        registry.warm()
+        for function_name in ("isAuthorized", "isRegistered"):
+            encode_call(getattr(registry.factory.functions, function_name)(owner.address))
+    except Exception:
+        # Los errores (p. ej. un artefacto que falta) se repiten y loguean al usarlos
+        logger.exception("No se pudo precargar el servidor")
 
 
-# ----------------------------------------------------------------
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--mnemonic_file", help="Path to the file containing the mnemonic"
+def start_services(account):
+    """
+    Set the factory owner, build the services that use the chain and start them.
+
+    On the in-memory chain the owner first deploys the contracts.
+
+    Parameters:
+    account (LocalAccount): The owner of the factory, which signs its transactions.
+    """
+    # pylint: disable-next=W0601
+    global owner, tx_manager, registry, call_index, indexer, event_hub, schedule
+    owner = account
+    print("Owner address: ", owner.address)
+
+    if settings.chain_backend == "tester":
+        # Sin un build de truffle compilado se usan las versiones en Vyper de testcontracts/
+        build_dir, network_id = chain.deploy_artifacts(
+            w3, chain.source_build_dir(settings.build_dir), owner
+        )
+        bundle_file = None
+        index_file = ":memory:"
+    else:
+        build_dir, network_id = settings.build_dir, settings.network_id
+        bundle_file = settings.bundle_file
+        index_file = settings.index_file
+
+    # Cargo los ABI una sola vez (del paquete compacto si existe); los contratos CFP se
+    # cachean por direccion
+    registry = ContractRegistry(
+        w3,
+        os.path.join(build_dir, "CFPFactory.json"),
+        os.path.join(build_dir, "CFP.json"),
+        os.path.join(build_dir, "Multicall.json"),
+        network_id=network_id,
+        bundle_file=bundle_file,
+    )
+
+    # Indice local de llamados y propuestas, persistido en disco para reanudar al
+    # reiniciar. Si varios procesos comparten el archivo, solo el que tiene el lock lo
+    # escribe
+    call_index = CallIndex(index_file)
+    indexer = ChainIndexer(
+        w3,
+        registry,
+        call_index,
+        lock_path=None if index_file == ":memory:" else f"{index_file}.lock",
     )
-    args = parser.parse_args()
 
+    # Los llamados y propuestas que agrega el indexador se difunden a los clientes de
+    # /events, y los llamados abiertos se ordenan por cierre para avisar cuando cierran
+    event_hub = EventHub(
+        call_index, timestamps.iso, max_subscribers=settings.max_event_clients
+    )
+    schedule = ClosingSchedule(call_index, on_close=notify_closed)
+    indexer.listeners.append(event_hub.poll)
+    indexer.listeners.append(schedule.poll)
+    # Las respuestas cacheadas pueden ser de filas que un reorg descarto, /events
+    # vuelve a publicar los bloques reindexados y el calendario se vuelve a cargar
+    indexer.rollback_listeners.append(response_cache.clear)
+    indexer.rollback_listeners.append(event_hub.rewind)
+    indexer.rollback_listeners.append(schedule.reset)
+
+    metrics.CACHES.watch("contracts", registry)
+    metrics.CACHES.watch("index", call_index)
+
+    # Las transacciones del dueño se firman localmente y se envian en segundo plano;
+    # los nonces van a un archivo compartido por si hay varios procesos del servidor
+    tx_manager = TransactionManager(
+        w3,
+        owner,
+        nonces=None if index_file == ":memory:" else FileNonces(f"{index_file}.nonce"),
+    )
+    chain_head.start()
+    indexer.start()
+    schedule.start()
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+# ----------------------------------------------------------------
+if __name__ == "__main__":
+    host, port = settings.bind.rsplit(":", 1)
     try:
-        # Read the mnemonic from the file
-        with open(args.mnemonic_file, "r", encoding="utf-8") as file:
-            mnemonic = file.read().strip()
-
-        # Verificamos que la semilla sea valida
-        if not is_valid_mnemonic(mnemonic):
-            raise ValueError(
-                "La semilla no es válida"
-            )  # Changed exception type and error message
-        Account.enable_unaudited_hdwallet_features()
-
-        # Generamos la cuenta del propietario
-        owner = Account.from_mnemonic(mnemonic, account_path="m/44'/60'/0'/0/0")
-        print("Owner address: ", owner.address)
-
-        # Levantamos el server
-        app.run(debug=True)
+        if deployer is not None:
+            # En la cadena en memoria el dueño es quien desplegó los contratos
+            start_services(deployer)
+            app.run(
+                host=host, port=int(port), debug=settings.debug, use_reloader=False
+            )
+        else:
+            # Generamos la cuenta del propietario y levantamos el indexador y el server
+            start_services(config.load_owner(settings.mnemonic_file))
+            # El reloader volveria a ejecutar este archivo en otro proceso, con otro
+            # indexador y otro contador de nonces
+            app.run(
+                host=host, port=int(port), debug=settings.debug, use_reloader=False
+            )
 
     except ValueError as error:
         print("Se ha producido un error", error)
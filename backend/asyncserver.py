@@ -0,0 +1,1324 @@
+"""Variante asincrónica del servidor de API, sobre aiohttp y AsyncWeb3.
+
+Atiende las mismas rutas con las mismas respuestas que `apiserver.py`, pero los
+handlers esperan las consultas al nodo sin ocupar un hilo, así que un solo proceso
+atiende cientos de peticiones concurrentes. Las consultas independientes de un mismo
+pedido (p. ej. `isAuthorized`, `calls(call_id)` y el último bloque en `/create`) se
+hacen en paralelo con `asyncio.gather`.
+
+Las transacciones del dueño se firman con el mismo `TransactionManager` que usa
+`apiserver.py`, en un pool de hilos para no bloquear el event loop, y los nonces van
+al mismo archivo que usan sus procesos. El índice local, el calendario de cierres y
+`/events` también son los mismos servicios, así que ambos servidores pueden
+levantarse a la vez sobre el mismo índice.
+
+    python asyncserver.py --node_url HTTP://127.0.0.1:7545 --bind 127.0.0.1:5001
+
+La configuración (nodo, artefactos, semilla del dueño, zona horaria, ...) se toma de
+`config.py`, igual que en el servidor principal.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, web
+from eth_account import Account
+
+import chain
+import config
+import messages
+import metrics
+from chainhead import ChainHead
+from contracts import ContractRegistry, logged_proposals, proposals_fitting
+from eventhub import EventHub, TooManySubscribers
+from indexer import CallIndex, ChainIndexer
+from scheduler import ClosingSchedule, OpenCall
+from signatures import SignatureVerifier
+from timestamps import TimestampFormatter
+from txmanager import FileNonces, TransactionManager
+from validators import (
+    Field,
+    ValidationError,
+    does_exist,
+    is_valid_mimetype,
+    parse_address,
+    parse_bytes32,
+    parse_listing_query,
+    parse_proposal_batch,
+    parse_signature,
+    parse_timestamp,
+)
+
+# pylint: disable=W0718, E0601
+
+routes = web.RouteTableDef()
+EXPORT_CHUNK_SIZE = 200
+# Lecturas que se le piden al nodo a la vez al leer muchas propuestas o llamados
+READ_CHUNK_SIZE = 200
+# Cada cuanto se envia un comentario a los clientes de /events para detectar los caidos
+EVENTS_HEARTBEAT_SECONDS = 15
+# Cada cuanto se revisa si llegaron bloques nuevos para un cliente de /events
+EVENTS_POLL_SECONDS = 0.25
+# Segundos que se le sugiere esperar a un cliente de /events rechazado por el tope
+EVENTS_RETRY_AFTER = 5
+DEFAULT_CLOSING_WITHIN = 3600
+
+# Configuracion por linea de comandos o variables de entorno (ver config.py)
+settings = config.load(sys.argv[1:] if __name__ == "__main__" else None)
+
+# El indice, el calendario y las transacciones son los servicios sincronicos de
+# apiserver.py: usan su propia instancia de Web3, igual que alli
+sync_w3 = chain.connect(
+    settings.chain_backend,
+    settings.node_url,
+    pool_size=settings.node_pool_size,
+    timeout=settings.node_timeout,
+    read_timeout=settings.node_read_timeout,
+    write_pin=settings.node_write_pin,
+    write_mark=(
+        None if settings.index_file == ":memory:" else f"{settings.index_file}.write"
+    ),
+)
+sync_w3.middleware_onion.add(metrics.middleware, "metrics")
+
+# Los handlers consultan al nodo primario de settings.node_url; en la cadena en
+# memoria, la misma que usan los servicios sincronicos
+w3 = chain.connect_async(
+    settings.chain_backend,
+    settings.node_url,
+    sync_w3.provider if settings.chain_backend == "tester" else None,
+)
+
+# La cadena en memoria arranca vacia: una cuenta nueva despliega los contratos al
+# arrancar los servicios y es la duena
+deployer = Account.create() if settings.chain_backend == "tester" else None
+
+# Las fechas se formatean en la zona configurada, recordando el texto de cada segundo
+timestamps = TimestampFormatter(settings.timezone)
+
+# La recuperacion de firmas no bloquea el event loop: corre en otros procesos
+verifier = SignatureVerifier(workers=settings.signature_workers)
+
+# Hilos donde se firman las transacciones y se espera a que se minen
+tx_executor = ThreadPoolExecutor(
+    max_workers=settings.node_pool_size, thread_name_prefix="tx"
+)
+
+# Los contratos y los servicios que dependen de ellos se crean en start_services
+
+
+# Valores que reciben los endpoints y el error que se responde si no son validos
+ADDRESS = Field(parse_address, messages.INVALID_ADDRESS)
+CALL_ID = Field(parse_bytes32, messages.INVALID_CALLID)
+KNOWN_CALL_ID = Field(
+    parse_bytes32,
+    messages.INVALID_CALLID,
+    missing=messages.CALLID_NOT_FOUND,
+    missing_status=404,
+)
+PROPOSAL = Field(parse_bytes32, messages.INVALID_PROPOSAL)
+SIGNATURE = Field(parse_signature, messages.INVALID_SIGNATURE)
+CLOSING_TIME = Field(parse_timestamp, messages.INVALID_TIME_FORMAT)
+TX_HASH = Field(parse_bytes32, messages.INVALID_TX_HASH)
+PROPOSAL_BATCH = Field(parse_proposal_batch, messages.INVALID_PROPOSALS)
+
+
+def json_response(body, status=200):
+    """
+    Build a JSON response with the same shape as the Flask server.
+
+    Args:
+        body (dict): The response body.
+        status (int): The HTTP status code.
+
+    Returns:
+        web.Response: The JSON response.
+    """
+    return web.json_response(body, status=status)
+
+
+async def require_call(call_id):
+    """
+    Check that a call exists, before the values declared after it are validated.
+
+    Parameters:
+    call_id (HexValue): The ID of the call.
+
+    Raises:
+    ValidationError: With code 404 if the call does not exist.
+    """
+    if not does_exist((await lookup_call(call_id))[0]):
+        raise ValidationError(messages.CALLID_NOT_FOUND, 404)
+
+
+async def load_fields(fields, values, checks):
+    """
+    Parse several values like `validators.parse_fields`, awaiting the check of a
+    value (if it has one) before the next one is parsed.
+
+    Args:
+        fields (dict): The `Field` of each name.
+        values (Mapping): The values received, by name.
+        checks (dict): The coroutine function that checks each typed value, by name.
+
+    Returns:
+        dict: The typed value of each field.
+
+    Raises:
+        ValidationError: For the first value that is absent or not valid.
+    """
+    typed = {}
+    for name, field in fields.items():
+        typed[name] = field.load(values.get(name))
+        if name in checks:
+            await checks[name](typed[name])
+    return typed
+
+
+def validated(body=None, checks=None, **path):
+    """
+    Validate the request before calling the handler, like `apiserver.validated`.
+
+    The mimetype is checked first, then the values in the order they are declared
+    (path parameters before body members), and the first invalid one is answered
+    with its error message and code 400 (or the `missing_status` of its field if it
+    is absent, or the status of its check).
+
+    Args:
+        body (dict): The `Field` of each member of the JSON body. The request must be
+            `application/json` and the handler gets the typed members in `body`.
+        checks (dict): Coroutine functions that check a typed value (e.g. that a
+            call exists) by name, raising `ValidationError`.
+        **path: The `Field` of each path parameter. The handler gets the typed
+            values instead of the strings of the URL.
+    """
+    checks = checks or {}
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            try:
+                if body is not None and not is_valid_mimetype(request.content_type):
+                    raise ValidationError(messages.INVALID_MIMETYPE)
+                kwargs = await load_fields(path, request.match_info, checks)
+                if body is not None:
+                    try:
+                        data = await request.json()
+                    except ValueError:
+                        data = None
+                    kwargs["body"] = await load_fields(
+                        body, data if isinstance(data, dict) else {}, checks
+                    )
+            except ValidationError as error:
+                return json_response({"message": error.message}, error.status)
+            return await handler(request, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@routes.post("/create")
+@validated(body={"signature": SIGNATURE, "callId": CALL_ID, "closingTime": CLOSING_TIME})
+async def create(request, body):
+    """
+    Create a new contract.
+
+    This endpoint is used to create a new contract by providing the necessary data in request body.
+
+    Returns:
+        A JSON response with a success message and code 201 if the contract is created successfully.
+        A JSON response with an error message and code 400 or 403 if there are any validation errors
+        A JSON response with an error message and code 500 if there is an internal server error.
+    """
+    call_id = body["callId"]
+    closing_time_data = body["closingTime"]
+    signature = body["signature"]
+
+    message = f"{registry.factory_address}{call_id[2:]}"
+    owner_address = await asyncio.wrap_future(verifier.submit(message, signature))
+
+    # Las tres consultas son independientes, asi que se hacen en paralelo
+    owner_is_authorized, cfp, latest_block = await asyncio.gather(
+        registry.factory.functions.isAuthorized(owner_address).call(),
+        lookup_call(call_id),
+        w3.eth.get_block("latest"),
+    )
+
+    if not owner_is_authorized:
+        return json_response({"message": messages.UNAUTHORIZED}, 403)
+    if does_exist(cfp[0]):
+        return json_response({"message": messages.ALREADY_CREATED}, 403)
+    if latest_block.timestamp >= closing_time_data.timestamp():
+        return json_response({"message": messages.INVALID_CLOSING_TIME}, 400)
+
+    try:
+        return await send_transaction(
+            request,
+            sync_registry.factory.functions.createFor(
+                call_id.raw, int(closing_time_data.timestamp()), owner_address
+            ),
+            201,
+        )
+    except Exception:
+        return json_response({"message": messages.INTERNAL_ERROR}, 500)
+
+
+@routes.post("/register")
+@validated(body={"address": ADDRESS, "signature": SIGNATURE})
+async def register(_request, body):
+    """
+    Endpoint for user registration.
+
+    This endpoint handles the registration of a user by verifying their address and signature.
+    The user's address and signature are received in the request body as JSON data.
+
+    Returns:
+            A JSON response with a success message and code 200 if the registration is successful.
+            A JSON response with an error message and code 400 if the request is invalid.
+            A JSON response with an error message and code 403 if the user is already registered.
+            A JSON response with an error message and code 500 if there is an internal server error.
+    """
+    address = body["address"]
+    signature = body["signature"]
+
+    address_recovered = await asyncio.wrap_future(
+        verifier.submit(registry.factory_address, signature)
+    )
+    if address_recovered != address:
+        return json_response({"message": messages.INVALID_SIGNATURE}, 400)
+
+    is_registered = await registry.factory.functions.isRegistered(address).call()
+    if is_registered:
+        return json_response({"message": messages.USER_ALREADY_REGISTERED}, 403)
+
+    try:
+        # La firma la hace el nodo, que tiene la cuenta del usuario
+        await registry.factory.functions.register().transact({"from": address})
+    except Exception:
+        return json_response({"message": messages.INTERNAL_ERROR}, 500)
+
+    return json_response({"message": messages.OK}, 200)
+
+
+@routes.post("/register-proposal")
+@validated(
+    body={"callId": KNOWN_CALL_ID, "proposal": PROPOSAL},
+    checks={"callId": require_call},
+)
+async def register_proposal(request, body):
+    """
+    Register a proposal for a specific call.
+
+    Returns:
+        A JSON response with a success message and code 201 if the proposal is registered.
+        A JSON response with an error message and code 400, 403, 404, or 500 if there are any errors
+    """
+    call_id = body["callId"]
+    proposal = body["proposal"]
+
+    # @validated ya comprobo que el llamado existe
+    cfp = await lookup_call(call_id)
+    proposal_data_data = (
+        await registry.cfp(cfp[1]).functions.proposalData(proposal.raw).call()
+    )
+    if does_exist(proposal_data_data[0]):
+        return json_response({"message": messages.ALREADY_REGISTERED}, 403)
+
+    try:
+        return await send_transaction(
+            request,
+            sync_registry.cfp(cfp[1]).functions.registerProposal(proposal.raw),
+            201,
+        )
+    except Exception as e:
+        return json_response({"message": str(e)}, 500)
+
+
+@routes.post("/register-proposals")
+@validated(body={"callId": KNOWN_CALL_ID, "proposals": PROPOSAL_BATCH})
+async def register_proposals(request, body):
+    """
+    Register a list of proposals for a specific call.
+
+    Every proposal is validated and checked against the contract before sending
+    anything, and the new ones are registered through `CFP.registerProposals`, in
+    transactions of as many proposals as fit in a block (see
+    `contracts.proposals_fitting`).
+
+    Returns:
+        A JSON response with the result of each proposal and code 200, or 202 if the
+        client sent `Prefer: respond-async`. The `status` of each result is one of
+        `registered`, `queued`, `alreadyRegistered`, `duplicate`, `invalid` or `failed`.
+        A JSON response with an error message and code 400 or 404 if there are any errors
+    """
+    call_id = body["callId"]
+    proposals = body["proposals"]
+
+    cfp = await lookup_call(call_id)
+    if not does_exist(cfp[0]):
+        return json_response({"message": messages.CALLID_NOT_FOUND}, 404)
+
+    cfp_contract = registry.cfp(cfp[1])
+
+    # Validamos todas las propuestas en una sola pasada
+    results = [{"proposal": proposal} for proposal in proposals]
+    seen = set()
+    candidates = []
+    for result in results:
+        try:
+            proposal = result["proposal"] = parse_bytes32(result["proposal"])
+        except ValueError:
+            result["status"] = "invalid"
+            continue
+        if proposal.raw in seen:
+            result["status"] = "duplicate"
+        else:
+            seen.add(proposal.raw)
+            candidates.append(result)
+
+    # Descartamos las ya registradas: primero el indice, y el resto en paralelo
+    unknown = []
+    for result in candidates:
+        indexed = call_index.get_proposal(call_id, result["proposal"])
+        if indexed is None:
+            unknown.append(result)
+        elif does_exist(indexed[0]):
+            result["status"] = "alreadyRegistered"
+    proposals_data = await read_all(
+        [
+            cfp_contract.functions.proposalData(result["proposal"].raw)
+            for result in unknown
+        ]
+    )
+    for result, proposal_data_data in zip(unknown, proposals_data):
+        if proposal_data_data is not None and does_exist(proposal_data_data[0]):
+            result["status"] = "alreadyRegistered"
+
+    pending_results = [result for result in candidates if "status" not in result]
+    chunk_size = await proposals_per_transaction() if pending_results else 1
+    chunks = [
+        pending_results[start : start + chunk_size]
+        for start in range(0, len(pending_results), chunk_size)
+    ]
+
+    # Los lotes se firman y encolan uno detras de otro, sin esperar a que se minen
+    sync_cfp = sync_registry.cfp(cfp[1])
+    submitted = []
+    for chunk in chunks:
+        try:
+            tx_hash = await in_thread(
+                tx_manager.submit,
+                sync_cfp.functions.registerProposals(
+                    [result["proposal"].raw for result in chunk]
+                ),
+            )
+        except Exception as e:
+            for result in chunk:
+                result.update({"status": "failed", "error": str(e)})
+            continue
+        for result in chunk:
+            result.update({"status": "queued", "txHash": tx_hash})
+        submitted.append((tx_hash, chunk))
+
+    if prefers_async(request):
+        return json_response({"message": messages.OK, "results": results}, 202)
+
+    receipts = await asyncio.gather(
+        *(in_thread(tx_manager.wait, tx_hash) for tx_hash, _ in submitted),
+        return_exceptions=True,
+    )
+    for (_, chunk), receipt in zip(submitted, receipts):
+        if isinstance(receipt, Exception):
+            for result in chunk:
+                result.update({"status": "failed", "error": str(receipt)})
+            continue
+        # El contrato saltea sin revertir las que otra transaccion registro mientras
+        # tanto: solo las que tienen su evento en el recibo son de este pedido
+        logged = logged_proposals(sync_cfp, receipt)
+        for result in chunk:
+            registered = result["proposal"].raw in logged
+            result["status"] = "registered" if registered else "alreadyRegistered"
+
+    return json_response({"message": messages.OK, "results": results}, 200)
+
+
+@routes.get("/pending-users")
+async def pending(_request):
+    """
+    Get the list of pending users to approve after they registered.
+
+    Returns:
+        A JSON response containing the list of pending calls.
+    """
+    try:
+        pending_users = await registry.factory.functions.getAllPending().call()
+    except Exception as e:
+        return json_response({"message": str(e)}, 500)
+
+    return json_response({"pendingUsers": pending_users}, 200)
+
+
+@routes.get("/authorized/{address}")
+@validated(address=ADDRESS)
+async def authorized(_request, address):
+    """
+    Retrieves the authorization status for a given address.
+
+    Parameters:
+    - address (str): The address to check authorization for.
+
+    Returns:
+    - dict: A JSON response containing the authorization status of the address.
+    """
+    response_body = await registry.factory.functions.isAuthorized(address).call()
+    return json_response({"authorized": response_body}, 200)
+
+
+@routes.post("/authorize/{address}")
+@validated(address=ADDRESS)
+async def authorize(request, address):
+    """
+    Authorizes the given address.
+
+    Parameters:
+    - address (str): The address to authorize.
+
+    Returns:
+    - response (json): A JSON response indicating the result of the authorization process.
+    """
+    is_authorized = await registry.factory.functions.isAuthorized(address).call()
+    if is_authorized:
+        return json_response({"message": messages.ALREADY_AUTHORIZED}, 403)
+
+    try:
+        return await send_transaction(
+            request, sync_registry.factory.functions.authorize(address), 200
+        )
+    except Exception as e:
+        return json_response({"message": str(e)}, 500)
+
+
+@routes.post("/unauthorize/{address}")
+@validated(address=ADDRESS)
+async def unauthorize(request, address):
+    """
+    Unauthorizes the given address.
+
+    Parameters:
+    - address (str): The address to unauthorize.
+
+    Returns:
+    - response (json): A JSON response indicating the result of the authorization process.
+    """
+    is_authorized = await registry.factory.functions.isAuthorized(address).call()
+    if not is_authorized:
+        return json_response(
+            {"message": "El usuario no se encuentra autorizado. No se hacen cambios."},
+            403,
+        )
+
+    try:
+        return await send_transaction(
+            request, sync_registry.factory.functions.unauthorize(address), 200
+        )
+    except Exception as e:
+        return json_response({"message": str(e)}, 500)
+
+
+@routes.get("/calls")
+async def get_calls(request):
+    """
+    Retrieve the list of calls from the smart contract.
+
+    Query parameters:
+    - expand (str): Optional comma separated list of extra fields to include in each
+      call: `closingTime` (ISO formatted) and/or `proposalCount`. Proposal counts of
+      every call are read concurrently.
+    - creator (str): Optional address; only the calls created by it are listed.
+    - offset (int): Position of the first call to return (defaults to 0).
+    - limit (int): Maximum number of calls to return (defaults to 100, at most 1000).
+
+    If any of `creator`, `offset` or `limit` is given the listing is paginated: the
+    response also includes `total` and `nextOffset`, the offset of the next page or
+    null on the last one.
+
+    Returns:
+        A JSON response containing the list of calls.
+        A JSON response with an error message and code 400 if any parameter is invalid.
+    """
+    try:
+        expand, creator, offset, limit, paginated = parse_listing_query(request.query)
+    except ValidationError as error:
+        return json_response({"message": error.message}, error.status)
+
+    try:
+        if paginated:
+            calls, total = await fetch_calls_page(creator, offset, limit)
+        elif indexer.is_synced():
+            calls = call_index.calls_list()
+        else:
+            calls = await registry.factory.functions.callsList().call()
+    except Exception as e:
+        return json_response({"message": str(e)}, 500)
+
+    calls_list = [
+        {
+            "owner": call[0],
+            "callCfp": call[1],
+            "callId": call[2].hex(),
+            "timestamp": call[3],
+        }
+        for call in calls
+    ]
+
+    if "closingTime" in expand:
+        # El timestamp del llamado es el tiempo de cierre con el que se creo el CFP
+        closing_times = timestamps.iso_many(call[3] for call in calls)
+        for call_data, closing_time_iso in zip(calls_list, closing_times):
+            call_data["closingTime"] = closing_time_iso
+
+    if "proposalCount" in expand:
+        counts = await read_all(
+            [registry.cfp(call[1]).functions.proposalCount() for call in calls]
+        )
+        for call_data, count in zip(calls_list, counts):
+            call_data["proposalCount"] = count
+
+    response_body = {"callsList": calls_list}
+    if paginated:
+        next_offset = offset + len(calls)
+        response_body["total"] = total
+        response_body["nextOffset"] = next_offset if next_offset < total else None
+
+    return json_response(response_body, 200)
+
+
+@routes.get("/calls/open")
+async def open_calls(_request):
+    """
+    List the calls that are still open, the first to close first.
+
+    Returns:
+        A JSON response with the `callsList`, shaped as in `/calls?expand=closingTime`.
+    """
+    return await open_calls_response(None)
+
+
+@routes.get("/calls/closing-soon")
+async def closing_soon(request):
+    """
+    List the open calls that close soon, the first to close first.
+
+    Query parameters:
+    - within (int): Length of the window in seconds (defaults to 3600).
+
+    Returns:
+        A JSON response with the `callsList`, shaped as in `/calls?expand=closingTime`.
+        A JSON response with an error message and code 400 if `within` is invalid.
+    """
+    within = request.query.get("within", str(DEFAULT_CLOSING_WITHIN))
+    if not within.isdigit() or int(within) == 0:
+        return json_response({"message": messages.INVALID_WITHIN}, 400)
+    return await open_calls_response(int(within))
+
+
+async def open_calls_response(within):
+    """
+    Build the response of `/calls/open` and `/calls/closing-soon`.
+
+    Parameters:
+    within (int): Only list the calls that close in the next `within` seconds, or
+    None for every open call.
+
+    Returns:
+    web.Response: The JSON response.
+    """
+    try:
+        calls = await fetch_open_calls(within)
+    except Exception as e:
+        return json_response({"message": str(e)}, 500)
+
+    closing_times = timestamps.iso_many(call.closing_time for call in calls)
+    calls_list = [
+        {
+            "owner": call.creator,
+            "callCfp": call.cfp,
+            "callId": call.call_id.removeprefix("0x"),
+            "timestamp": call.closing_time,
+            "closingTime": closing_time_iso,
+        }
+        for call, closing_time_iso in zip(calls, closing_times)
+    ]
+    return json_response({"callsList": calls_list}, 200)
+
+
+@routes.get("/calls/{call_id}")
+@validated(call_id=CALL_ID)
+async def get_call(_request, call_id):
+    """
+    Retrieves information about a specific call.
+
+    Parameters:
+    - call_id (str): The ID of the call to retrieve information for.
+
+    Returns:
+    - response (web.Response): The JSON response.
+    """
+    cfp = await lookup_call(call_id)
+    if not does_exist(cfp[0]):
+        return json_response({"message": messages.CALLID_NOT_FOUND}, 404)
+
+    return json_response({"creator": cfp[0], "cfp": cfp[1]}, 200)
+
+
+@routes.get("/closing-time/{call_id}")
+@validated(call_id=CALL_ID)
+async def closing_time(_request, call_id):
+    """
+    Get the closing time for a given call ID.
+
+    Parameters:
+    - call_id (str): The ID of the call.
+
+    Returns:
+    - response (web.Response): The JSON response.
+    """
+    cfp = await lookup_call(call_id)
+    if not does_exist(cfp[0]):
+        return json_response({"message": messages.CALLID_NOT_FOUND}, 404)
+
+    closing_time_data = call_index.get_closing_time(call_id)
+    if closing_time_data is None:
+        closing_time_data = await registry.cfp(cfp[1]).functions.closingTime().call()
+    return json_response({"closingTime": timestamps.iso(closing_time_data)}, 200)
+
+
+@routes.get("/contract-address")
+async def contract_address(_request):
+    """Get the contract address."""
+    return json_response({"address": registry.factory_address}, 200)
+
+
+@routes.get("/contract-owner")
+async def contract_owner(_request):
+    """Get the address of the contract owner."""
+    return json_response({"address": owner.address}, 200)
+
+
+@routes.get("/proposal-data/{call_id}/{proposal}")
+@validated(checks={"call_id": require_call}, call_id=CALL_ID, proposal=PROPOSAL)
+async def proposal_data(_request, call_id, proposal):
+    """
+    Retrieves data for a given call ID and proposal.
+
+    Args:
+            call_id (str): The call ID.
+            proposal (str): The proposal ID.
+
+    Returns:
+            web.Response: The JSON response.
+    """
+    proposal_data_data = call_index.get_proposal(call_id, proposal)
+    if proposal_data_data is None:
+        # @validated ya comprobo que el llamado existe
+        cfp_contract = registry.cfp((await lookup_call(call_id))[1])
+        proposal_data_data = await cfp_contract.functions.proposalData(
+            proposal.raw
+        ).call()
+
+    if not does_exist(proposal_data_data[0]):
+        return json_response({"message": messages.PROPOSAL_NOT_FOUND}, 404)
+
+    return json_response(
+        {
+            "timestamp": timestamps.iso(proposal_data_data[2]),
+            "sender": str(proposal_data_data[0]),
+            "blockNumber": proposal_data_data[1],
+        },
+        200,
+    )
+
+
+@routes.get("/head")
+async def head(_request):
+    """
+    Get the latest block seen by the server.
+
+    Returns:
+    - A JSON response with the `number`, `hash` and `timestamp` of the block and
+      code 200.
+    - A JSON response with an error message and code 503 if no block was seen yet.
+    """
+    block = chain_head.current()
+    if block is None:
+        return json_response({"message": messages.HEAD_UNAVAILABLE}, 503)
+
+    return json_response(
+        {
+            "number": block.number,
+            "hash": block.hash.hex(),
+            "timestamp": timestamps.iso(block.timestamp),
+        },
+        200,
+    )
+
+
+@routes.get("/metrics")
+async def get_metrics(_request):
+    """
+    Expose the server metrics in the Prometheus text format.
+
+    Returns:
+    - The latency histogram of each endpoint and the JSON-RPC calls and round-trip
+      times per method of the synchronous services, with code 200.
+    """
+    response = web.Response(text=metrics.render())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return response
+
+
+@routes.get("/transactions/{tx_hash}")
+@validated(tx_hash=TX_HASH)
+async def transaction_status(_request, tx_hash):
+    """
+    Get the status of a transaction sent by the server.
+
+    Parameters:
+    - tx_hash (str): The hash returned in the `txHash` field of a write endpoint.
+
+    Returns:
+    - A JSON response with the `status` (`queued`, `failed`, `pending`, `mined` or
+      `reverted`) and, once mined, the `blockNumber`, with code 200.
+    - A JSON response with an error message and code 400 if the hash is invalid.
+    - A JSON response with an error message and code 404 if the transaction is unknown.
+    """
+    status = await in_thread(tx_manager.status, tx_hash.lower())
+    if status is None:
+        return json_response({"message": messages.TX_NOT_FOUND}, 404)
+
+    return json_response(status, 200)
+
+
+@routes.get("/events")
+async def events(request):
+    """
+    Stream the calls and proposals as they are indexed, as Server-Sent Events.
+
+    Every `CFPCreated` and `ProposalRegistered` event carries the same fields as
+    `/calls/<call_id>` and `/proposal-data`, plus the `callId` and `blockNumber`.
+    After the events of each block the block number is sent as the event ID, so a
+    client that reconnects resumes after the last block it saw.
+
+    Query parameters:
+    - creator (str): Optional address; only its calls and their proposals are sent.
+    - callId (str): Optional call ID; only that call and its proposals are sent.
+    - since (int): Optional block number; the events after it are sent first. The
+      `Last-Event-ID` header, sent by `EventSource` on reconnection, does the same.
+
+    Clients do not hold a thread, but at most `--max_event_clients` are served at
+    once, as in the Flask server.
+
+    Returns:
+        A `text/event-stream` response with code 200.
+        A JSON response with an error message and code 400 if any parameter is invalid.
+        A JSON response with an error message and code 503 if there are already
+        `--max_event_clients` clients connected.
+    """
+    last_event_id = request.headers.get("Last-Event-ID", request.query.get("since"))
+    try:
+        creator = request.query.get("creator")
+        creator = None if creator is None else ADDRESS.load(creator)
+        call_id = request.query.get("callId")
+        call_id = None if call_id is None else CALL_ID.load(call_id)
+        if last_event_id is not None and not last_event_id.isdigit():
+            raise ValidationError(messages.INVALID_EVENT_ID)
+    except ValidationError as error:
+        return json_response({"message": error.message}, error.status)
+
+    try:
+        subscription, cursor = event_hub.subscribe(creator, call_id)
+    except TooManySubscribers:
+        response = json_response({"message": messages.TOO_MANY_EVENT_CLIENTS}, 503)
+        response.headers["Retry-After"] = str(EVENTS_RETRY_AFTER)
+        return response
+
+    response = web.StreamResponse(
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.content_type = "text/event-stream"
+    try:
+        await response.prepare(request)
+        await response.write(b"retry: 2000\n\n")
+        if last_event_id is not None:
+            for block in event_hub.replay(int(last_event_id), cursor):
+                await response.write(subscription.frames(*block))
+        idle = 0.0
+        while not subscription.dropped:
+            # Los bloques los encola el hilo del indexador: se revisan sin bloquear
+            block = subscription.get(0)
+            if block is not None:
+                await response.write(subscription.frames(*block))
+                idle = 0.0
+                continue
+            if idle >= EVENTS_HEARTBEAT_SECONDS:
+                # El comentario tambien sirve para notar que el cliente se desconecto
+                await response.write(b": ping\n\n")
+                idle = 0.0
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+            idle += EVENTS_POLL_SECONDS
+    except ConnectionResetError:
+        pass
+    finally:
+        event_hub.unsubscribe(subscription)
+    return response
+
+
+@routes.get("/export/proposals")
+async def export_proposals(request):
+    """
+    Export every proposal of every call as newline delimited JSON.
+
+    The response is streamed: each line is a JSON object with `callId`, `proposal`,
+    `sender`, `blockNumber` and `timestamp` (ISO formatted), and proposals are read
+    `EXPORT_CHUNK_SIZE` at a time, so memory use does not depend on how many
+    proposals there are.
+
+    Returns:
+        A streamed `application/x-ndjson` response with code 200.
+    """
+    proposals = (
+        iter_indexed_proposals(EXPORT_CHUNK_SIZE)
+        if indexer.is_synced()
+        else iter_chain_proposals(EXPORT_CHUNK_SIZE)
+    )
+
+    response = web.StreamResponse()
+    response.content_type = "application/x-ndjson"
+    await response.prepare(request)
+    async for call_id, proposal, sender, block_number, timestamp in proposals:
+        line = {
+            "callId": call_id,
+            "proposal": proposal,
+            "sender": sender,
+            "blockNumber": block_number,
+            "timestamp": timestamps.iso(timestamp),
+        }
+        await response.write((json.dumps(line) + "\n").encode())
+    await response.write_eof()
+    return response
+
+
+# ----------------------------------------------------------------
+
+
+async def in_thread(function, *args):
+    """
+    Run a blocking call (e.g. of the transaction manager) in `tx_executor`.
+
+    Parameters:
+    function (callable): The function to call.
+    *args: Its arguments.
+
+    Returns:
+    The value returned by the function.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        tx_executor, function, *args
+    )
+
+
+async def read_all(functions):
+    """
+    Call several contract functions, `READ_CHUNK_SIZE` at a time.
+
+    Like `multicall.read_all`, a call that fails gives None instead of failing the
+    others.
+
+    Parameters:
+    functions (list): The bound async contract functions.
+
+    Returns:
+    list: The value returned by each function, or None if its call failed.
+    """
+    results = []
+    for start in range(0, len(functions), READ_CHUNK_SIZE):
+        chunk = functions[start : start + READ_CHUNK_SIZE]
+        values = await asyncio.gather(
+            *(function.call() for function in chunk), return_exceptions=True
+        )
+        results.extend(
+            None if isinstance(value, Exception) else value for value in values
+        )
+    return results
+
+
+def prefers_async(request):
+    """
+    Check whether the client asked not to wait for its transactions to be mined.
+
+    Parameters:
+    request (web.Request): The incoming request.
+
+    Returns:
+    bool: True if the request has a `Prefer: respond-async` header.
+    """
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
+async def proposals_per_transaction():
+    """
+    Get how many proposals a single `CFP.registerProposals` transaction can take.
+
+    The gas limit of a block is read from the chain head kept by the poller (see
+    `contracts.proposals_fitting`).
+
+    Returns:
+    int: Between 1 and `contracts.PROPOSALS_PER_TRANSACTION`.
+    """
+    block = chain_head.current()
+    gas_limit = None if block is None else block.get("gasLimit")
+    if gas_limit is None:
+        # Todavia no se vio ningun bloque completo
+        gas_limit = (await w3.eth.get_block("latest"))["gasLimit"]
+    return proposals_fitting(gas_limit)
+
+
+async def send_transaction(request, contract_function, status_code):
+    """
+    Send a transaction signed by the factory owner and build the response.
+
+    The transaction is signed and queued by the transaction manager, in
+    `tx_executor`. If the client sent `Prefer: respond-async`, the response is
+    returned right away with code 202; otherwise it is returned once the
+    transaction is mined.
+
+    Parameters:
+    request (web.Request): The incoming request.
+    contract_function (ContractFunction): The bound function to call, of
+    `sync_registry`.
+    status_code (int): Status code of the response once the transaction is mined.
+
+    Returns:
+    web.Response: The JSON response, including the `txHash`.
+    """
+    tx_hash = await in_thread(tx_manager.submit, contract_function)
+    if prefers_async(request):
+        status_code = 202
+    else:
+        await in_thread(tx_manager.wait, tx_hash)
+
+    return json_response({"message": messages.OK, "txHash": tx_hash}, status_code)
+
+
+async def fetch_calls_page(creator, offset, limit):
+    """
+    Get a page of the calls, optionally only the ones created by `creator`.
+
+    Parameters:
+    creator (str): Checksum address of the creator, or None for every call.
+    offset (int): Position of the first call of the page.
+    limit (int): Maximum number of calls in the page.
+
+    Returns:
+    tuple: The calls of the page, shaped as in `CFPFactory.calls()`, and the total
+    number of calls that match.
+    """
+    if indexer.is_synced():
+        return call_index.calls_page(creator, offset, limit)
+
+    # La pagina y el total se piden en paralelo
+    functions = registry.factory.functions
+    if creator is None:
+        total, page = await asyncio.gather(
+            functions.callsCount().call(), functions.callsPage(offset, limit).call()
+        )
+    else:
+        total, page = await asyncio.gather(
+            functions.createdByCount(creator).call(),
+            functions.createdByPage(creator, offset, limit).call(),
+        )
+    return page, total
+
+
+async def fetch_open_calls(within=None):
+    """
+    Get the open calls, from the closing schedule if the index is up to date.
+
+    Parameters:
+    within (int): Only get the calls that close in the next `within` seconds, or
+    None for every open call.
+
+    Returns:
+    list: The `OpenCall` of each call, the first to close first.
+    """
+    if indexer.is_synced():
+        if within is None:
+            return schedule.open_calls()
+        return schedule.closing_within(within)
+
+    # El calendario puede no tener los ultimos llamados: se recorren los de la cadena
+    now = time.time()
+    until = float("inf") if within is None else now + within
+    return sorted(
+        OpenCall(call[3], "0x" + call[2].hex(), call[0], call[1])
+        for call in await registry.factory.functions.callsList().call()
+        if now < call[3] <= until
+    )
+
+
+async def iter_indexed_proposals(chunk_size):
+    """
+    Iterate over every proposal of every call, reading them from the local index.
+
+    Parameters:
+    chunk_size (int): Number of proposals read from the index at a time.
+
+    Yields:
+    tuple: (call_id, proposal, sender, block_number, timestamp).
+    """
+    for proposal in call_index.iter_proposals(chunk_size):
+        yield proposal
+
+
+async def iter_chain_proposals(chunk_size):
+    """
+    Iterate over every proposal of every call, reading them from the contracts.
+
+    Calls are listed page by page and the proposals of each call are read in
+    concurrent chunks of `chunk_size`, so there is at most one chunk in flight.
+
+    Parameters:
+    chunk_size (int): Number of proposals read concurrently.
+
+    Yields:
+    tuple: (call_id, proposal, sender, block_number, timestamp).
+    """
+    offset = 0
+    while True:
+        calls, total = await fetch_calls_page(None, offset, chunk_size)
+        counts = await read_all(
+            [registry.cfp(call[1]).functions.proposalCount() for call in calls]
+        )
+        for call, count in zip(calls, counts):
+            call_id = "0x" + bytes(call[2]).hex()
+            cfp_contract = registry.cfp(call[1])
+            for start in range(0, count or 0, chunk_size):
+                indexes = range(start, min(count, start + chunk_size))
+                hashes = await read_all(
+                    [cfp_contract.functions.proposals(i) for i in indexes]
+                )
+                hashes = [proposal for proposal in hashes if proposal is not None]
+                data = await read_all(
+                    [cfp_contract.functions.proposalData(h) for h in hashes]
+                )
+                for proposal, (sender, block_number, timestamp) in zip(hashes, data):
+                    yield call_id, "0x" + proposal.hex(), sender, block_number, timestamp
+
+        offset += len(calls)
+        if not calls or offset >= total:
+            return
+
+
+async def lookup_call(call_id):
+    """
+    Get the call with the given ID, from the local index if possible.
+
+    Parameters:
+    call_id (str): The ID of the call.
+
+    Returns:
+    tuple: The call as returned by `CFPFactory.calls()`.
+    """
+    cfp = call_index.get_call(call_id)
+    if cfp is None:
+        # El indice puede ir detras del nodo, asi que el fallo se consulta a la cadena
+        cfp = await registry.factory.functions.calls(call_id).call()
+    return cfp
+
+
+def notify_closed(closed_calls):
+    """Send a `CallClosed` event to the clients of /events for each closed call."""
+    event_hub.notify(
+        "CallClosed",
+        [
+            (
+                call.call_id,
+                call.creator,
+                {
+                    "callId": call.call_id,
+                    "creator": call.creator,
+                    "cfp": call.cfp,
+                    "closingTime": timestamps.iso(call.closing_time),
+                },
+            )
+            for call in closed_calls
+        ],
+    )
+
+
+def start_services(account, build_dir=None, network_id=None, bundle_file=None):
+    """
+    Set the factory owner, build the services that use the chain and start them.
+
+    They are the ones of `apiserver.py`, sharing its index file and its nonce file,
+    so both servers can run at the same time. On the in-memory chain the owner
+    first deploys the contracts, unless a build directory is given.
+
+    Parameters:
+    account (LocalAccount): The owner of the factory, which signs its transactions.
+    build_dir (str): Directory with the build artifacts; the configured one if None.
+    network_id (str): Network id of the deployment; the configured one if None.
+    bundle_file (str): Compact ABI bundle; the configured one if None and the build
+    directory is the configured one.
+    """
+    # pylint: disable-next=W0601
+    global owner, registry, sync_registry, call_index, indexer, event_hub, schedule
+    global tx_manager, chain_head  # pylint: disable=W0601
+    owner = account
+
+    if build_dir is None and settings.chain_backend == "tester":
+        # Sin un build de truffle compilado se usan las versiones en Vyper de testcontracts/
+        build_dir, network_id = chain.deploy_artifacts(
+            sync_w3, chain.source_build_dir(settings.build_dir), owner
+        )
+    elif build_dir is None:
+        build_dir, bundle_file = settings.build_dir, settings.bundle_file
+    index_file = (
+        ":memory:" if settings.chain_backend == "tester" else settings.index_file
+    )
+
+    def load_registry(web3):
+        return ContractRegistry(
+            web3,
+            os.path.join(build_dir, "CFPFactory.json"),
+            os.path.join(build_dir, "CFP.json"),
+            os.path.join(build_dir, "Multicall.json"),
+            network_id=network_id or settings.network_id,
+            bundle_file=bundle_file,
+        )
+
+    # El registro de los handlers arma contratos asincronicos porque recibe una
+    # instancia de AsyncWeb3; el de los servicios, contratos sincronicos
+    registry = load_registry(w3)
+    sync_registry = load_registry(sync_w3)
+
+    # El indice lo escribe un solo proceso, este o uno de apiserver.py
+    call_index = CallIndex(index_file)
+    indexer = ChainIndexer(
+        sync_w3,
+        sync_registry,
+        call_index,
+        lock_path=None if index_file == ":memory:" else f"{index_file}.lock",
+    )
+    event_hub = EventHub(
+        call_index, timestamps.iso, max_subscribers=settings.max_event_clients
+    )
+    schedule = ClosingSchedule(call_index, on_close=notify_closed)
+    indexer.listeners.append(event_hub.poll)
+    indexer.listeners.append(schedule.poll)
+    indexer.rollback_listeners.append(event_hub.rewind)
+    indexer.rollback_listeners.append(schedule.reset)
+
+    tx_manager = TransactionManager(
+        sync_w3,
+        owner,
+        nonces=None if index_file == ":memory:" else FileNonces(f"{index_file}.nonce"),
+    )
+    chain_head = ChainHead(sync_w3)
+    chain_head.start()
+    indexer.start()
+    schedule.start()
+
+
+def stop_services():
+    """Stop the background threads started by `start_services`."""
+    for service in (indexer, schedule, chain_head):
+        service.stop()
+
+
+@web.middleware
+async def record_request_metrics(request, handler):
+    """Record the latency of the request in the metrics, per route."""
+    start = perf_counter()
+    response = await handler(request)
+    resource = request.match_info.route.resource
+    metrics.REQUEST_DURATION.observe(
+        perf_counter() - start,
+        endpoint="unknown" if resource is None else resource.canonical,
+        method=request.method,
+        status=str(response.status),
+    )
+    return response
+
+
+@web.middleware
+async def reload_artifacts(request, handler):
+    """Pick up new build artifacts after a `truffle migrate` without restarting."""
+    registry.reload_if_changed()
+    sync_registry.reload_if_changed()
+    return await handler(request)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Allow cross-origin requests, like `flask_cors.CORS` does for the Flask server."""
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Prefer"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return response
+
+
+async def open_session(_app):
+    """Share one pooled aiohttp session for every request sent to the node."""
+    if not hasattr(w3.provider, "cache_async_session"):
+        # La cadena en memoria no usa HTTP
+        yield
+        return
+    session = ClientSession(
+        connector=TCPConnector(limit=settings.node_pool_size, keepalive_timeout=30),
+        timeout=ClientTimeout(total=settings.node_timeout),
+    )
+    await w3.provider.cache_async_session(session)
+    yield
+    await session.close()
+
+
+def create_app():
+    """
+    Build the aiohttp application.
+
+    Returns:
+        web.Application: The application with every route registered.
+    """
+    application = web.Application(
+        middlewares=[cors_middleware, record_request_metrics, reload_artifacts]
+    )
+    application.add_routes(routes)
+    application.cleanup_ctx.append(open_session)
+    return application
+
+
+# ----------------------------------------------------------------
+if __name__ == "__main__":
+    host, port = settings.bind.rsplit(":", 1)
+    try:
+        if deployer is not None:
+            # En la cadena en memoria el dueño es quien desplegó los contratos
+            start_services(deployer)
+        else:
+            # Las transacciones se firman con la cuenta de la semilla del dueño
+            start_services(config.load_owner(settings.mnemonic_file))
+        web.run_app(create_app(), host=host, port=int(port))
+    except ValueError as error:
+        print("Se ha producido un error", error)
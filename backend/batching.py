@@ -0,0 +1,286 @@
+"""Agrupa varias consultas JSON-RPC independientes en un solo POST al nodo.
+
+Solo se agrupan las consultas encoladas en un mismo `RPCBatch`: las llamadas que
+web3 hace por su cuenta (`.call()`, `get_block`, ...) siguen yendo de a una. Por eso
+los caminos que hacen varias lecturas independientes por petición las encolan
+explícitamente: `/create` (autorización, llamado y último bloque), `read_flag`,
+`read_all` y los listados cuando el índice local no está al día.
+"""
+
+import itertools
+
+from eth_utils import collapse_if_tuple, to_checksum_address
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError
+
+import metrics
+from providers import FailoverProvider
+
+_ids = itertools.count()
+
+
+def _normalize(param, value):
+    """Checksum the addresses in a decoded value, like `ContractFunction.call()`."""
+    param_type = param["type"]
+    if param_type.endswith("]"):
+        item = dict(param, type=param_type[: param_type.rindex("[")])
+        return [_normalize(item, element) for element in value]
+    if param_type == "tuple":
+        return tuple(
+            _normalize(component, element)
+            for component, element in zip(param["components"], value)
+        )
+    if param_type == "address":
+        return to_checksum_address(value)
+    return value
+
+
+def _quantity(value):
+    # El tester devuelve enteros; los nodos HTTP, strings hexadecimales
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def encode_call(contract_function):
+    """
+    Build the `eth_call` transaction for a bound contract function.
+
+    Args:
+        contract_function (ContractFunction): The bound function to call.
+
+    Returns:
+        dict: The transaction, with `to` and ABI encoded `data`.
+    """
+    return {
+        "to": contract_function.address,
+        # pylint: disable-next=W0212
+        "data": contract_function._encode_transaction_data(),
+    }
+
+
+def decode_result(w3, contract_function, data):
+    """
+    Decode the return data of a contract function like `ContractFunction.call()`.
+
+    Args:
+        w3 (Web3): The Web3 instance whose codec is used.
+        contract_function (ContractFunction): The function that produced the data.
+        data (bytes | str): The raw return data.
+
+    Returns:
+        The decoded value, or a list of values for functions with several outputs.
+    """
+    outputs = contract_function.abi["outputs"]
+    output_types = [collapse_if_tuple(output) for output in outputs]
+    values = w3.codec.decode(output_types, HexBytes(data))
+    values = [_normalize(output, value) for output, value in zip(outputs, values)]
+    return values[0] if len(values) == 1 else values
+
+
+class BatchResult:
+    """
+    Placeholder for the result of a request queued in an `RPCBatch`.
+
+    Reading the result sends every pending request of the batch in a single POST.
+    """
+
+    def __init__(self, batch, decode):
+        self._batch = batch
+        self._decode = decode
+        self._done = False
+        self._value = None
+        self._error = None
+        self._callbacks = []
+
+    @classmethod
+    def resolved(cls, value):
+        """Wrap a value that is already known, so it can be used like a pending result."""
+        result = cls(None, None)
+        result._done = True
+        result._value = value
+        return result
+
+    def get(self):
+        """
+        Get the result, sending the batch first if it is still pending.
+
+        Returns:
+            The decoded result of the request.
+
+        Raises:
+            ContractLogicError: If an `eth_call` reverted.
+            ValueError: If the node returned any other error.
+            RuntimeError: If the batch was sent but the request got no result.
+            Exception: The error that stopped the batch from being sent, if any.
+        """
+        if not self._done and self._batch is not None:
+            self._batch.execute()
+        if not self._done:
+            raise RuntimeError("La consulta no se resolvió")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def add_done_callback(self, callback):
+        """
+        Call `callback(value)` once the request succeeds (right away if it already did).
+
+        Args:
+            callback (callable): Receives the decoded result.
+        """
+        if not self._done:
+            self._callbacks.append(callback)
+        elif self._error is None:
+            callback(self._value)
+
+    def _resolve(self, response):
+        self._done = True
+        error = response.get("error")
+        if error is None:
+            try:
+                self._value = self._decode(response["result"])
+            except Exception as decode_error:  # pylint: disable=W0718
+                self._error = decode_error
+        elif "revert" in error.get("message", ""):
+            self._error = ContractLogicError(error["message"], data=error.get("data"))
+        else:
+            self._error = ValueError(error)
+        if self._error is None:
+            for callback in self._callbacks:
+                callback(self._value)
+        self._callbacks = []
+
+    def _fail(self, error):
+        self._done = True
+        self._error = error
+        self._callbacks = []
+
+
+class RPCBatch:
+    """
+    Queue of independent JSON-RPC requests sent together as one batch POST.
+
+    Usage:
+        batch = RPCBatch(w3)
+        authorized = batch.call(factory.functions.isAuthorized(address))
+        latest = batch.get_block("latest")
+        if authorized.get() and latest.get().timestamp < closing_time:
+            ...
+
+    Providers that cannot take batches (e.g. the in-process tester) get the requests
+    one by one, so the batch can be used regardless of the backend. If sending the
+    batch fails, every pending result gets the error.
+
+    Args:
+        w3 (Web3): The Web3 instance whose provider receives the requests.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self._pending = []
+
+    def call(self, contract_function, block_identifier="latest"):
+        """
+        Queue an `eth_call` of a contract view function.
+
+        Args:
+            contract_function (ContractFunction): The bound function to call.
+            block_identifier (str | int): Block to run the call against.
+
+        Returns:
+            BatchResult: The pending result, decoded like `ContractFunction.call()`.
+        """
+        def decode(result):
+            return decode_result(self.w3, contract_function, result)
+
+        return self._queue(
+            "eth_call",
+            [encode_call(contract_function), self._block_param(block_identifier)],
+            decode,
+        )
+
+    def get_block(self, block_identifier="latest"):
+        """
+        Queue an `eth_getBlockByNumber` without transactions.
+
+        Args:
+            block_identifier (str | int): The block to fetch.
+
+        Returns:
+            BatchResult: The pending block header, with `number`, `hash`,
+            `timestamp` and, if the node sent it, `gasLimit` already converted.
+        """
+
+        def decode(result):
+            header = {
+                "number": _quantity(result["number"]),
+                "hash": HexBytes(result["hash"]),
+                "timestamp": _quantity(result["timestamp"]),
+            }
+            if "gasLimit" in result:
+                header["gasLimit"] = _quantity(result["gasLimit"])
+            return AttributeDict(header)
+
+        return self._queue(
+            "eth_getBlockByNumber", [self._block_param(block_identifier), False], decode
+        )
+
+    def execute(self):
+        """
+        Send every pending request and resolve their results.
+
+        Raises:
+            Exception: The error that stopped the batch from being sent; the pending
+            results raise it too.
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        provider = self.w3.provider
+        responses = {}
+        error = None
+        try:
+            if isinstance(provider, FailoverProvider):
+                payload = [
+                    {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "method": method,
+                        "params": params,
+                    }
+                    for request_id, method, params, _ in pending
+                ]
+                with metrics.rpc_round_trip([method for _, method, _, _ in pending]):
+                    batch_response = provider.make_batch_request(payload)
+                if not isinstance(batch_response, list):
+                    # Un nodo que rechaza el lote entero devuelve un unico error
+                    raise ValueError(batch_response.get("error", batch_response))
+                responses.update((item.get("id"), item) for item in batch_response)
+            else:
+                for request_id, method, params, _ in pending:
+                    with metrics.rpc_round_trip([method]):
+                        responses[request_id] = provider.make_request(method, params)
+        except Exception as send_error:
+            error = send_error
+            raise
+        finally:
+            # pylint: disable=W0212
+            for request_id, _, _, result in pending:
+                response = responses.get(request_id)
+                if response is not None:
+                    result._resolve(response)
+                else:
+                    missing = ValueError(f"El nodo no respondió la petición {request_id}")
+                    result._fail(error or missing)
+
+    def _queue(self, method, params, decode):
+        result = BatchResult(self, decode)
+        self._pending.append((next(_ids), method, params, result))
+        return result
+
+    @staticmethod
+    def _block_param(block_identifier):
+        if isinstance(block_identifier, int):
+            return hex(block_identifier)
+        return block_identifier
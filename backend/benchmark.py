@@ -0,0 +1,364 @@
+"""Benchmark de carga y latencia de los endpoints del servidor de API.
+
+Levanta un conjunto de cuentas, llamados y propuestas contra el servidor (que a su
+vez debe estar conectado a Ganache) y luego ejecuta cada ruta con la concurrencia
+indicada. Los resultados se imprimen y se guardan en JSON para comparar revisiones:
+
+    python benchmark.py --concurrency 16 --requests 500 --output results.json
+
+Con `--in-process` el servidor se levanta en el mismo proceso sobre una cadena en
+memoria (ver `chain.py`), sin Ganache ni red.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import requests
+from eth_account import Account
+
+import test_apiserver
+from test_apiserver import get_closing_time, get_contract_address, random_hash, sign, url
+
+ROUTES = [
+    "authorized",
+    "calls",
+    "calls-expanded",
+    "calls-open",
+    "call",
+    "closing-time",
+    "proposal-data",
+    "contract-address",
+    "contract-owner",
+    "pending-users",
+    "head",
+    "export-proposals",
+    "register",
+    "authorize",
+    "create",
+    "register-proposal",
+    "register-proposals",
+]
+
+_sessions = threading.local()
+
+# App de Flask que atiende las peticiones cuando se corre con --in-process
+_app = None
+
+
+def session():
+    """Get the HTTP session of the current thread, so connections are reused."""
+    if getattr(_sessions, "session", None) is None:
+        _sessions.session = requests.Session()
+        if _app is not None:
+            # pylint: disable-next=C0415
+            from inprocess import FlaskAdapter
+
+            _sessions.session.mount(test_apiserver.SERVER, FlaskAdapter(_app))
+    return _sessions.session
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a list of values using the nearest-rank method.
+
+    Args:
+        values (list): The values, sorted in ascending order.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The value at the given percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[rank]
+
+
+def revision():
+    """Get the git revision being benchmarked, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+    """
+    Drives every route of the API server and measures its latency.
+
+    Args:
+        concurrency (int): Number of requests in flight at the same time.
+        requests_per_route (int): Number of requests sent to each route.
+        accounts (int): Number of authorized accounts created for the fixtures.
+    """
+
+    def __init__(self, concurrency, requests_per_route, accounts):
+        self.concurrency = concurrency
+        self.requests_per_route = requests_per_route
+        self.account_count = accounts
+
+        self.contract_address = None
+        self.accounts = []
+        self.calls = []
+        self.proposals = []
+
+    def setup(self):
+        """Create the accounts, calls and proposals used by the read routes."""
+        self.contract_address = get_contract_address()
+        for _ in range(self.account_count):
+            account = Account.create()
+            self._register(account)
+            session().post(url("authorize", account.address), timeout=30)
+            self.accounts.append(account)
+
+        for account in self.accounts:
+            call_id = random_hash()
+            response = self._create(account, call_id)
+            if response.status_code != 201:
+                raise RuntimeError(f"No se pudo crear el llamado: {response.text}")
+            self.calls.append(call_id)
+
+        for call_id in self.calls:
+            proposal = random_hash()
+            session().post(
+                url("register-proposal"),
+                json={"callId": call_id, "proposal": proposal},
+                timeout=30,
+            )
+            self.proposals.append((call_id, proposal))
+
+    def scenarios(self):
+        """
+        Build the request of each route.
+
+        Returns:
+            dict: Route name to a function that sends the `i`-th request.
+        """
+        accounts = self.accounts
+        calls = self.calls
+        proposals = self.proposals
+
+        def pick(items, i):
+            return items[i % len(items)]
+
+        return {
+            "authorized": lambda i: session().get(
+                url("authorized", pick(accounts, i).address), timeout=30
+            ),
+            "calls": lambda i: session().get(url("calls"), timeout=30),
+            "calls-expanded": lambda i: session().get(
+                url("calls"),
+                params={"expand": "closingTime,proposalCount", "limit": 100},
+                timeout=30,
+            ),
+            "calls-open": lambda i: session().get(url("calls", "open"), timeout=30),
+            "call": lambda i: session().get(url("calls", pick(calls, i)), timeout=30),
+            "closing-time": lambda i: session().get(
+                url("closing-time", pick(calls, i)), timeout=30
+            ),
+            "proposal-data": lambda i: session().get(
+                url("proposal-data", "/".join(pick(proposals, i))), timeout=30
+            ),
+            "contract-address": lambda i: session().get(
+                url("contract-address"), timeout=30
+            ),
+            "contract-owner": lambda i: session().get(url("contract-owner"), timeout=30),
+            "pending-users": lambda i: session().get(url("pending-users"), timeout=30),
+            "head": lambda i: session().get(url("head"), timeout=30),
+            "export-proposals": lambda i: session().get(
+                url("export", "proposals"), timeout=30
+            ),
+            "register": lambda i: self._register(Account.create()),
+            "authorize": lambda i: session().post(
+                url("authorize", Account.create().address), timeout=30
+            ),
+            "create": lambda i: self._create(pick(accounts, i), random_hash()),
+            "register-proposal": lambda i: session().post(
+                url("register-proposal"),
+                json={"callId": pick(calls, i), "proposal": random_hash()},
+                timeout=30,
+            ),
+            "register-proposals": lambda i: session().post(
+                url("register-proposals"),
+                json={
+                    "callId": pick(calls, i),
+                    "proposals": [random_hash() for _ in range(50)],
+                },
+                timeout=120,
+            ),
+        }
+
+    def run(self, route, send):
+        """
+        Send `requests_per_route` requests to a route and summarize the results.
+
+        Args:
+            route (str): Name of the route.
+            send (callable): Sends the `i`-th request and returns the response.
+
+        Returns:
+            dict: Latency percentiles (in milliseconds), requests per second, status
+            codes and JSON-RPC calls per request.
+        """
+
+        def timed(i):
+            start = time.perf_counter()
+            try:
+                response = send(i)
+            except requests.RequestException:
+                return time.perf_counter() - start, None, None, None
+            elapsed = time.perf_counter() - start
+            return (
+                elapsed,
+                response.status_code,
+                response.headers.get("X-RPC-Calls"),
+                response.headers.get("X-RPC-Round-Trips"),
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(timed, range(self.requests_per_route)))
+        duration = time.perf_counter() - start
+
+        latencies = sorted(result[0] * 1000 for result in results)
+        statuses = {}
+        for _, status, _, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        rpc_calls = [int(result[2]) for result in results if result[2] is not None]
+        round_trips = [int(result[3]) for result in results if result[3] is not None]
+
+        return {
+            "requests": len(results),
+            "concurrency": self.concurrency,
+            "durationSeconds": duration,
+            "requestsPerSecond": len(results) / duration,
+            "latencyMs": {
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+                "max": latencies[-1],
+            },
+            "statusCodes": statuses,
+            "rpcCallsPerRequest": sum(rpc_calls) / len(rpc_calls) if rpc_calls else None,
+            "rpcRoundTripsPerRequest": (
+                sum(round_trips) / len(round_trips) if round_trips else None
+            ),
+        }
+
+    def _register(self, account):
+        signature = sign(self.contract_address, account)
+        return session().post(
+            url("register"),
+            json={"address": account.address, "signature": signature},
+            timeout=30,
+        )
+
+    def _create(self, account, call_id):
+        message_bytes = bytes.fromhex(self.contract_address[2:]) + bytes.fromhex(
+            call_id[2:]
+        )
+        return session().post(
+            url("create"),
+            json={
+                "callId": call_id,
+                "signature": sign(message_bytes.hex(), account),
+                "closingTime": get_closing_time().isoformat(),
+            },
+            timeout=30,
+        )
+
+
+def print_report(results):
+    """Print one line per route with its throughput and latency percentiles."""
+    print(
+        f"{'ruta':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'rpc/req':>10}  códigos"
+    )
+    for route, result in results.items():
+        latency = result["latencyMs"]
+        rpc = result["rpcCallsPerRequest"]
+        print(
+            f"{route:<20}{result['requestsPerSecond']:>10.1f}{latency['p50']:>10.1f}"
+            f"{latency['p95']:>10.1f}{latency['p99']:>10.1f}"
+            f"{'-' if rpc is None else format(rpc, '.1f'):>10}  {result['statusCodes']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--server", default=test_apiserver.SERVER, help="URL del servidor de API"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Peticiones simultáneas"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Peticiones por ruta"
+    )
+    parser.add_argument(
+        "--accounts", type=int, default=4, help="Cuentas autorizadas a crear"
+    )
+    parser.add_argument(
+        "--routes",
+        default=",".join(ROUTES),
+        help="Rutas a medir, separadas por comas",
+    )
+    parser.add_argument(
+        "--output", default="benchmark.json", help="Archivo JSON de resultados"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Levantar el servidor en este proceso, sobre una cadena en memoria",
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.routes.split(",")) - set(ROUTES)
+    if unknown:
+        parser.error(f"Rutas desconocidas: {', '.join(sorted(unknown))}")
+
+    # Los helpers de los tests arman las URLs a partir de esta variable
+    test_apiserver.SERVER = args.server.rstrip("/")
+
+    with ExitStack() as stack:
+        if args.in_process:
+            os.environ["CHAIN_BACKEND"] = "tester"
+            # pylint: disable-next=C0415
+            import apiserver
+            from inprocess import serve_in_process
+
+            apiserver.start_services(apiserver.deployer)
+            _app = apiserver.app
+            stack.enter_context(serve_in_process(_app, test_apiserver.SERVER))
+
+        benchmark = Benchmark(args.concurrency, args.requests, args.accounts)
+        benchmark.setup()
+        scenarios = benchmark.scenarios()
+        results = {}
+        for route in args.routes.split(","):
+            results[route] = benchmark.run(route, scenarios[route])
+
+    print_report(results)
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(
+            {
+                "revision": revision(),
+                "date": datetime.now(timezone.utc).isoformat(),
+                "server": "in-process" if args.in_process else test_apiserver.SERVER,
+                "results": results,
+            },
+            output,
+            indent=2,
+        )
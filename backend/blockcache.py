@@ -0,0 +1,94 @@
+"""Caché de lecturas del contrato que se invalida al llegar un bloque nuevo."""
+
+import threading
+from collections import OrderedDict
+
+
+class BlockCache:
+    """
+    Cache of contract reads tagged with the block they were read at.
+
+    An entry is served only while no block newer than the one it was read at has
+    been seen, so a cached value is never older than the latest block known to
+    the server. If the head goes back (the chain was rewound), every entry is
+    dropped. Writes sent by the server itself invalidate the affected keys
+    explicitly, since they may be mined before the new block is seen.
+
+    Usage:
+        cache = BlockCache(lambda: chain_head.number)
+        value = cache.get(key)
+        if value is None:
+            value = read_value()
+            cache.put(key, value, block_number)
+
+    Args:
+        head (callable): Returns the number of the latest block seen by the server,
+            or None if it is not known yet (the cache is bypassed until it is).
+        max_size (int): Maximum number of entries kept in the LRU.
+    """
+
+    def __init__(self, head, max_size=10000):
+        self.head = head
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._latest = -1
+
+    def get(self, key):
+        """
+        Get a cached value if it is still current.
+
+        Args:
+            key (Hashable): The key of the value.
+
+        Returns:
+            The cached value, or None if it is missing or was read at an old block.
+        """
+        head = self.head()
+        with self._lock:
+            if head is not None and head < self._latest:
+                # La cadena retrocedio: lo leido en la rama descartada ya no vale
+                self._entries.clear()
+                self._latest = head
+            entry = self._entries.get(key)
+            if head is None or entry is None or entry[1] < max(head, self._latest):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, block_number):
+        """
+        Store a value read at the given block.
+
+        Args:
+            key (Hashable): The key of the value.
+            value: The value; None can not be cached.
+            block_number (int): The block the value was read at. If the value was
+                read at `latest`, a block fetched before the read must be used.
+        """
+        with self._lock:
+            self._latest = max(self._latest, block_number)
+            self._entries[key] = (value, block_number)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drop a cached value, e.g. after sending a transaction that changes it.
+
+        Args:
+            key (Hashable): The key of the value.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._entries.clear()
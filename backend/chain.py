@@ -0,0 +1,331 @@
+"""Backends de cadena para el servidor de API.
+
+- `http`: uno o más nodos externos (Ganache) a los que se llega por JSON-RPC sobre
+  HTTP, con conmutación por error entre ellos (ver `providers.py`).
+- `tester`: una cadena en memoria dentro del mismo proceso (eth-tester), en la que se
+  despliegan los artefactos compilados por truffle al arrancar. Sirve para correr las
+  pruebas y los benchmarks sin Ganache ni red.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from web3 import AsyncHTTPProvider, AsyncWeb3, EthereumTesterProvider, Web3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from providers import FailoverProvider
+
+BACKENDS = ("http", "tester")
+
+# Versiones en Vyper de los contratos, para correr las pruebas sin un build de truffle
+TEST_BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testcontracts")
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Contratos desplegados en el mismo orden que las migraciones de truffle
+ENS_CONTRACTS = (
+    "ENSRegistry",
+    "PublicResolver",
+    "CallFIFSRegistrar",
+    "UserFIFSRegistrar",
+    "ReverseRegistrar",
+)
+
+
+class LockedTesterProvider(EthereumTesterProvider):
+    """
+    EthereumTesterProvider that can be shared by several threads.
+
+    The in-process chain is not thread-safe, and the server uses it from the request
+    threads, the indexer, the chain head poller and the transaction manager.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.RLock()
+
+    def make_request(self, method, params):
+        with self._lock:
+            if method == "eth_call" and "from" not in params[0]:
+                # A diferencia de un nodo, eth-tester exige `from`; las consultas de
+                # RPCBatch llegan sin el middleware que lo completa
+                sender = self.ethereum_tester.get_accounts()[0]
+                params = [dict(params[0], **{"from": sender})] + list(params[1:])
+            return super().make_request(method, params)
+
+
+class AsyncLockedTesterProvider(AsyncEthereumTesterProvider):
+    """
+    AsyncEthereumTesterProvider over the chain of a `LockedTesterProvider`.
+
+    It takes the lock of the synchronous provider, so the event loop and the
+    threads that use the synchronous one never touch the chain at the same time.
+    eth-tester answers without awaiting anything, so the lock is never held across
+    a suspension of the coroutine.
+
+    Args:
+        shared (LockedTesterProvider): The provider whose chain and lock are used.
+    """
+
+    def __init__(self, shared):
+        super().__init__()
+        self.ethereum_tester = shared.ethereum_tester
+        self._lock = shared._lock  # pylint: disable=W0212
+
+    async def make_request(self, method, params):
+        with self._lock:
+            return await super().make_request(method, params)
+
+
+def connect(backend, node_url, **provider_options):
+    """
+    Build the Web3 instance of a chain backend.
+
+    Args:
+        backend (str): `http` or `tester`.
+        node_url (str): URL of the node, used by the `http` backend; several URLs
+            can be given separated by commas, the first one being the primary.
+        **provider_options: Passed to the `FailoverProvider` of the `http` backend.
+
+    Returns:
+        Web3: The Web3 instance.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "http":
+        urls = [url.strip() for url in node_url.split(",") if url.strip()]
+        return Web3(FailoverProvider(urls, **provider_options))
+    if backend == "tester":
+        return Web3(LockedTesterProvider())
+    raise ValueError(f"Backend de cadena desconocido: {backend}")
+
+
+def connect_async(backend, node_url, tester_provider=None):
+    """
+    Build the AsyncWeb3 instance of a chain backend, for `asyncserver.py`.
+
+    Args:
+        backend (str): `http` or `tester`.
+        node_url (str): URL of the node, used by the `http` backend; of several
+            comma separated URLs only the first one (the primary) is used.
+        tester_provider (LockedTesterProvider): Provider of the `tester` backend to
+            share the chain with, e.g. the one of a synchronous Web3; a new empty
+            chain if None.
+
+    Returns:
+        AsyncWeb3: The AsyncWeb3 instance.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "http":
+        return AsyncWeb3(AsyncHTTPProvider(node_url.split(",")[0].strip()))
+    if backend == "tester":
+        if tester_provider is None:
+            return AsyncWeb3(AsyncEthereumTesterProvider())
+        return AsyncWeb3(AsyncLockedTesterProvider(tester_provider))
+    raise ValueError(f"Backend de cadena desconocido: {backend}")
+
+
+def unlock_account(w3, account, value=10**18):
+    """
+    Let the in-process chain sign for an account and fund it.
+
+    The frontend signs with accounts held by the node (the ones of the Ganache seed),
+    so endpoints like `/register` send transactions from the user's address. Fresh
+    accounts need to be added to the tester the same way to go through them.
+
+    Args:
+        w3 (Web3): The Web3 instance of the `tester` backend.
+        account (LocalAccount): The account to unlock.
+        value (int): Wei sent to the account to pay for its gas.
+    """
+    w3.provider.ethereum_tester.add_account(Web3.to_hex(account.key))
+    tx_hash = w3.eth.send_transaction(
+        {"from": w3.eth.accounts[0], "to": account.address, "value": value}
+    )
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def namehash(name):
+    """
+    Compute the ENS namehash of a domain.
+
+    Args:
+        name (str): The domain, e.g. `llamados.cfp`.
+
+    Returns:
+        bytes: The 32 bytes node of the domain.
+    """
+    node = b"\x00" * 32
+    if name:
+        for label in reversed(name.split(".")):
+            node = Web3.keccak(node + Web3.keccak(text=label))
+    return node
+
+
+def source_build_dir(build_dir):
+    """
+    Choose the artifacts to deploy on the in-process chain.
+
+    Args:
+        build_dir (str): Directory with the truffle build artifacts.
+
+    Returns:
+        str: `build_dir` if it has compiled contracts, `TEST_BUILD_DIR` otherwise.
+    """
+    return build_dir if has_bytecode(build_dir) else TEST_BUILD_DIR
+
+
+def has_bytecode(build_dir):
+    """
+    Check if a build directory has a deployable factory, and not only its ABI.
+
+    Args:
+        build_dir (str): Directory with the build artifacts.
+
+    Returns:
+        bool: True if `CFPFactory.json` exists and includes its bytecode.
+    """
+    try:
+        artifact = _load_artifact(build_dir, "CFPFactory")
+    except (OSError, ValueError):
+        return False
+    return len(artifact.get("bytecode") or "") > 2
+
+
+def _load_artifact(build_dir, name):
+    with open(os.path.join(build_dir, f"{name}.json"), encoding="utf-8") as artifact:
+        return json.load(artifact)
+
+
+def _send(w3, account, transaction):
+    transaction = dict(transaction)
+    transaction["nonce"] = w3.eth.get_transaction_count(account.address)
+    signed = account.sign_transaction(transaction)
+    tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    if receipt.status != 1:
+        raise RuntimeError(f"Falló la transacción {tx_hash.hex()}")
+    return receipt
+
+
+def _deploy(w3, account, artifact, *args):
+    contract = w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"])
+    transaction = contract.constructor(*args).build_transaction({"from": account.address})
+    receipt = _send(w3, account, transaction)
+    return w3.eth.contract(address=receipt.contractAddress, abi=artifact["abi"])
+
+
+def _transact(w3, account, contract_function):
+    transaction = contract_function.build_transaction({"from": account.address})
+    return _send(w3, account, transaction)
+
+
+def deploy_artifacts(w3, build_dir, account, output_dir=None):
+    """
+    Deploy the compiled contracts on an empty chain, like `truffle migrate` does.
+
+    The account is funded from the first unlocked account of the node, deploys the
+    ENS contracts and the factory (so it becomes the factory owner) and, if its
+    artifact exists, the Multicall contract. Without the ENS artifacts (as in
+    `TEST_BUILD_DIR`) the factory gets the zero address for the ENS contracts.
+    The artifacts are then written to `output_dir` with the deployed addresses
+    under the network id of the chain, so `ContractRegistry` can load them as usual.
+
+    Args:
+        w3 (Web3): The Web3 instance of the chain.
+        build_dir (str): Directory with the truffle build artifacts.
+        account (LocalAccount): Account that deploys the contracts.
+        output_dir (str): Directory where the artifacts are written; a temporary
+            directory if None.
+
+    Returns:
+        tuple: The output directory and the network id of the chain.
+    """
+    network_id = str(w3.eth.chain_id)
+    output_dir = output_dir or tempfile.mkdtemp(prefix="cfp-artifacts-")
+
+    funder = w3.eth.accounts[0]
+    tx_hash = w3.eth.send_transaction(
+        {"from": funder, "to": account.address, "value": w3.eth.get_balance(funder) // 2}
+    )
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    artifacts = {name: _load_artifact(build_dir, name) for name in ("CFPFactory", "CFP")}
+    deployed = {}
+    if os.path.exists(os.path.join(build_dir, "ENSRegistry.json")):
+        for name in ENS_CONTRACTS:
+            artifacts[name] = _load_artifact(build_dir, name)
+        reverse, resolver = _deploy_ens(w3, account, artifacts, deployed)
+        ens_addresses = (reverse.address, resolver.address)
+    else:
+        ens_addresses = (ZERO_ADDRESS, ZERO_ADDRESS)
+    deployed["CFPFactory"] = _deploy(
+        w3, account, artifacts["CFPFactory"], *ens_addresses
+    )
+    if os.path.exists(os.path.join(build_dir, "Multicall.json")):
+        artifacts["Multicall"] = _load_artifact(build_dir, "Multicall")
+        deployed["Multicall"] = _deploy(w3, account, artifacts["Multicall"])
+
+    for name, artifact in artifacts.items():
+        if name in deployed:
+            artifact = dict(
+                artifact,
+                networks={network_id: {"address": deployed[name].address}},
+            )
+        with open(
+            os.path.join(output_dir, f"{name}.json"), "w", encoding="utf-8"
+        ) as output:
+            json.dump(artifact, output)
+    return output_dir, network_id
+
+
+def _deploy_ens(w3, account, artifacts, deployed):
+    # Mismo orden y configuracion de dominios que las migraciones de truffle
+    ens = deployed["ENSRegistry"] = _deploy(w3, account, artifacts["ENSRegistry"])
+    resolver = deployed["PublicResolver"] = _deploy(
+        w3, account, artifacts["PublicResolver"], ens.address
+    )
+    _transact(
+        w3,
+        account,
+        ens.functions.setSubnodeOwner(
+            b"\x00" * 32, Web3.keccak(text="cfp"), account.address
+        ),
+    )
+    for registrar, label in (
+        ("CallFIFSRegistrar", "llamados"),
+        ("UserFIFSRegistrar", "usuarios"),
+    ):
+        contract = deployed[registrar] = _deploy(
+            w3, account, artifacts[registrar], ens.address, namehash(f"{label}.cfp")
+        )
+        _transact(
+            w3,
+            account,
+            ens.functions.setSubnodeOwner(
+                namehash("cfp"), Web3.keccak(text=label), contract.address
+            ),
+        )
+    reverse = deployed["ReverseRegistrar"] = _deploy(
+        w3, account, artifacts["ReverseRegistrar"], ens.address, resolver.address
+    )
+    _transact(
+        w3,
+        account,
+        ens.functions.setSubnodeOwner(
+            b"\x00" * 32, Web3.keccak(text="reverse"), account.address
+        ),
+    )
+    _transact(
+        w3,
+        account,
+        ens.functions.setSubnodeOwner(
+            namehash("reverse"), Web3.keccak(text="addr"), reverse.address
+        ),
+    )
+    return reverse, resolver
@@ -0,0 +1,134 @@
+"""Último bloque de la cadena, actualizado por un único hilo en segundo plano."""
+
+import logging
+import threading
+
+from web3.datastructures import AttributeDict
+
+logger = logging.getLogger(__name__)
+
+
+class ChainHead:
+    """
+    Keeps the header of the latest block up to date from a background poller.
+
+    Handlers read the head from memory instead of asking the node for the latest
+    block on every request. The head may lag the node by up to `poll_interval`
+    seconds.
+
+    Args:
+        w3 (Web3): The Web3 instance used to poll the node.
+        poll_interval (float): Seconds between polls.
+    """
+
+    def __init__(self, w3, poll_interval=0.5):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._block = None
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def number(self):
+        """int: Number of the latest block, or None if no block was seen yet."""
+        block = self._block
+        return None if block is None else block.number
+
+    def current(self):
+        """
+        Get the latest block seen.
+
+        Returns:
+            AttributeDict: The `number`, `hash`, `timestamp` and `gasLimit` of the
+            block, or None if no block was seen yet.
+        """
+        return self._block
+
+    def subscribe(self, listener):
+        """
+        Register a function called with the new header every time the head changes.
+
+        Args:
+            listener (callable): Receives the new block header.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def refresh(self):
+        """
+        Fetch the latest block from the node and update the head if it changed.
+
+        The node is the source of truth, so the head also moves backwards when the
+        chain was rewound (a reorg to a shorter chain, or `evm_revert` in Ganache).
+
+        Returns:
+            AttributeDict: The current head.
+        """
+        block = self.w3.eth.get_block("latest")
+        self._update(
+            AttributeDict(
+                {
+                    "number": block.number,
+                    "hash": block.hash,
+                    "timestamp": block.timestamp,
+                    "gasLimit": block.gasLimit,
+                }
+            ),
+            rewind=True,
+        )
+        return self._block
+
+    def observe(self, block):
+        """
+        Update the head with a block header read elsewhere, if it is newer.
+
+        A different hash at the same height (a reorg) also replaces the head. An
+        older block is ignored, since it may come from a lagging read; the poller
+        rewinds the head if the chain really went back.
+
+        Args:
+            block (AttributeDict): Header with `number`, `hash` and `timestamp`, and
+                optionally `gasLimit`.
+        """
+        self._update(block, rewind=False)
+
+    def _update(self, block, rewind):
+        with self._lock:
+            current = self._block
+            if current is not None and (
+                (block.number < current.number and not rewind)
+                or (block.number == current.number and block.hash == current.hash)
+            ):
+                return
+            self._block = block
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(block)
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error al notificar el bloque %d", block.number)
+
+    def start(self):
+        """Start polling the node in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="chain-head", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the background thread to stop and wait for it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error al leer el último bloque")
+            self._stop.wait(self.poll_interval)
@@ -0,0 +1,221 @@
+"""Configuración del servidor de API.
+
+Cada opción se toma de la línea de comandos o, si no se indica, de su variable de
+entorno (`CFP_*`). Los workers del modo producción reciben la configuración por el
+entorno, así que `export` la vuelca ahí antes de levantarlos.
+"""
+
+import argparse
+import os
+
+from eth_account import Account
+
+from validators import is_valid_mnemonic
+
+
+def flag(value):
+    """
+    Parse an on/off option, as written on the command line or in the environment.
+
+    Args:
+        value (str): `1`, `true`, `yes` or `on` to enable it; `0`, `false`, `no`,
+            `off` or empty to disable it.
+
+    Returns:
+        bool: Whether the option is enabled.
+
+    Raises:
+        ArgumentTypeError: If the value is none of the above.
+    """
+    text = value.strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("", "0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError(f"Valor no valido: {value}")
+
+
+# Opcion, variable de entorno, valor por defecto, tipo y ayuda
+OPTIONS = (
+    ("chain_backend", "CHAIN_BACKEND", "http", str, "Chain backend: http or tester"),
+    (
+        "node_url",
+        "CFP_NODE_URL",
+        "HTTP://127.0.0.1:7545",
+        str,
+        "URL of the node (comma separated for failover, primary first)",
+    ),
+    (
+        "node_pool_size",
+        "CFP_NODE_POOL_SIZE",
+        32,
+        int,
+        "Keep-alive connections kept open to each node",
+    ),
+    ("node_timeout", "CFP_NODE_TIMEOUT", 10.0, float, "Seconds to wait for a node"),
+    (
+        "node_read_timeout",
+        "CFP_NODE_READ_TIMEOUT",
+        2.0,
+        float,
+        "Seconds to wait for a node on each attempt of a read, before trying the next",
+    ),
+    (
+        "node_write_pin",
+        "CFP_NODE_WRITE_PIN",
+        10.0,
+        float,
+        "Seconds after a transaction during which reads go to the primary node first",
+    ),
+    ("network_id", "CFP_NETWORK_ID", "5777", str, "Network id of the deployment"),
+    (
+        "final_depth",
+        "CFP_FINAL_DEPTH",
+        12,
+        int,
+        "Blocks on top of a call or proposal after which it is cached as immutable",
+    ),
+    (
+        "build_dir",
+        "CFP_BUILD_DIR",
+        "../contract/build/contracts",
+        str,
+        "Directory with the truffle build artifacts",
+    ),
+    (
+        "bundle_file",
+        "CFP_BUNDLE_FILE",
+        "../contract/build/abi-bundle.pickle",
+        str,
+        "Compact ABI bundle written by abibundle.py, preferred over the artifacts",
+    ),
+    (
+        "index_file",
+        "CFP_INDEX_FILE",
+        "chain_index.sqlite3",
+        str,
+        "SQLite file of the chain index (its lock, nonce and write mark files go next "
+        "to it)",
+    ),
+    (
+        "timezone",
+        "CFP_TIMEZONE",
+        "America/Argentina/Buenos_Aires",
+        str,
+        "Time zone of the dates in the responses",
+    ),
+    ("mnemonic_file", "CFP_MNEMONIC_FILE", None, str, "File with the owner mnemonic"),
+    ("bind", "CFP_BIND", "127.0.0.1:5000", str, "Address the server listens on"),
+    # Solo para `python apiserver.py`: el depurador de Werkzeug ejecuta codigo
+    # arbitrario desde el navegador, nunca se habilita por defecto
+    (
+        "debug",
+        "CFP_DEBUG",
+        False,
+        flag,
+        "Run the development server in debug mode: 1 or 0",
+    ),
+    ("workers", "CFP_WORKERS", 4, int, "Number of worker processes"),
+    ("threads", "CFP_THREADS", 8, int, "Number of threads per worker"),
+    # Cada cliente de /events ocupa un hilo del worker mientras esta conectado: el tope
+    # tiene que quedar por debajo de --threads para que el resto de la API siga
+    # respondiendo. Pasado el tope, /events responde 503
+    (
+        "max_event_clients",
+        "CFP_MAX_EVENT_CLIENTS",
+        4,
+        int,
+        "Clients of /events served at once by each worker (keep it below --threads)",
+    ),
+    (
+        "signature_workers",
+        "CFP_SIGNATURE_WORKERS",
+        None,
+        int,
+        "Processes used to recover signatures (2 if not set; 0 recovers in the "
+        "request thread)",
+    ),
+    (
+        "slow_request_ms",
+        "CFP_SLOW_REQUEST_MS",
+        None,
+        float,
+        "Log requests slower than this, with the time spent in each phase",
+    ),
+    (
+        "metrics_dir",
+        "CFP_METRICS_DIR",
+        None,
+        str,
+        "Directory where the worker processes share their metrics (a temporary "
+        "one if not set)",
+    ),
+)
+
+
+def add_arguments(parser):
+    """
+    Add every option to an argument parser, with its default taken from the environment.
+
+    Args:
+        parser (ArgumentParser): The parser to extend.
+    """
+    for name, variable, default, kind, help_text in OPTIONS:
+        value = os.environ.get(variable)
+        parser.add_argument(
+            f"--{name}",
+            type=kind,
+            default=default if value is None else kind(value),
+            help=f"{help_text} (env {variable})",
+        )
+
+
+def load(argv=None):
+    """
+    Read the configuration.
+
+    Args:
+        argv (list): Command line arguments; None reads only the environment.
+
+    Returns:
+        Namespace: The value of every option.
+    """
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args([] if argv is None else argv)
+
+
+def export(settings):
+    """
+    Write the configuration to the environment, so child processes read the same one.
+
+    Args:
+        settings (Namespace): The configuration returned by `load`.
+    """
+    for name, variable, _, _, _ in OPTIONS:
+        value = getattr(settings, name)
+        if value is not None:
+            os.environ[variable] = str(value)
+
+
+def load_owner(mnemonic_file):
+    """
+    Derive the factory owner account from the mnemonic stored in a file.
+
+    Args:
+        mnemonic_file (str): Path to the file containing the mnemonic.
+
+    Returns:
+        LocalAccount: The first account of the mnemonic.
+
+    Raises:
+        ValueError: If the mnemonic is not valid.
+    """
+    with open(mnemonic_file, "r", encoding="utf-8") as file:
+        mnemonic = file.read().strip()
+
+    # Verificamos que la semilla sea valida
+    if not is_valid_mnemonic(mnemonic):
+        raise ValueError("La semilla no es válida")
+    Account.enable_unaudited_hdwallet_features()
+    return Account.from_mnemonic(mnemonic, account_path="m/44'/60'/0'/0/0")
@@ -0,0 +1,64 @@
+"""Configuración de pytest.
+
+Con `CHAIN_BACKEND=tester` las pruebas no necesitan Ganache, solc ni el servidor
+levantado: el servidor se importa con una cadena en memoria en la que despliega los
+contratos (los de `testcontracts/` si no hay un build de truffle compilado), y las
+peticiones de `requests` a `test_apiserver.SERVER` se le entregan directamente al
+cliente de pruebas de Flask.
+
+    CHAIN_BACKEND=tester python -m pytest -q
+
+Las pruebas de los módulos internos (`test_chainhead.py`, `test_indexer.py`, ...)
+usan siempre su propia cadena en memoria, a través del fixture `tester_chain`.
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from eth_account import Account
+
+import chain
+import config
+
+IN_PROCESS = os.environ.get("CHAIN_BACKEND") == "tester"
+
+
+@pytest.fixture
+def tester_chain():
+    """A new in-process chain with the contracts deployed by a new owner."""
+    w3 = chain.connect("tester", None)
+    owner = Account.create()
+    build_dir, network_id = chain.deploy_artifacts(
+        w3, chain.source_build_dir(config.load().build_dir), owner
+    )
+    return SimpleNamespace(w3=w3, owner=owner, build_dir=build_dir, network_id=network_id)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def in_process_server():
+    """Serve the tests from the in-process chain when `CHAIN_BACKEND=tester`."""
+    if not IN_PROCESS:
+        yield
+        return
+
+    # pylint: disable=C0415
+    import apiserver
+    import test_apiserver
+    from inprocess import serve_in_process
+
+    class NodeAccount(Account):
+        """Fresh account that the node can sign for, like the Ganache accounts."""
+
+        @classmethod
+        def create(cls, extra_entropy=""):
+            account = Account.create(extra_entropy)
+            chain.unlock_account(apiserver.w3, account)
+            return account
+
+    apiserver.start_services(apiserver.deployer)
+    with pytest.MonkeyPatch.context() as patch:
+        # Las pruebas crean las cuentas de los usuarios con Account().create()
+        patch.setattr(test_apiserver, "Account", NodeAccount)
+        with serve_in_process(apiserver.app, test_apiserver.SERVER):
+            yield
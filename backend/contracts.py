@@ -0,0 +1,303 @@
+"""Registro de contratos compartido por todo el proceso del servidor de API."""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from web3.logs import DISCARD
+
+from abibundle import compact, load_bundle
+from txmanager import GAS_MARGIN
+
+logger = logging.getLogger(__name__)
+
+# Tope de propuestas por transaccion; en cadenas con poco gas por bloque entran menos
+PROPOSALS_PER_TRANSACTION = 100
+# Gas estimado de cada propuesta en CFP.registerProposals (3 slots, el indice y el evento)
+GAS_PER_PROPOSAL = 90_000
+# Gas de la transaccion sin propuestas (base, calldata y la llamada al contrato)
+GAS_PER_TRANSACTION = 50_000
+
+
+class ContractRegistry:
+    """
+    Process-wide registry of the CFPFactory and CFP contract objects.
+
+    The truffle build artifacts are parsed once, on first use (or from `warm`), and
+    the per-address CFP contract objects are kept in a bounded LRU, so handlers never
+    touch the filesystem. A missing artifact therefore does not stop the server from
+    starting; it only fails the requests that need the contracts.
+
+    If the compact bundle written by `abibundle.py` exists and is not older than the
+    artifacts, it is read instead of them.
+
+    Args:
+        w3 (Web3): The Web3 instance used to build the contract objects.
+        factory_file (str): Path to the CFPFactory truffle artifact.
+        cfp_file (str): Path to the CFP truffle artifact.
+        multicall_file (str): Optional path to the Multicall truffle artifact.
+        network_id (str): Network id used to look up the deployed factory address.
+        max_size (int): Maximum number of CFP contract objects kept in the LRU.
+        check_interval (float): Minimum seconds between artifact change checks.
+        bundle_file (str): Optional path to the compact ABI bundle.
+    """
+
+    def __init__(
+        self,
+        w3,
+        factory_file,
+        cfp_file,
+        multicall_file=None,
+        network_id="5777",
+        max_size=256,
+        check_interval=2.0,
+        bundle_file=None,
+    ):
+        self.w3 = w3
+        self.factory_file = factory_file
+        self.cfp_file = cfp_file
+        self.multicall_file = multicall_file
+        self.bundle_file = bundle_file
+        self.network_id = network_id
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._cfp_contracts = OrderedDict()
+        self._mtimes = None
+        self._failed_mtimes = None
+        self._last_check = 0.0
+
+        self._factory_address = None
+        self._factory = None
+        self._cfp_abi = None
+        self._multicall = None
+        self._topics = {}
+
+    @property
+    def factory_address(self):
+        """str: Address of the deployed CFPFactory."""
+        self.warm()
+        return self._factory_address
+
+    @property
+    def factory(self):
+        """Contract: The CFPFactory contract object."""
+        self.warm()
+        return self._factory
+
+    @property
+    def cfp_abi(self):
+        """list: ABI of the CFP contract."""
+        self.warm()
+        return self._cfp_abi
+
+    @property
+    def multicall(self):
+        """Contract: The Multicall contract object, or None if it is not deployed."""
+        self.warm()
+        return self._multicall
+
+    def event_topic(self, contract_name, event_name):
+        """
+        Get the precomputed topic of an event.
+
+        Args:
+            contract_name (str): `CFPFactory`, `CFP` or `Multicall`.
+            event_name (str): Name of the event, e.g. `ProposalRegistered`.
+
+        Returns:
+            str: The hex topic of the event.
+
+        Raises:
+            ValueError: If the contract does not define the event.
+        """
+        self.warm()
+        for event_signature, topic in self._topics.get(contract_name, {}).items():
+            if event_signature.split("(")[0] == event_name:
+                return topic
+        raise ValueError(f"El ABI de {contract_name} no define el evento {event_name}")
+
+    def warm(self):
+        """Load the build artifacts if they were not loaded yet."""
+        if self._mtimes is not None:
+            return
+        with self._load_lock:
+            if self._mtimes is None:
+                self.reload()
+
+    def reload(self):
+        """
+        Re-read the build artifacts and drop every cached contract object.
+
+        This is the hot-reload hook to call after `truffle migrate` rewrites the
+        build directory. If the artifacts can not be read, nothing changes.
+
+        Raises:
+            OSError: If an artifact can not be read.
+            ValueError: If an artifact is not valid JSON.
+            KeyError: If the factory is not deployed on `network_id`.
+        """
+        # Antes de leer: si cambian mientras se leen, la proxima revision los recarga
+        mtimes = self._artifact_mtimes()
+        contracts = self._read_contracts()
+        factory_data = contracts["CFPFactory"]
+
+        factory_address = factory_data["networks"][self.network_id]
+        factory = self.w3.eth.contract(address=factory_address, abi=factory_data["abi"])
+        multicall = None
+        multicall_address = contracts.get("Multicall", {}).get("networks", {}).get(
+            self.network_id
+        )
+        if multicall_address is not None:
+            multicall = self.w3.eth.contract(
+                address=multicall_address, abi=contracts["Multicall"]["abi"]
+            )
+
+        with self._lock:
+            self._factory_address = factory_address
+            self._factory = factory
+            self._cfp_abi = contracts["CFP"]["abi"]
+            self._multicall = multicall
+            self._topics = {name: data["topics"] for name, data in contracts.items()}
+            self._cfp_contracts.clear()
+            self._mtimes = mtimes
+
+    def reload_if_changed(self):
+        """
+        Reload the artifacts if they were modified since the last load.
+
+        The check is throttled to once every `check_interval` seconds so it can be
+        called on every request. If the new artifacts can not be loaded (e.g. truffle
+        is still writing them), the error is logged and the previous contracts are
+        kept until the artifacts change again.
+
+        Returns:
+            bool: True if the artifacts were reloaded, False otherwise.
+        """
+        now = monotonic()
+        if self._mtimes is None or now - self._last_check < self.check_interval:
+            # Si aun no se cargaron, se leeran de disco al usarlos por primera vez
+            return False
+        self._last_check = now
+
+        try:
+            mtimes = self._artifact_mtimes()
+        except OSError:
+            # Truffle puede estar reescribiendo el directorio build
+            return False
+        if mtimes in (self._mtimes, self._failed_mtimes):
+            return False
+
+        try:
+            self.reload()
+        except Exception:  # pylint: disable=W0718
+            self._failed_mtimes = mtimes
+            logger.exception(
+                "No se pudieron recargar los artefactos, se siguen usando los anteriores"
+            )
+            return False
+        return True
+
+    def cfp(self, address):
+        """
+        Get the CFP contract object deployed at the given address.
+
+        Args:
+            address (str): Address of the CFP contract.
+
+        Returns:
+            Contract: The cached (or newly built) CFP contract object.
+        """
+        self.warm()
+        with self._lock:
+            contract = self._cfp_contracts.get(address)
+            if contract is not None:
+                self._cfp_contracts.move_to_end(address)
+                self.hits += 1
+                return contract
+            self.misses += 1
+
+            contract = self.w3.eth.contract(address=address, abi=self._cfp_abi)
+            self._cfp_contracts[address] = contract
+            if len(self._cfp_contracts) > self.max_size:
+                self._cfp_contracts.popitem(last=False)
+            return contract
+
+    def _artifact_files(self):
+        """Map each contract name to its truffle artifact, if it exists."""
+        files = {"CFPFactory": self.factory_file, "CFP": self.cfp_file}
+        if self.multicall_file is not None and os.path.exists(self.multicall_file):
+            files["Multicall"] = self.multicall_file
+        return files
+
+    def _use_bundle(self):
+        if self.bundle_file is None or not os.path.exists(self.bundle_file):
+            return False
+        # Un paquete anterior al ultimo `truffle migrate` tiene direcciones viejas
+        bundle_mtime = os.stat(self.bundle_file).st_mtime_ns
+        return all(
+            os.stat(path).st_mtime_ns <= bundle_mtime
+            for path in self._artifact_files().values()
+            if os.path.exists(path)
+        )
+
+    def _read_contracts(self):
+        """Read the compacted contracts from the bundle or from the artifacts."""
+        if self._use_bundle():
+            return load_bundle(self.bundle_file)
+        contracts = {}
+        for name, path in self._artifact_files().items():
+            with open(path, encoding="utf-8") as artifact:
+                contracts[name] = compact(json.load(artifact))
+        return contracts
+
+    def _artifact_mtimes(self):
+        # Con el paquete alcanza: los artefactos pueden no estar en el servidor
+        files = list(self._artifact_files().values()) + [self.bundle_file]
+        return tuple(
+            os.stat(path).st_mtime_ns if path and os.path.exists(path) else None
+            for path in files
+        )
+
+
+def proposals_fitting(gas_limit):
+    """
+    Get how many proposals a single `CFP.registerProposals` transaction can take.
+
+    The transaction manager adds `GAS_MARGIN` to the estimated gas, and the result
+    must still fit in the gas limit of a block (6,721,975 in Ganache).
+
+    Args:
+        gas_limit (int): The gas limit of the latest block.
+
+    Returns:
+        int: Between 1 and `PROPOSALS_PER_TRANSACTION`.
+    """
+    fitting = (gas_limit / GAS_MARGIN - GAS_PER_TRANSACTION) // GAS_PER_PROPOSAL
+    return max(1, min(PROPOSALS_PER_TRANSACTION, int(fitting)))
+
+
+def logged_proposals(cfp_contract, receipt):
+    """
+    Get the proposals registered by a transaction, from its `ProposalRegistered` logs.
+
+    Args:
+        cfp_contract (Contract): The CFP the proposals were sent to.
+        receipt (AttributeDict): The receipt of the mined transaction.
+
+    Returns:
+        set: The raw bytes of each proposal registered.
+    """
+    event = cfp_contract.events.ProposalRegistered()
+    return {
+        bytes(log["args"]["proposal"])
+        for log in event.process_receipt(receipt, errors=DISCARD)
+        if log["address"] == cfp_contract.address
+    }
@@ -0,0 +1,249 @@
+"""Difusión de los llamados y propuestas nuevos a los clientes conectados (SSE).
+
+Un único `EventHub` por proceso lee del índice local lo que el indexador agregó en
+cada vuelta y lo reparte a todas las suscripciones, así los clientes dejan de
+consultar `/calls` periódicamente y el nodo recibe las mismas peticiones sin importar
+cuántos estén conectados. Cada evento se serializa una sola vez, en el formato de
+Server-Sent Events, y se comparte entre todas las suscripciones que lo aceptan.
+"""
+
+import json
+import queue
+import threading
+from collections import namedtuple
+
+Event = namedtuple("Event", ("call_id", "creator", "frame"))
+
+
+class TooManySubscribers(Exception):
+    """Raised when the hub already serves its maximum number of subscriptions."""
+
+
+def sse_frame(name, data):
+    """
+    Serialize an event in the Server-Sent Events format.
+
+    Args:
+        name (str): The event type.
+        data (dict): The payload, sent as JSON.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def block_end_frame(block_number):
+    """
+    Get the message that marks a block as delivered.
+
+    It carries only the `id` field, so the client records the block as its last
+    event ID (and sends it back in `Last-Event-ID` when it reconnects) without
+    dispatching an event.
+    """
+    return f"id: {block_number}\n\n".encode()
+
+
+class Subscription:
+    """
+    The events a client receives, optionally only those of one creator or call.
+
+    Args:
+        creator (str): Checksum address; only its calls and their proposals are sent.
+        call_id (str): Only this call and its proposals are sent.
+        max_blocks (int): Blocks buffered for a slow client before dropping it.
+    """
+
+    def __init__(self, creator=None, call_id=None, max_blocks=1000):
+        self.creator = creator
+        self.call_id = call_id.lower() if call_id else None
+        self.dropped = False
+        self._queue = queue.Queue(maxsize=max_blocks)
+
+    def matches(self, event):
+        """Check if the event passes the filters of the subscription."""
+        return (self.creator is None or event.creator == self.creator) and (
+            self.call_id is None or event.call_id == self.call_id
+        )
+
+    def frames(self, block_number, events):
+        """
+        Encode the events of a block that pass the filters.
+
+        Args:
+            block_number (int): The block of the events, or None for notifications
+                that do not come from a block and can not be resumed.
+            events (list): The `Event` of the block.
+
+        Returns:
+            bytes: The matching events followed by the ID of the block.
+        """
+        frames = b"".join(event.frame for event in events if self.matches(event))
+        if block_number is None:
+            return frames
+        return frames + block_end_frame(block_number)
+
+    def push(self, block):
+        """Queue a (block_number, events) pair, dropping the client if it lags."""
+        try:
+            self._queue.put_nowait(block)
+        except queue.Full:
+            # Al reconectarse con Last-Event-ID recupera desde el indice lo que falta
+            self.dropped = True
+
+    def get(self, timeout):
+        """
+        Wait for the next block.
+
+        Returns:
+            tuple: (block_number, events), or None if nothing arrived in time.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """
+    Fans out the calls and proposals added to a `CallIndex` to the subscriptions.
+
+    `poll` is meant to be registered as a listener of the `ChainIndexer`, so the
+    index is read only when the indexer may have advanced it, and `rewind` as one
+    of its rollback listeners, so the blocks re-indexed after a reorg are published
+    again even if the index gets past the last published block in the same round.
+    Events of orphaned blocks already sent are not retracted.
+
+    Usage:
+        hub = EventHub(call_index, format_time)
+        indexer.listeners.append(hub.poll)
+        indexer.rollback_listeners.append(hub.rewind)
+        subscription, cursor = hub.subscribe(creator=address)
+        for block_number, events in hub.replay(last_event_id, cursor):
+            ...
+        block = subscription.get(timeout=15)
+
+    Args:
+        index (CallIndex): The index the events are read from.
+        format_time (callable): Formats a unix timestamp for the clients.
+        replay_blocks (int): Blocks read from the index per query when replaying.
+        max_subscribers (int): Subscriptions served at once; None for no limit.
+    """
+
+    def __init__(self, index, format_time, replay_blocks=1000, max_subscribers=None):
+        self.index = index
+        self.format_time = format_time
+        self.replay_blocks = replay_blocks
+        self.max_subscribers = max_subscribers
+
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._cursor = index.synced_block
+
+    def subscribe(self, creator=None, call_id=None):
+        """
+        Start receiving the events of the blocks the index adds from now on.
+
+        Returns:
+            tuple: The `Subscription` and the last block already published, which is
+            where a replay from the index must stop.
+
+        Raises:
+            TooManySubscribers: If `max_subscribers` subscriptions are already open.
+        """
+        subscription = Subscription(creator, call_id)
+        with self._lock:
+            if (
+                self.max_subscribers is not None
+                and len(self._subscriptions) >= self.max_subscribers
+            ):
+                raise TooManySubscribers()
+            self._subscriptions.add(subscription)
+            return subscription, self._cursor
+
+    def unsubscribe(self, subscription):
+        """Stop sending events to a subscription."""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def poll(self):
+        """Publish the events of the blocks indexed since the last call."""
+        synced_block = self.index.synced_block
+        with self._lock:
+            if synced_block <= self._cursor:
+                return
+            blocks = self._read(self._cursor, synced_block)
+            self._cursor = synced_block
+            for subscription in self._subscriptions:
+                for block in blocks:
+                    subscription.push(block)
+
+    def rewind(self):
+        """Publish again, once re-indexed, the blocks discarded by the last rollback."""
+        with self._lock:
+            self._cursor = min(self._cursor, self.index.rolled_back_to)
+
+    def notify(self, name, events):
+        """
+        Send an event that does not come from the index, like the closing of a call.
+
+        Clients that are not connected when it is sent do not get it on resume.
+
+        Args:
+            name (str): The event type.
+            events (list): (call_id, creator, data) of each event.
+        """
+        notification = [
+            Event(call_id, creator, sse_frame(name, data))
+            for call_id, creator, data in events
+        ]
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription.push((None, notification))
+
+    def replay(self, after_block, up_to_block):
+        """
+        Iterate over the events already in the index, for a client that resumes.
+
+        Args:
+            after_block (int): Last block the client saw.
+            up_to_block (int): Cursor returned by `subscribe`; later blocks reach the
+                client through its subscription.
+
+        Yields:
+            tuple: (block_number, events) for each block with events, in order.
+        """
+        while after_block < up_to_block:
+            window_end = min(up_to_block, after_block + self.replay_blocks)
+            yield from self._read(after_block, window_end)
+            after_block = window_end
+
+    def _read(self, after_block, up_to_block):
+        calls, proposals = self.index.changes_between(after_block, up_to_block)
+        blocks = {}
+        # En un mismo bloque el llamado se publica antes que sus propuestas
+        for block_number, call_id, creator, cfp, closing_time in calls:
+            frame = sse_frame(
+                "CFPCreated",
+                {
+                    "callId": call_id,
+                    "creator": creator,
+                    "cfp": cfp,
+                    "closingTime": self.format_time(closing_time),
+                    "blockNumber": block_number,
+                },
+            )
+            blocks.setdefault(block_number, []).append(Event(call_id, creator, frame))
+        for block_number, call_id, creator, proposal, sender, timestamp in proposals:
+            frame = sse_frame(
+                "ProposalRegistered",
+                {
+                    "callId": call_id,
+                    "proposal": proposal,
+                    "sender": sender,
+                    "blockNumber": block_number,
+                    "timestamp": self.format_time(timestamp),
+                },
+            )
+            blocks.setdefault(block_number, []).append(Event(call_id, creator, frame))
+        return sorted(blocks.items())
@@ -0,0 +1,602 @@
+"""Indice local de llamados y propuestas alimentado por los eventos de los contratos."""
+
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+
+from web3.exceptions import BlockNotFound
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_id TEXT NOT NULL UNIQUE,
+    creator TEXT NOT NULL,
+    cfp TEXT NOT NULL,
+    closing_time INTEGER NOT NULL,
+    block_number INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_cfp ON calls (cfp);
+CREATE INDEX IF NOT EXISTS calls_creator ON calls (creator);
+CREATE INDEX IF NOT EXISTS calls_block ON calls (block_number);
+
+CREATE TABLE IF NOT EXISTS proposals (
+    call_id TEXT NOT NULL,
+    proposal TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (call_id, proposal)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS proposals_block ON proposals (block_number);
+
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def normalize_call_id(call_id):
+    """
+    Normalize a call ID (hex string or bytes) to the key used by the index.
+
+    Args:
+        call_id (str | bytes): The call ID.
+
+    Returns:
+        str: The call ID as a lowercase, 0x-prefixed hex string.
+    """
+    if isinstance(call_id, (bytes, bytearray)):
+        return "0x" + bytes(call_id).hex()
+    return call_id.lower()
+
+
+class CallIndex:
+    """
+    SQLite store of the calls and proposals seen on chain.
+
+    Calls are returned with the same shape as `CFPFactory.calls()` and proposals
+    with the same shape as `CFP.proposalData()`, so handlers can use either source
+    interchangeably. The hash of the last processed blocks is kept so the indexer
+    can resume after a restart and roll back rows orphaned by a reorg.
+
+    `calls_version` and `proposals_version` grow every time calls or proposals are
+    added or removed, so readers can tell whether a listing changed without
+    reading it. `rollbacks` grows every time indexed rows are discarded (a reorg,
+    or another factory), so readers can drop what they derived from them;
+    `rolled_back_to` is the last block kept by the latest rollback.
+
+    Args:
+        path (str): Path of the database file, or ":memory:".
+        keep_blocks (int): Number of block hashes kept to detect reorgs.
+    """
+
+    def __init__(self, path=":memory:", keep_blocks=256):
+        self.keep_blocks = keep_blocks
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        self.synced_block = -1
+        self.calls_version = 0
+        self.proposals_version = 0
+        self.rollbacks = 0
+        self.rolled_back_to = -1
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-read the last processed block, the versions of the calls and proposals and
+        the rollbacks, which another process may have advanced.
+        """
+        with self._lock:
+            meta = dict(
+                self._db.execute(
+                    "SELECT key, value FROM meta WHERE key IN ('synced_block', "
+                    "'calls_version', 'proposals_version', 'rollbacks', "
+                    "'rolled_back_to')"
+                ).fetchall()
+            )
+        self.synced_block = int(meta.get("synced_block", -1))
+        self.calls_version = int(meta.get("calls_version", 0))
+        self.proposals_version = int(meta.get("proposals_version", 0))
+        self.rollbacks = int(meta.get("rollbacks", 0))
+        self.rolled_back_to = int(meta.get("rolled_back_to", -1))
+
+    def bind(self, factory_address):
+        """
+        Tie the index to a factory deployment, wiping it if it belonged to another.
+
+        Args:
+            factory_address (str): Address of the CFPFactory being indexed.
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'factory'"
+            ).fetchone()
+            if row and row[0] == factory_address:
+                return
+            if row:
+                logger.info("Nueva factoria %s, se descarta el indice", factory_address)
+            for table in ("calls", "proposals", "blocks"):
+                self._db.execute(f"DELETE FROM {table}")
+            # Las versiones siguen creciendo para no repetir las del indice descartado
+            self._db.execute(
+                "DELETE FROM meta WHERE key NOT IN "
+                "('calls_version', 'proposals_version', 'rollbacks')"
+            )
+            self._db.execute(
+                "INSERT INTO meta (key, value) VALUES ('factory', ?)", (factory_address,)
+            )
+            self.calls_version = self._bump_version("calls_version")
+            self.proposals_version = self._bump_version("proposals_version")
+            if row:
+                self.rollbacks = self._bump_version("rollbacks")
+            self.synced_block = -1
+            self.rolled_back_to = -1
+
+    def apply(self, block_number, block_hash, calls, proposals):
+        """
+        Store the calls and proposals of a block range in a single transaction.
+
+        Args:
+            block_number (int): Last block of the processed range.
+            block_hash (str): Hash of `block_number`, used to detect reorgs.
+            calls (list): (call, block_number) pairs, with `call` shaped as in
+                `CFPFactory.calls()`.
+            proposals (list): (call_id, proposal, data) triples, with `data` shaped
+                as in `CFP.proposalData()`.
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO calls "
+                "(call_id, creator, cfp, closing_time, block_number) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (normalize_call_id(call[2]), call[0], call[1], call[3], number)
+                    for call, number in calls
+                ],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO proposals "
+                "(call_id, proposal, sender, block_number, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (normalize_call_id(call_id), normalize_call_id(proposal), *data)
+                    for call_id, proposal, data in proposals
+                ],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO blocks (number, hash) VALUES (?, ?)",
+                (block_number, block_hash),
+            )
+            self._db.execute(
+                "DELETE FROM blocks WHERE number <= ?",
+                (block_number - self.keep_blocks,),
+            )
+            if calls:
+                self.calls_version = self._bump_version("calls_version")
+            if proposals:
+                self.proposals_version = self._bump_version("proposals_version")
+            self._set_synced_block(block_number)
+
+    def rollback(self, block_number):
+        """
+        Drop every row recorded after `block_number`.
+
+        Args:
+            block_number (int): Last block that is still part of the canonical chain.
+        """
+        with self._lock, self._db:
+            for table in ("calls", "proposals"):
+                self._db.execute(
+                    f"DELETE FROM {table} WHERE block_number > ?", (block_number,)
+                )
+            self._db.execute("DELETE FROM blocks WHERE number > ?", (block_number,))
+            self.calls_version = self._bump_version("calls_version")
+            self.proposals_version = self._bump_version("proposals_version")
+            self.rollbacks = self._bump_version("rollbacks")
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('rolled_back_to', ?)",
+                (str(block_number),),
+            )
+            self.rolled_back_to = block_number
+            self._set_synced_block(block_number)
+
+    def checkpoints(self):
+        """Return the recorded (number, hash) pairs, most recent first."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT number, hash FROM blocks ORDER BY number DESC"
+            ).fetchall()
+
+    def get_call(self, call_id):
+        """Return the indexed call for `call_id`, or None if it is not indexed."""
+        row = self._lookup(
+            "SELECT creator, cfp, call_id, closing_time FROM calls WHERE call_id = ?",
+            (normalize_call_id(call_id),),
+        )
+        return self._call_from_row(row) if row else None
+
+    def get_call_block(self, call_id):
+        """Return the block that created `call_id`, or None if it is not indexed."""
+        row = self._fetchone(
+            "SELECT block_number FROM calls WHERE call_id = ?",
+            (normalize_call_id(call_id),),
+        )
+        return row[0] if row else None
+
+    def get_call_by_cfp(self, cfp_address):
+        """Return the call ID whose CFP contract is `cfp_address`, or None."""
+        row = self._fetchone("SELECT call_id FROM calls WHERE cfp = ?", (cfp_address,))
+        return row[0] if row else None
+
+    def get_closing_time(self, call_id):
+        """Return the indexed closing time for `call_id`, or None if it is not indexed."""
+        row = self._lookup(
+            "SELECT closing_time FROM calls WHERE call_id = ?",
+            (normalize_call_id(call_id),),
+        )
+        return row[0] if row else None
+
+    def get_proposal(self, call_id, proposal):
+        """Return the indexed proposal data, or None if it is not indexed."""
+        row = self._lookup(
+            "SELECT sender, block_number, timestamp FROM proposals "
+            "WHERE call_id = ? AND proposal = ?",
+            (normalize_call_id(call_id), normalize_call_id(proposal)),
+        )
+        return tuple(row) if row else None
+
+    def calls_list(self):
+        """Return every indexed call, in creation order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT creator, cfp, call_id, closing_time FROM calls ORDER BY position"
+            ).fetchall()
+        return [self._call_from_row(row) for row in rows]
+
+    def calls_page(self, creator, offset, limit):
+        """
+        Return a page of the indexed calls, in creation order.
+
+        Args:
+            creator (str): Only list the calls of this creator, or None for all.
+            offset (int): Position of the first call of the page.
+            limit (int): Maximum number of calls in the page.
+
+        Returns:
+            tuple: The calls of the page and the total number of matching calls.
+        """
+        where, params = ("WHERE creator = ?", (creator,)) if creator else ("", ())
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT creator, cfp, call_id, closing_time FROM calls "
+                f"{where} ORDER BY position LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+            total = self._db.execute(
+                f"SELECT COUNT(*) FROM calls {where}", params
+            ).fetchone()[0]
+        return [self._call_from_row(row) for row in rows], total
+
+    def iter_proposals(self, chunk_size=1000):
+        """
+        Iterate over every indexed proposal, reading `chunk_size` rows at a time.
+
+        Args:
+            chunk_size (int): Number of rows read from the database per query.
+
+        Yields:
+            tuple: (call_id, proposal, sender, block_number, timestamp).
+        """
+        last = ("", "")
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT call_id, proposal, sender, block_number, timestamp "
+                    "FROM proposals WHERE (call_id, proposal) > (?, ?) "
+                    "ORDER BY call_id, proposal LIMIT ?",
+                    (*last, chunk_size),
+                ).fetchall()
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1][:2]
+
+    def changes_between(self, after_block, up_to_block):
+        """
+        Return the calls and proposals recorded in a range of blocks, in chain order.
+
+        Args:
+            after_block (int): The range starts after this block.
+            up_to_block (int): Last block of the range, included.
+
+        Returns:
+            tuple: The calls, as (block_number, call_id, creator, cfp, closing_time),
+            and the proposals, as (block_number, call_id, creator, proposal, sender,
+            timestamp) with the `creator` of their call.
+        """
+        with self._lock:
+            calls = self._db.execute(
+                "SELECT block_number, call_id, creator, cfp, closing_time FROM calls "
+                "WHERE block_number > ? AND block_number <= ? ORDER BY position",
+                (after_block, up_to_block),
+            ).fetchall()
+            proposals = self._db.execute(
+                "SELECT p.block_number, p.call_id, c.creator, p.proposal, p.sender, "
+                "p.timestamp FROM proposals p JOIN calls c ON c.call_id = p.call_id "
+                "WHERE p.block_number > ? AND p.block_number <= ? "
+                "ORDER BY p.block_number",
+                (after_block, up_to_block),
+            ).fetchall()
+        return calls, proposals
+
+    def _fetchone(self, query, params):
+        with self._lock:
+            return self._db.execute(query, params).fetchone()
+
+    def _lookup(self, query, params):
+        # Igual que _fetchone, pero cuenta aciertos y fallos de las consultas de los handlers
+        with self._lock:
+            row = self._db.execute(query, params).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return row
+
+    def _set_synced_block(self, block_number):
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_block', ?)",
+            (str(block_number),),
+        )
+        self.synced_block = block_number
+
+    def _bump_version(self, key):
+        # Cada cambio de las filas incrementa la version, que identifica su contenido
+        # sin leerlo (p. ej. para las respuestas cacheadas del servidor)
+        self._db.execute(
+            "INSERT INTO meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (key,),
+        )
+        return int(
+            self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+        )
+
+    @staticmethod
+    def _call_from_row(row):
+        creator, cfp, call_id, closing_time = row
+        return (creator, cfp, bytes.fromhex(call_id[2:]), closing_time)
+
+
+class ChainIndexer:
+    """
+    Background indexer that follows `CFPCreated` and `ProposalRegistered` logs.
+
+    The indexer processes the chain block range by block range and records the
+    last fully processed block in `index.synced_block`. Handlers should only trust
+    the index for lookups that hit; misses must fall back to a direct call, since
+    the index may lag the node by up to `poll_interval` seconds.
+
+    When several server processes share the same index file, `lock_path` elects a
+    single writer: the process holding the lock follows the chain and the others
+    only re-read how far it got.
+
+    The callables in `listeners` are called after each round, once the index (or
+    what this process knows of it) may have advanced. The ones in
+    `rollback_listeners` are called when indexed rows were discarded, by this
+    process or by the one that writes the index.
+
+    Args:
+        w3 (Web3): The Web3 instance used to read the logs.
+        registry (ContractRegistry): Registry providing the contract objects.
+        index (CallIndex): Store where the indexed data is written.
+        poll_interval (float): Seconds to wait between polls once caught up.
+        batch_size (int): Maximum number of blocks requested per `eth_getLogs`.
+        lock_path (str): File locked by the process that writes the index; None if
+            this process is the only one using it.
+    """
+
+    def __init__(
+        self,
+        w3,
+        registry,
+        index,
+        poll_interval=1.0,
+        batch_size=2000,
+        lock_path=None,
+    ):
+        self.w3 = w3
+        self.registry = registry
+        self.index = index
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lock_path = lock_path
+        self.head_block = None
+        self.listeners = []
+        self.rollback_listeners = []
+        self._lock_file = None
+        self._rollbacks = index.rollbacks
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start following the chain in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="chain-indexer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Ask the background thread to stop and wait for it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_synced(self):
+        """
+        Check if the index has caught up with the latest block seen on the node.
+
+        Returns:
+            bool: True if the index can be used to answer listing requests.
+        """
+        if self.head_block is None:
+            return False
+        return self.index.synced_block >= self.head_block
+
+    def sync_once(self):
+        """
+        Process the next range of blocks.
+
+        Returns:
+            bool: True if there are still blocks left to process.
+        """
+        self.index.bind(self.registry.factory_address)
+        self.head_block = self.w3.eth.block_number
+        self._check_reorg()
+        self._notify_rollbacks()
+
+        from_block = self.index.synced_block + 1
+        if from_block > self.head_block:
+            return False
+        to_block = min(self.head_block, from_block + self.batch_size - 1)
+
+        # Primero los llamados: una propuesta nunca precede a la creacion de su CFP
+        created = self.registry.factory.events.CFPCreated().get_logs(
+            fromBlock=from_block, toBlock=to_block
+        )
+        calls = [self._decode_call(log) for log in created]
+        new_cfps = {call[1]: normalize_call_id(call[2]) for call, _ in calls}
+
+        registered = self.w3.eth.get_logs(
+            {
+                "fromBlock": from_block,
+                "toBlock": to_block,
+                "topics": [self._proposal_topic()],
+            }
+        )
+        proposals = []
+        block_timestamps = {}
+        for log in registered:
+            # Solo nos interesan los eventos emitidos por CFPs creados por la factoria
+            call_id = new_cfps.get(log["address"]) or self.index.get_call_by_cfp(
+                log["address"]
+            )
+            if call_id is not None:
+                proposals.append(self._decode_proposal(call_id, log, block_timestamps))
+
+        block_hash = self.w3.eth.get_block(to_block).hash.hex()
+        self.index.apply(to_block, block_hash, calls, proposals)
+        return to_block < self.head_block
+
+    def is_leader(self):
+        """
+        Check if this process writes the index, taking the lock if it is free.
+
+        Returns:
+            bool: True if this process should follow the chain.
+        """
+        if self.lock_path is None or self._lock_file is not None:
+            return True
+        lock_file = os.fdopen(os.open(self.lock_path, os.O_RDWR | os.O_CREAT), "r+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        # El lock se libera solo cuando el proceso termina
+        self._lock_file = lock_file
+        logger.info("Este proceso escribe el indice (pid %s)", os.getpid())
+        return True
+
+    def follow_once(self):
+        """Catch up with the index written by another process."""
+        self.head_block = self.w3.eth.block_number
+        self.index.refresh()
+        self._notify_rollbacks()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.is_leader():
+                    self.follow_once()
+                    pending = False
+                else:
+                    pending = self.sync_once()
+                for listener in self.listeners:
+                    listener()
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error al sincronizar el indice")
+                pending = False
+            if not pending:
+                self._stop.wait(self.poll_interval)
+
+    def _check_reorg(self):
+        """Roll the index back to the last recorded block still on the chain."""
+        checkpoints = self.index.checkpoints()
+        for number, block_hash in checkpoints:
+            if self._canonical_hash(number) == block_hash:
+                if number != self.index.synced_block:
+                    logger.warning("Reorg detectado, se vuelve al bloque %d", number)
+                    self.index.rollback(number)
+                return
+        if self.index.synced_block >= 0:
+            # Ningun bloque conocido sigue en la cadena (por ejemplo, Ganache reiniciado)
+            logger.warning("El indice no coincide con la cadena, se reconstruye")
+            self.index.rollback(-1)
+
+    def _notify_rollbacks(self):
+        if self.index.rollbacks == self._rollbacks:
+            return
+        self._rollbacks = self.index.rollbacks
+        for listener in self.rollback_listeners:
+            listener()
+
+    def _canonical_hash(self, number):
+        if number > self.head_block:
+            return None
+        try:
+            return self.w3.eth.get_block(number).hash.hex()
+        except BlockNotFound:
+            return None
+
+    def _decode_call(self, log):
+        args = log["args"]
+        cfp_contract = self.registry.cfp(args["cfp"])
+        closing_time = cfp_contract.functions.closingTime().call()
+        call = (args["creator"], args["cfp"], bytes(args["callId"]), closing_time)
+        return call, log["blockNumber"]
+
+    def _decode_proposal(self, call_id, log, block_timestamps):
+        event = self.registry.cfp(log["address"]).events.ProposalRegistered()
+        args = event.process_log(log)["args"]
+        block_number = args["blockNumber"]
+        if block_number not in block_timestamps:
+            block_timestamps[block_number] = self.w3.eth.get_block(
+                block_number
+            ).timestamp
+        data = (args["sender"], block_number, block_timestamps[block_number])
+        return call_id, args["proposal"], data
+
+    def _proposal_topic(self):
+        return self.registry.event_topic("CFP", "ProposalRegistered")
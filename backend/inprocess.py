@@ -0,0 +1,113 @@
+"""Atiende las peticiones de `requests` con la app de Flask, sin pasar por la red."""
+
+import io
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class StreamedBody(io.RawIOBase):
+    """
+    File-like view of a streamed Flask response, read as its chunks are produced.
+
+    Args:
+        answer (Response): The response of the test client, opened unbuffered.
+    """
+
+    def __init__(self, answer):
+        super().__init__()
+        self.answer = answer
+        self._chunks = answer.iter_encoded()
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._pending:
+            self._pending = next(self._chunks, b"")
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        # Cierra el generador de la respuesta, como si el cliente se desconectara
+        self.answer.close()
+        super().close()
+
+
+class FlaskAdapter(BaseAdapter):
+    """
+    Transport adapter for `requests` that hands the requests to a Flask app.
+
+    Usage:
+        session = requests.Session()
+        session.mount("http://127.0.0.1:5000", FlaskAdapter(app))
+
+    Args:
+        app (Flask): The application that answers the requests.
+    """
+
+    def __init__(self, app):
+        super().__init__()
+        self.client = app.test_client()
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):  # pylint: disable=R0913
+        answer = self.client.open(
+            request.path_url,
+            method=request.method,
+            headers=dict(request.headers),
+            data=request.body,
+            buffered=not stream,
+        )
+
+        response = requests.Response()
+        response.status_code = answer.status_code
+        response.reason = answer.status.partition(" ")[2]
+        response.headers = CaseInsensitiveDict(answer.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        if stream:
+            # Las respuestas que no terminan (p. ej. /events) se leen a medida que llegan
+            response.raw = StreamedBody(answer)
+            return response
+        # pylint: disable=W0201, W0212
+        response._content = answer.get_data()
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def serve_in_process(app, server):
+    """
+    Route the module level `requests` functions for `server` to a Flask app.
+
+    `requests.get`, `requests.post`, etc. all go through `requests.api.request`, so
+    patching it is enough for code that does not use its own sessions.
+
+    Args:
+        app (Flask): The application that answers the requests.
+        server (str): Base URL whose requests are handed to the app.
+    """
+    session = requests.Session()
+    session.mount(server, FlaskAdapter(app))
+    original = requests.api.request
+
+    def request(method, url, **kwargs):
+        return session.request(method=method, url=url, **kwargs)
+
+    requests.api.request = request
+    try:
+        yield
+    finally:
+        requests.api.request = original
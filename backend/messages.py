@@ -4,13 +4,23 @@ INVALID_SIGNATURE = "Firma inválida"
 INVALID_MIMETYPE = "Tipo MIME inválido"
 INVALID_CALLID = "Identificador de llamado incorrecto"
 INVALID_PROPOSAL = "Formato de propuesta incorrecto"
+INVALID_PROPOSALS = "Lista de propuestas inválida"
 INVALID_TIME_FORMAT = "Formato de tiempo incorrecto"
 INVALID_CLOSING_TIME = "Tiempo de cierre inválido"
+INVALID_EXPAND = "Campos a expandir inválidos"
+INVALID_PAGE = "Parámetros de paginación inválidos"
+INVALID_TX_HASH = "Hash de transacción inválido"
+INVALID_EVENT_ID = "El ID del último evento debe ser un número de bloque"
+INVALID_WITHIN = "El intervalo debe ser un número positivo de segundos"
 ALREADY_AUTHORIZED = "Ya está autorizado"
+USER_ALREADY_REGISTERED = "El usuario ya se encuentra registrado. No se hacen cambios."
 ALREADY_CREATED = "El llamado ya existe"
 ALREADY_REGISTERED = "La propuesta ya ha sido registrada"
 CALLID_NOT_FOUND = "El llamado no existe"
 PROPOSAL_NOT_FOUND = "La propuesta no existe"
+TX_NOT_FOUND = "La transacción no existe"
 UNAUTHORIZED = "No autorizado"
+HEAD_UNAVAILABLE = "Todavía no se conoce el último bloque"
+TOO_MANY_EVENT_CLIENTS = "Demasiados clientes conectados a /events, reintentar luego"
 INTERNAL_ERROR = "Error interno"
 OK = "OK"
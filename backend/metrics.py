@@ -0,0 +1,298 @@
+"""Métricas del servidor de API en el formato de texto de Prometheus.
+
+Las métricas se llevan con `prometheus_client`. Con varios procesos (gunicorn),
+`serve.py` define `PROMETHEUS_MULTIPROC_DIR` antes de levantar los workers: cada uno
+escribe sus valores en archivos de ese directorio y `/metrics` los suma, así que
+cualquier worker responde por todos.
+
+Además de las métricas globales, lleva la cuenta de lo que hace cada petición
+(llamadas JSON-RPC por método y tiempo de cada fase) en el hilo que la atiende.
+"""
+
+import os
+import threading
+from collections import Counter as Tally
+from contextlib import contextmanager
+from time import perf_counter
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+
+# Las series `_created` no se pueden sumar entre procesos
+prometheus_client.disable_created_metrics()
+
+# Las metricas de este proceso; /metrics lee las de todos si hay directorio compartido
+_registry = CollectorRegistry(auto_describe=True)
+
+
+def multiprocess_dir():
+    """Directory where the processes share their metrics, or None if there is one."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+class Counter:
+    """
+    A monotonically increasing value, optionally split by labels.
+
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Help text of the metric.
+        labels (tuple): Names of the labels.
+    """
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.labels = tuple(labels)
+        self._metric = prometheus_client.Counter(
+            name, documentation, self.labels, registry=_registry
+        )
+
+    def inc(self, amount=1, **labels):
+        """Increase the value of the given labels by `amount`."""
+        metric = self._metric.labels(**labels) if self.labels else self._metric
+        metric.inc(amount)
+
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, optionally split by labels.
+
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Help text of the metric.
+        labels (tuple): Names of the labels.
+        buckets (tuple): Upper bounds of the buckets, in ascending order.
+    """
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = tuple(labels)
+        self._metric = prometheus_client.Histogram(
+            name, documentation, self.labels, buckets=buckets, registry=_registry
+        )
+
+    def observe(self, value, **labels):
+        """Record an observed value for the given labels."""
+        metric = self._metric.labels(**labels) if self.labels else self._metric
+        metric.observe(value)
+
+
+class CacheCollector:
+    """
+    Exposes the `hits` and `misses` attributes of several caches as counters.
+
+    The caches count in plain attributes; `sync` adds what they counted since the
+    last call to the counters, which are shared by every process like the rest.
+
+    Args:
+        name (str): Prefix of the metrics.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._counters = {
+            result: Counter(
+                f"{name}_{result}_total", f"Cache {result}, by cache.", ("cache",)
+            )
+            for result in ("hits", "misses")
+        }
+        self._lock = threading.Lock()
+        self._caches = {}
+        self._reported = {}
+
+    def watch(self, cache_name, cache):
+        """
+        Start reporting a cache.
+
+        Args:
+            cache_name (str): Value of the `cache` label.
+            cache: Any object with `hits` and `misses` attributes.
+        """
+        self._caches[cache_name] = cache
+
+    def sync(self):
+        """Add the hits and misses counted since the last call to the counters."""
+        with self._lock:
+            for cache_name, cache in list(self._caches.items()):
+                for result, counter in self._counters.items():
+                    value = getattr(cache, result)
+                    key = (cache_name, result)
+                    # Una cache que se reemplazo (p. ej. otro registro) vuelve a empezar
+                    delta = value - min(self._reported.get(key, 0), value)
+                    if delta:
+                        counter.inc(delta, cache=cache_name)
+                    self._reported[key] = value
+
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Time spent handling each request.",
+    ("endpoint", "method", "status"),
+)
+REQUEST_RPC_CALLS = Counter(
+    "api_request_rpc_calls_total",
+    "JSON-RPC calls made while handling requests, by endpoint and RPC method.",
+    ("endpoint", "rpc_method"),
+)
+RPC_CALLS = Counter(
+    "rpc_calls_total",
+    "JSON-RPC calls sent to the node, by method (batched calls are counted one by one).",
+    ("method",),
+)
+RPC_DURATION = Histogram(
+    "rpc_round_trip_duration_seconds",
+    "Time of each round-trip to the node, by method (`batch` for batch POSTs).",
+    ("method",),
+)
+NODE_REQUESTS = Counter(
+    "rpc_node_requests_total",
+    "Round-trips to each node, by outcome (`ok` or `error`).",
+    ("node", "outcome"),
+)
+CACHES = CacheCollector("api_cache")
+
+
+def render():
+    """
+    Render every metric in the Prometheus text format.
+
+    With `PROMETHEUS_MULTIPROC_DIR` set, the values of every process are added up.
+
+    Returns:
+        str: The body of the `/metrics` response.
+    """
+    CACHES.sync()
+    if multiprocess_dir() is None:
+        return generate_latest(_registry).decode()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry).decode()
+
+
+def start_request():
+    """Start tracking the JSON-RPC calls and phases of the current thread."""
+    _local.stats = {
+        "start": perf_counter(),
+        "calls": Tally(),
+        "round_trips": 0,
+        "rpc_time": 0.0,
+        "phases": Tally(),
+    }
+
+
+def finish_request(endpoint, method, status):
+    """
+    Stop tracking the current thread and record the request in the metrics.
+
+    Args:
+        endpoint (str): The route rule of the request (not the raw path, to keep
+            the number of label values bounded).
+        method (str): The HTTP method.
+        status (int): The status code of the response.
+
+    Returns:
+        dict: The `duration` of the request, its `calls` per RPC method, the number
+        of `round_trips` to the node and the seconds spent in each of its `phases`.
+    """
+    stats = getattr(_local, "stats", None)
+    _local.stats = None
+    if stats is None:
+        return None
+
+    stats["duration"] = perf_counter() - stats["start"]
+    REQUEST_DURATION.observe(
+        stats["duration"], endpoint=endpoint, method=method, status=str(status)
+    )
+    for rpc_method, count in stats["calls"].items():
+        REQUEST_RPC_CALLS.inc(count, endpoint=endpoint, rpc_method=rpc_method)
+    # Los workers que no atienden /metrics tambien publican sus caches
+    CACHES.sync()
+    return stats
+
+
+@contextmanager
+def phase(name):
+    """
+    Add the time spent in the block to a phase of the current request.
+
+    The round-trips to the node made inside the block are reported in their own
+    `rpc:<method>` phases and are not added to this one, so phases never overlap.
+
+    Usage:
+        with metrics.phase("signature"):
+            signer = verifier.recover(message, signature)
+    """
+    stats = getattr(_local, "stats", None)
+    if stats is None:
+        yield
+        return
+
+    start = perf_counter()
+    rpc_time = stats["rpc_time"]
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start - (stats["rpc_time"] - rpc_time)
+        stats["phases"][name] += elapsed
+
+
+def record_rpc(methods, elapsed):
+    """
+    Record a round-trip to the node.
+
+    Args:
+        methods (list): The JSON-RPC methods sent together.
+        elapsed (float): Seconds the round-trip took.
+    """
+    label = methods[0] if len(methods) == 1 else "batch"
+    RPC_DURATION.observe(elapsed, method=label)
+    for method in methods:
+        RPC_CALLS.inc(method=method)
+
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats["calls"].update(methods)
+        stats["round_trips"] += 1
+        stats["rpc_time"] += elapsed
+        stats["phases"][f"rpc:{label}"] += elapsed
+
+
+@contextmanager
+def rpc_round_trip(methods):
+    """Time a round-trip to the node and record it with `record_rpc`."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record_rpc(methods, perf_counter() - start)
+
+
+def middleware(make_request, w3):  # pylint: disable=W0613
+    """Web3 middleware that records every request sent through the provider."""
+
+    def timed_request(method, params):
+        with rpc_round_trip([method]):
+            return make_request(method, params)
+
+    return timed_request
+
+
+def format_phases(stats):
+    """
+    Describe where the time of a request went, for the slow request log.
+
+    Args:
+        stats (dict): The value returned by `finish_request`.
+
+    Returns:
+        str: The phases sorted by time, plus the time not covered by any of them.
+    """
+    phases = sorted(stats["phases"].items(), key=lambda item: -item[1])
+    other = stats["duration"] - sum(stats["phases"].values())
+    parts = [f"{name}={seconds * 1000:.1f}ms" for name, seconds in phases]
+    parts.append(f"otros={max(other, 0) * 1000:.1f}ms")
+    return ", ".join(parts)
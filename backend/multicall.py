@@ -0,0 +1,55 @@
+"""Lecturas agregadas: muchas funciones de solo lectura en un unico viaje al nodo."""
+
+from web3.exceptions import ContractLogicError
+
+from batching import RPCBatch, decode_result, encode_call
+
+CHUNK_SIZE = 500
+
+
+def read_all(w3, functions, multicall=None, chunk_size=CHUNK_SIZE):
+    """
+    Call many contract view functions in a single round-trip to the node.
+
+    With a deployed Multicall contract the calls are aggregated on chain through
+    `tryAggregate`, `chunk_size` calls per `eth_call`, and every chunk is sent in the
+    same JSON-RPC batch. Without it, the calls themselves are sent as one batch.
+
+    Args:
+        w3 (Web3): The Web3 instance used to reach the node.
+        functions (list): Bound contract functions (`ContractFunction`) to call.
+        multicall (Contract): Optional Multicall contract.
+        chunk_size (int): Maximum number of calls aggregated per `eth_call`.
+
+    Returns:
+        list: The decoded result of each function, or None for the ones that reverted.
+    """
+    batch = RPCBatch(w3)
+    if multicall is None:
+        pending = [batch.call(function) for function in functions]
+        results = []
+        for result in pending:
+            try:
+                results.append(result.get())
+            except ContractLogicError:
+                results.append(None)
+        return results
+
+    chunks = [
+        functions[start : start + chunk_size]
+        for start in range(0, len(functions), chunk_size)
+    ]
+    pending = []
+    for chunk in chunks:
+        calls = [
+            (transaction["to"], transaction["data"])
+            for transaction in map(encode_call, chunk)
+        ]
+        pending.append(batch.call(multicall.functions.tryAggregate(calls)))
+
+    results = []
+    for chunk, result in zip(chunks, pending):
+        _, returned = result.get()
+        for function, (success, data) in zip(chunk, returned):
+            results.append(decode_result(w3, function, data) if success else None)
+    return results
@@ -0,0 +1,337 @@
+"""Proveedor JSON-RPC sobre varios nodos, con pool de conexiones y conmutación por error.
+
+Las lecturas van al nodo más sano (menor latencia observada y menos peticiones en
+curso), con un timeout corto por intento; un nodo que falla varias veces seguidas
+queda fuera durante un rato (circuit breaker) y las lecturas se reintentan en los
+demás. Las escrituras van siempre al nodo primario (el primero de la lista), que es
+el que lleva el mempool de la cuenta del dueño, y durante un rato después de cada
+escritura las lecturas también van primero a él, para que un cliente lea lo que
+acaba de escribir aunque los otros nodos todavía no tengan el bloque.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers.base import JSONBaseProvider
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Metodos que cambian el estado del nodo: solo el primario y sin reintentos, ya que
+# un envio que vencio por timeout pudo haber llegado igual
+WRITE_METHODS = {
+    "eth_sendRawTransaction",
+    "eth_sendTransaction",
+    "eth_sign",
+    "eth_signTransaction",
+    "eth_signTypedData",
+    "evm_mine",
+    "evm_revert",
+    "evm_snapshot",
+    "evm_increaseTime",
+}
+
+# Lecturas que dependen del estado propio de un nodo (mempool, filtros)
+PINNED_METHODS = {
+    "eth_newFilter",
+    "eth_newBlockFilter",
+    "eth_newPendingTransactionFilter",
+    "eth_getFilterChanges",
+    "eth_getFilterLogs",
+    "eth_uninstallFilter",
+    "txpool_content",
+    "txpool_status",
+}
+
+
+class NodeUnavailable(Exception):
+    """Raised when a node could not answer a request."""
+
+
+class NodeEndpoint:
+    """
+    A node behind a keep-alive connection pool, with its health statistics.
+
+    The latency is tracked as an exponentially weighted moving average. After
+    `failure_threshold` consecutive failures the circuit opens and the node gets no
+    requests for `cooldown` seconds; then a single probe request decides whether it
+    closes again.
+
+    Args:
+        url (str): The JSON-RPC endpoint of the node.
+        pool_size (int): Maximum number of keep-alive connections to the node.
+        timeout (float): Seconds to wait for each response.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        cooldown (float): Seconds the circuit stays open.
+        smoothing (float): Weight of the newest sample in the latency average.
+    """
+
+    def __init__(
+        self,
+        url,
+        pool_size=32,
+        timeout=10.0,
+        failure_threshold=3,
+        cooldown=5.0,
+        smoothing=0.2,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+
+        self.latency = None
+        self.inflight = 0
+        self.failures = 0
+        self.opened_at = None
+
+        self._lock = threading.Lock()
+        self._probing = False
+        # Las conexiones se comparten entre hilos; las sesiones no son thread-safe
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._sessions = threading.local()
+
+    def score(self):
+        """
+        Get the expected cost of sending a request to the node.
+
+        Returns:
+            float: The average latency times the requests in flight; unmeasured
+            nodes score 0, so they get a request right away.
+        """
+        return (self.latency or 0.0) * (self.inflight + 1)
+
+    def acquire(self):
+        """
+        Check if the node can take a request now, reserving the probe if the
+        circuit is half open.
+
+        Returns:
+            bool: True if the request can be sent.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def post(self, data, timeout=None):
+        """
+        Send a JSON-RPC payload to the node.
+
+        Args:
+            data (bytes): The encoded request or batch.
+            timeout (float): Seconds to wait for the response; the node's if None.
+
+        Returns:
+            bytes: The raw response body.
+
+        Raises:
+            NodeUnavailable: If the node could not be reached, timed out or answered
+                with a server error.
+        """
+        with self._lock:
+            self.inflight += 1
+        start = time.perf_counter()
+        try:
+            response = self._session().post(
+                self.url,
+                data=data,
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout if timeout is None else timeout,
+            )
+            if response.status_code == 429 or response.status_code >= 500:
+                raise NodeUnavailable(f"{self.url} respondió {response.status_code}")
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout) as error:
+            self._failed()
+            raise NodeUnavailable(f"{self.url}: {error}") from error
+        except NodeUnavailable:
+            self._failed()
+            raise
+        finally:
+            with self._lock:
+                self.inflight -= 1
+        self._succeeded(time.perf_counter() - start)
+        return response.content
+
+    def _session(self):
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = self._sessions.session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+        return session
+
+    def _succeeded(self, elapsed):
+        with self._lock:
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += self.smoothing * (elapsed - self.latency)
+            if self.opened_at is not None:
+                logger.info("El nodo %s volvió a responder", self.url)
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+        metrics.NODE_REQUESTS.inc(node=self.url, outcome="ok")
+
+    def _failed(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("Se deja de usar el nodo %s", self.url)
+                self.opened_at = time.monotonic()
+        metrics.NODE_REQUESTS.inc(node=self.url, outcome="error")
+
+
+class FailoverProvider(JSONBaseProvider):
+    """
+    Web3 provider that spreads the requests over several nodes.
+
+    Reads go to the available node with the lowest score, waiting at most
+    `read_timeout` seconds, and are retried on the next best one, with exponential
+    backoff once every node has been tried. Writes and node-specific reads (pending
+    nonce, filters) always go to the primary.
+
+    For `write_pin` seconds after a write, reads go to the primary first, so a
+    client reads what it just wrote even if the other nodes lag behind. With
+    several server processes, `write_mark` is a file whose modification time
+    shares the time of the last write among them; it is checked at most once every
+    `mark_interval` seconds.
+
+    Usage:
+        w3 = Web3(FailoverProvider(["http://node-a:8545", "http://node-b:8545"]))
+
+    Args:
+        urls (list): The JSON-RPC endpoints; the first one is the primary.
+        retries (int): Extra attempts of a read after the first one fails.
+        backoff (float): Seconds to wait before the first retry of a node already
+            tried; doubles on every retry.
+        read_timeout (float): Seconds to wait for each attempt of a read.
+        write_pin (float): Seconds after a write during which reads prefer the
+            primary.
+        write_mark (str): Optional path of the file that marks the last write.
+        mark_interval (float): Seconds during which the time read from `write_mark`
+            is reused before reading the file again.
+        **node_options: Passed to every `NodeEndpoint` (pool size, timeout, ...).
+    """
+
+    def __init__(
+        self,
+        urls,
+        retries=2,
+        backoff=0.05,
+        read_timeout=2.0,
+        write_pin=10.0,
+        write_mark=None,
+        mark_interval=0.5,
+        **node_options,
+    ):
+        super().__init__()
+        if not urls:
+            raise ValueError("Se necesita al menos un nodo")
+        self.nodes = [NodeEndpoint(url, **node_options) for url in urls]
+        self.primary = self.nodes[0]
+        self.retries = retries
+        self.backoff = backoff
+        self.read_timeout = read_timeout
+        self.write_pin = write_pin
+        self.write_mark = write_mark
+        self.mark_interval = mark_interval
+        self._last_write = 0.0
+        # Ultima escritura de otro proceso segun el archivo, y cuando se lo leyo
+        self._marked_write = 0.0
+        self._mark_checked = float("-inf")
+
+    @property
+    def endpoint_uri(self):
+        """The URL of the primary node."""
+        return self.primary.url
+
+    def make_request(self, method, params):
+        data = self.encode_rpc_request(method, params)
+        if method in WRITE_METHODS:
+            try:
+                return self.decode_rpc_response(self.primary.post(data))
+            finally:
+                # Aun si vencio el timeout, el envio pudo haber llegado al primario
+                self._mark_write()
+        pinned = method in PINNED_METHODS or (
+            method == "eth_getTransactionCount" and "pending" in params
+        )
+        return self.decode_rpc_response(self._read(data, pinned))
+
+    def make_batch_request(self, payload):
+        """
+        Send a batch of read requests to a single node.
+
+        Args:
+            payload (list): The JSON-RPC request objects.
+
+        Returns:
+            list: The response objects, in the order the node returned them.
+        """
+        return json.loads(self._read(json.dumps(payload).encode(), False))
+
+    def _read(self, data, pinned):
+        tried = set()
+        error = None
+        # Recien escrito, el primario es el unico seguro de tener el bloque nuevo
+        prefer_primary = not pinned and self._written_recently()
+        for attempt in range(self.retries + 1):
+            if pinned or (prefer_primary and not tried and self.primary.acquire()):
+                node = self.primary
+            else:
+                node = self._pick(tried)
+            if node in tried:
+                # Ya se probaron todos los nodos disponibles: se espera antes de repetir
+                time.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+            tried.add(node)
+            try:
+                return node.post(data, self.read_timeout)
+            except NodeUnavailable as failure:
+                error = failure
+        raise error
+
+    def _mark_write(self):
+        self._last_write = time.time()
+        if self.write_mark is not None:
+            try:
+                with open(self.write_mark, "a", encoding="utf-8"):
+                    os.utime(self.write_mark)
+            except OSError as error:
+                logger.warning("No se pudo marcar la escritura: %s", error)
+
+    def _written_recently(self):
+        now = time.time()
+        # Las escrituras propias se ven al instante; las de otros procesos con una
+        # demora de a lo sumo mark_interval, sin un stat por cada lectura
+        stale = now - self._mark_checked >= self.mark_interval
+        if self.write_mark is not None and stale:
+            self._mark_checked = now
+            try:
+                self._marked_write = os.stat(self.write_mark).st_mtime
+            except OSError:
+                pass
+        return now - max(self._last_write, self._marked_write) < self.write_pin
+
+    def _pick(self, tried):
+        # Primero los nodos que aun no fallaron en esta peticion, del mas sano al menos
+        for node in sorted(self.nodes, key=lambda node: (node in tried, node.score())):
+            if node.acquire():
+                return node
+        # Con todos los circuitos abiertos se insiste con el primario
+        return self.primary
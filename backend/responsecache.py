@@ -0,0 +1,104 @@
+"""Caché de respuestas ya serializadas de los endpoints de lectura, con su ETag."""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedResponse = namedtuple("CachedResponse", ("body", "etag", "version"))
+
+
+def make_etag(body):
+    """
+    Get the strong ETag of a response body.
+
+    The tag depends only on the bytes sent, so every process of the server gives the
+    same tag to the same response and a client keeps getting 304 while the data does
+    not change, even if the version it was cached at does.
+
+    Args:
+        body (bytes): The serialized response.
+
+    Returns:
+        str: The tag, without quotes.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache of serialized responses tagged with the version of the data they were
+    built from.
+
+    The version is whatever identifies that data without asking the node, like the
+    number of calls seen by the index, or a constant for data that never changes
+    once it exists. An entry is served only while the current version is the one it
+    was stored with.
+
+    Usage:
+        cache = ResponseCache()
+        entry = cache.get(key, version)
+        if entry is None:
+            entry = cache.put(key, version, build_body())
+        send(entry.body, etag=entry.etag)
+
+    Args:
+        max_size (int): Maximum number of entries kept in the LRU.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        """
+        Get a cached response if it was built from the current version of the data.
+
+        Args:
+            key (Hashable): The route and arguments of the request.
+            version (Hashable): The current version of the data.
+
+        Returns:
+            CachedResponse: The cached response, or None if it is missing or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body):
+        """
+        Store a serialized response.
+
+        Args:
+            key (Hashable): The route and arguments of the request.
+            version (Hashable): The version of the data the response was built from,
+                taken before reading it.
+            body (bytes): The serialized response.
+
+        Returns:
+            CachedResponse: The stored entry, with its ETag.
+        """
+        entry = CachedResponse(body, make_etag(body), version)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        """Number of cached responses."""
+        return len(self._entries)
+
+    def clear(self):
+        """Drop every cached response, e.g. after the contracts are redeployed."""
+        with self._lock:
+            self._entries.clear()
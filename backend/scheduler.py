@@ -0,0 +1,153 @@
+"""Calendario de cierre de los llamados, para saber cuáles siguen abiertos.
+
+Los llamados abiertos se mantienen ordenados por tiempo de cierre: el primero es el
+próximo en cerrar, que es lo que espera el hilo del calendario, y los que cierran
+antes de un momento dado son un prefijo que se encuentra con una búsqueda binaria.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+OpenCall = namedtuple("OpenCall", ("closing_time", "call_id", "creator", "cfp"))
+
+
+class ClosingSchedule:
+    """
+    The calls that are still open, ordered by closing time.
+
+    The calls are read from a `CallIndex`: all of them on the first `poll` and then
+    only the ones indexed since the previous one, so `poll` is meant to be
+    registered as a listener of the `ChainIndexer`. `reset` is meant to be one of its
+    rollback listeners: the next `poll` reads every call again, dropping the ones
+    orphaned by a reorg. A background thread sleeps until
+    the next closing time and then drops the calls that closed, passing them to
+    `on_close`.
+
+    A call is open while the current time is before its closing time, as in the
+    `CFP` contract.
+
+    Args:
+        index (CallIndex): The index the calls are read from.
+        on_close (callable): Called from the background thread with the list of
+            `OpenCall` that just closed.
+        clock (callable): Returns the current unix time.
+        max_wait (float): Longest the background thread sleeps between checks.
+    """
+
+    def __init__(self, index, on_close=None, clock=time.time, max_wait=60.0):
+        self.index = index
+        self.on_close = on_close
+        self.clock = clock
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._open = []
+        self._call_ids = set()
+        self._cursor = -1
+        self._stale = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start closing the calls in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="closing-schedule", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Ask the background thread to stop and wait for it."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        """Read every call again on the next `poll`, after the index rolled back."""
+        with self._cond:
+            self._stale = True
+
+    def poll(self):
+        """Add the calls indexed since the last call."""
+        synced_block = self.index.synced_block
+        with self._cond:
+            if not self._stale and synced_block <= self._cursor:
+                return
+            after_block = -1 if self._stale else self._cursor
+            calls, _ = self.index.changes_between(after_block, synced_block)
+            if self._stale:
+                # Los llamados abiertos se reemplazan de una vez, sin vaciar la lista
+                # mientras se lee el indice
+                self._open = []
+                self._call_ids = set()
+                self._stale = False
+            self._cursor = synced_block
+            now = self.clock()
+            for _, call_id, creator, cfp, closing_time in calls:
+                if closing_time > now and call_id not in self._call_ids:
+                    insort(self._open, OpenCall(closing_time, call_id, creator, cfp))
+                    self._call_ids.add(call_id)
+            # El llamado nuevo puede cerrar antes del que esperaba el hilo
+            self._cond.notify()
+
+    def open_calls(self):
+        """
+        Get the calls that are still open.
+
+        Returns:
+            list: The `OpenCall` of each open call, the first to close first.
+        """
+        with self._cond:
+            return self._open[self._closed_count(self.clock()) :]
+
+    def closing_within(self, seconds):
+        """
+        Get the open calls that close in the next `seconds` seconds.
+
+        Args:
+            seconds (int): Length of the window, from now.
+
+        Returns:
+            list: The `OpenCall` of each call, the first to close first.
+        """
+        now = self.clock()
+        with self._cond:
+            return self._open[
+                self._closed_count(now) : self._closed_count(now + seconds)
+            ]
+
+    def _closed_count(self, moment):
+        # Los cierres son enteros: cerro si closing_time <= moment, o sea < int(moment) + 1
+        return bisect_left(self._open, (int(moment) + 1,))
+
+    def _expire(self):
+        with self._cond:
+            count = self._closed_count(self.clock())
+            closed = self._open[:count]
+            del self._open[:count]
+            self._call_ids.difference_update(call.call_id for call in closed)
+        return closed
+
+    def _run(self):
+        while not self._stop.is_set():
+            closed = self._expire()
+            if closed and self.on_close is not None:
+                try:
+                    self.on_close(closed)
+                except Exception:  # pylint: disable=W0718
+                    logger.exception("Error al notificar el cierre de llamados")
+            with self._cond:
+                timeout = self.max_wait
+                if self._open:
+                    timeout = min(timeout, self._open[0].closing_time - self.clock())
+                if timeout > 0 and not self._stop.is_set():
+                    self._cond.wait(timeout)
@@ -0,0 +1,120 @@
+"""Servidor de API en modo producción, con varios procesos (gunicorn).
+
+El proceso maestro lee la configuración (ver `config.py`) y deriva la cuenta del dueño
+una sola vez; cada worker hereda esa cuenta al hacer fork e importa el servidor por su
+cuenta, con su propia conexión al nodo y sus propios hilos:
+
+    python serve.py --mnemonic_file mnemonic.txt --workers 4 --threads 8
+
+Los workers comparten el índice en disco (uno solo lo escribe, el resto lo lee) y el
+contador de nonces del dueño, para que dos procesos nunca firmen con el mismo nonce.
+Las métricas de todos los workers se suman en `/metrics` a través de archivos en
+`--metrics_dir` (ver `metrics.py`).
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+
+# web3 es lo mas lento de importar: se importa una vez en el maestro y los workers lo
+# heredan al hacer fork, en lugar de importarlo cada uno
+import web3  # pylint: disable=W0611
+from gunicorn.app.base import BaseApplication
+
+import config
+
+
+class Server(BaseApplication):
+    """
+    Gunicorn application that runs the API server in several worker processes.
+
+    Args:
+        settings (Namespace): The configuration returned by `config.load`.
+        owner (LocalAccount): The owner of the factory; None on the in-memory chain,
+            where the account that deploys the contracts is the owner.
+    """
+
+    def __init__(self, settings, owner):
+        self.settings = settings
+        self.owner = owner
+        super().__init__()
+
+    def load_config(self):
+        self.cfg.set("bind", self.settings.bind)
+        self.cfg.set("workers", self.settings.workers)
+        self.cfg.set("threads", self.settings.threads)
+        self.cfg.set("worker_class", "gthread")
+        self.cfg.set("child_exit", child_exit)
+
+    def load(self):
+        # El servidor se importa en cada worker, despues del fork
+        # pylint: disable-next=C0415
+        import apiserver
+
+        apiserver.start_services(self.owner or apiserver.deployer)
+        return apiserver.app
+
+
+def child_exit(_server, worker):
+    """Keep the counters of a finished worker but drop its gauges from `/metrics`."""
+    # pylint: disable-next=C0415
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def share_metrics(metrics_dir):
+    """
+    Make every worker write its metrics to files in the same directory.
+
+    Has to run before `prometheus_client` is imported, which reads the directory once.
+
+    Args:
+        metrics_dir (str): The directory; a temporary one if None and
+            `PROMETHEUS_MULTIPROC_DIR` is not set either.
+    """
+    metrics_dir = metrics_dir or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir is None:
+        metrics_dir = tempfile.mkdtemp(prefix="cfp-metrics-")
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Los archivos de una ejecucion anterior sumarian valores viejos
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+
+def main(argv=None):
+    """
+    Run the API server in production mode.
+
+    Args:
+        argv (list): Command line arguments; None reads them from `sys.argv`.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    config.add_arguments(parser)
+    settings = parser.parse_args(argv)
+
+    if settings.chain_backend == "tester" and settings.workers > 1:
+        parser.error("La cadena en memoria no se puede compartir entre workers")
+    if settings.signature_workers is None:
+        # Cada worker ya es un proceso: las firmas se recuperan en sus hilos
+        settings.signature_workers = 0
+
+    owner = None
+    if settings.chain_backend != "tester":
+        if settings.mnemonic_file is None:
+            parser.error("Falta --mnemonic_file")
+        owner = config.load_owner(settings.mnemonic_file)
+
+    share_metrics(settings.metrics_dir)
+    # Los workers leen la misma configuracion del entorno al importar el servidor
+    config.export(settings)
+    Server(settings, owner).run()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except ValueError as error:
+        print("Se ha producido un error", error)
@@ -0,0 +1,137 @@
+"""Verificación de firmas con caché y recuperación en un pool de procesos."""
+
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import sigworker
+
+# Procesos del pool si no se configura otra cantidad
+DEFAULT_WORKERS = 2
+
+
+class SignatureVerifier:
+    """
+    Recovers the signers of messages, caching the results in a bounded LRU.
+
+    Public key recovery is CPU bound and holds the GIL, so the cache misses are run
+    on a pool of worker processes. Concurrent requests for the same message and
+    signature share a single recovery.
+
+    Usage:
+        verifier = SignatureVerifier()
+        signer = verifier.recover(message, signature)
+
+    Args:
+        max_size (int): Maximum number of recovered signers kept in the LRU.
+        workers (int): Number of worker processes; 0 recovers in the calling thread
+            and None uses `DEFAULT_WORKERS`.
+    """
+
+    def __init__(self, max_size=4096, workers=None):
+        self.max_size = max_size
+        self.workers = DEFAULT_WORKERS if workers is None else workers
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._executor = None
+
+    def recover(self, message, signature):
+        """
+        Recover the address that signed a text message.
+
+        Args:
+            message (str): The signed text.
+            signature (str): The signature, as a hex string.
+
+        Returns:
+            str: The checksummed address of the signer.
+        """
+        return self.submit(message, signature).result()
+
+    def submit(self, message, signature):
+        """
+        Start recovering the signer of a message without waiting for the result.
+
+        Args:
+            message (str): The signed text.
+            signature (str): The signature, as a hex string.
+
+        Returns:
+            Future: A future with the checksummed address of the signer, already
+            resolved if it was cached.
+        """
+        key = (message, signature.lower())
+        with self._lock:
+            address = self._cache.get(key)
+            if address is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(address)
+                return future
+
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+
+            if self.workers == 0:
+                future = Future()
+                try:
+                    future.set_result(sigworker.recover_signer(message, signature))
+                except Exception as error:  # pylint: disable=W0718
+                    future.set_exception(error)
+            else:
+                # Los workers solo importan sigworker, no el modulo del servidor
+                future = self._pool().submit(sigworker.recover_signer, message, signature)
+            self._inflight[key] = future
+
+        future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    def warm(self):
+        """
+        Start the worker processes ahead of the first signature.
+
+        Each worker imports eth_account when it starts, which takes longer than the
+        recovery itself, so doing it before the first request keeps that latency off
+        the request.
+        """
+        if self.workers == 0:
+            return
+        with self._lock:
+            pool = self._pool()
+        for _ in range(self.workers):
+            pool.submit(sigworker.start)
+
+    def close(self):
+        """Shut down the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _store(self, key, future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            # Las firmas que no se pudieron recuperar no se guardan
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._cache[key] = future.result()
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn evita heredar los locks de los hilos del servidor al hacer fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
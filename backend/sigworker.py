@@ -0,0 +1,26 @@
+"""Tareas de los procesos del pool de firmas.
+
+Solo importa eth_account: es lo único que cargan los workers además de lo que vuelve a
+ejecutar `multiprocessing` al arrancarlos.
+"""
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+
+def recover_signer(message, signature):
+    """
+    Recover the address that signed a text message (EIP-191).
+
+    Args:
+        message (str): The signed text.
+        signature (str): The signature, as a hex string.
+
+    Returns:
+        str: The checksummed address of the signer.
+    """
+    return Account.recover_message(encode_defunct(text=message), signature=signature)
+
+
+def start():
+    """Do nothing; running it makes a worker process start and import this module."""
@@ -0,0 +1,191 @@
+"""Benchmark del arranque del servidor de API.
+
+Cada corrida levanta un proceso nuevo que importa `apiserver`, arranca sus servicios y
+envía dos veces cada ruta con el cliente de pruebas de Flask. Se mide cuánto tarda el
+import, el arranque y la primera y la segunda petición de cada ruta (la diferencia
+es lo que paga el primer usuario). Los resultados se imprimen y se guardan en JSON:
+
+    python startup_benchmark.py --runs 5 --output startup.json
+
+El servidor usa la configuración habitual (ver `config.py`): con `CHAIN_BACKEND=tester`
+no hace falta Ganache, aunque entonces el import incluye desplegar los contratos.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROUTES = [
+    "/contract-address",
+    "/contract-owner",
+    "/calls",
+    "/head",
+    "/pending-users",
+    "/authorized/{owner}",
+]
+
+
+def measure(routes, delay):
+    """
+    Import the server, start it and send each route twice, timing every step.
+
+    Runs in the child process, so the imports are cold.
+
+    Args:
+        routes (list): The paths to request; `{owner}` is replaced by the owner.
+        delay (float): Seconds to wait after starting the services, letting the
+            background warm-up run before the first request.
+
+    Returns:
+        dict: Seconds spent importing and starting the server, and the latency (in
+        milliseconds) and status code of the first and second request of each route.
+    """
+    start = time.perf_counter()
+    # pylint: disable-next=C0415
+    import apiserver
+
+    imported = time.perf_counter()
+    if apiserver.deployer is not None:
+        account = apiserver.deployer
+    elif apiserver.settings.mnemonic_file is not None:
+        account = apiserver.config.load_owner(apiserver.settings.mnemonic_file)
+    else:
+        # Las rutas medidas solo leen, asi que alcanza con cualquier cuenta
+        account = apiserver.Account.create()
+    apiserver.start_services(account)
+    started = time.perf_counter()
+    time.sleep(delay)
+
+    client = apiserver.app.test_client()
+    results = {}
+    for route in routes:
+        path = route.format(owner=account.address)
+        timings = []
+        for _ in range(2):
+            request_start = time.perf_counter()
+            response = client.get(path)
+            timings.append(((time.perf_counter() - request_start) * 1000, response.status_code))
+        results[route] = {
+            "firstMs": timings[0][0],
+            "secondMs": timings[1][0],
+            "status": timings[0][1],
+        }
+    return {
+        "importSeconds": imported - start,
+        "startSeconds": started - imported,
+        "routes": results,
+    }
+
+
+def run_child(routes, delay):
+    """
+    Measure the startup in a new process.
+
+    Returns:
+        dict: The result of `measure` in the child process.
+    """
+    completed = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            "--routes",
+            ",".join(routes),
+            "--delay",
+            str(delay),
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    # El servidor tambien imprime en stdout: el resultado es la ultima linea
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    """
+    Take the median of every measurement across runs.
+
+    Args:
+        runs (list): The results of `measure`.
+
+    Returns:
+        dict: The same shape as a single run, with medians.
+    """
+    routes = runs[0]["routes"]
+    return {
+        "runs": len(runs),
+        "importSeconds": statistics.median(run["importSeconds"] for run in runs),
+        "startSeconds": statistics.median(run["startSeconds"] for run in runs),
+        "routes": {
+            route: {
+                "firstMs": statistics.median(run["routes"][route]["firstMs"] for run in runs),
+                "secondMs": statistics.median(
+                    run["routes"][route]["secondMs"] for run in runs
+                ),
+                "status": routes[route]["status"],
+            }
+            for route in routes
+        },
+    }
+
+
+def print_report(summary):
+    """Print the import and start times and the first/second latency of each route."""
+    print(f"import: {summary['importSeconds'] * 1000:.0f} ms")
+    print(f"arranque: {summary['startSeconds'] * 1000:.0f} ms")
+    print(f"{'ruta':<24}{'1ra ms':>10}{'2da ms':>10}  código")
+    for route, result in summary["routes"].items():
+        print(
+            f"{route:<24}{result['firstMs']:>10.1f}{result['secondMs']:>10.1f}"
+            f"  {result['status']}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Procesos a medir")
+    parser.add_argument(
+        "--routes", default=",".join(ROUTES), help="Rutas a medir, separadas por comas"
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.0,
+        help="Segundos a esperar entre el arranque y la primera petición",
+    )
+    parser.add_argument(
+        "--output", default="startup.json", help="Archivo JSON de resultados"
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # La configuracion del servidor sale del entorno, no de estos argumentos
+        print(json.dumps(measure(args.routes.split(","), args.delay)))
+        sys.exit(0)
+
+    # pylint: disable-next=C0413
+    from benchmark import revision
+
+    summary = summarize(
+        [run_child(args.routes.split(","), args.delay) for _ in range(args.runs)]
+    )
+    print_report(summary)
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(
+            {
+                "revision": revision(),
+                "date": datetime.now(timezone.utc).isoformat(),
+                "delaySeconds": args.delay,
+                "results": summary,
+            },
+            output,
+            indent=2,
+        )
@@ -0,0 +1,285 @@
+"""Pruebas de los endpoints de lectura de asyncserver, sobre la cadena en memoria."""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+import asyncserver
+import chain
+import messages
+from contracts import ContractRegistry
+
+
+@pytest.fixture
+def call_id(tester_chain, monkeypatch):
+    """Un llamado creado por el dueño, con la aplicación sirviendo la misma cadena."""
+    w3 = tester_chain.w3
+    monkeypatch.setattr(asyncserver, "sync_w3", w3)
+    monkeypatch.setattr(
+        asyncserver, "w3", chain.connect_async("tester", None, w3.provider)
+    )
+    monkeypatch.setattr(asyncserver.settings, "index_file", ":memory:")
+
+    chain.unlock_account(w3, tester_chain.owner)
+    factory = ContractRegistry(
+        w3,
+        os.path.join(tester_chain.build_dir, "CFPFactory.json"),
+        os.path.join(tester_chain.build_dir, "CFP.json"),
+        network_id=tester_chain.network_id,
+    ).factory
+    call_id = os.urandom(32)
+    tx_hash = factory.functions.create(call_id, int(time.time()) + 3600).transact(
+        {"from": tester_chain.owner.address}
+    )
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    # Los servicios arrancan con el llamado en la cadena: el indice lo lee de entrada
+    asyncserver.start_services(
+        tester_chain.owner, tester_chain.build_dir, tester_chain.network_id
+    )
+    yield "0x" + call_id.hex()
+    asyncserver.stop_services()
+
+
+def sign_text(message, account):
+    """Firma el texto de un mensaje, como el frontend."""
+    return account.sign_message(encode_defunct(text=message)).signature.hex()
+
+
+def request_all(requests):
+    """
+    Envía cada pedido (método, ruta y argumentos de aiohttp) a la aplicación, uno
+    detrás de otro, y devuelve el código y el cuerpo de cada respuesta.
+    """
+
+    async def run():
+        async with TestClient(TestServer(asyncserver.create_app())) as client:
+            responses = []
+            for method, path, kwargs in requests:
+                response = await client.request(method, path, **kwargs)
+                responses.append((response.status, await response.json()))
+            return responses
+
+    return asyncio.run(run())
+
+
+def get_all(paths):
+    """Pide cada ruta a la aplicación y devuelve el código y el cuerpo de cada una."""
+    return request_all([("GET", path, {}) for path in paths])
+
+
+def test_reads(tester_chain, call_id) -> None:
+    """Prueba que los endpoints de lectura respondan como el servidor principal."""
+    (
+        (address_status, address),
+        (owner_status, owner),
+        (call_status, call),
+        (closing_status, closing),
+        (calls_status, calls),
+        (authorized_status, authorized),
+    ) = get_all(
+        [
+            "/contract-address",
+            "/contract-owner",
+            f"/calls/{call_id}",
+            f"/closing-time/{call_id}",
+            "/calls",
+            f"/authorized/{tester_chain.owner.address}",
+        ]
+    )
+    assert address_status == 200
+    assert address["address"] == asyncserver.registry.factory_address
+    assert owner_status == 200
+    assert owner["address"] == tester_chain.owner.address
+    assert call_status == 200
+    assert call["creator"] == tester_chain.owner.address
+    assert closing_status == 200
+    assert "closingTime" in closing
+    assert calls_status == 200
+    assert [item["callId"] for item in calls["callsList"]] == [call_id[2:]]
+    assert authorized_status == 200
+    assert authorized["authorized"] is True
+
+
+def test_read_errors(call_id) -> None:
+    """Prueba los errores de validación y de datos inexistentes."""
+    missing = "0x" + os.urandom(32).hex()
+    assert get_all(
+        [
+            "/calls/0x1234",
+            f"/calls/{missing}",
+            f"/proposal-data/{call_id}/{missing}",
+            "/authorized/0x1234",
+            f"/authorized/{Account.create().address}",
+        ]
+    ) == [
+        (400, {"message": messages.INVALID_CALLID}),
+        (404, {"message": messages.CALLID_NOT_FOUND}),
+        (404, {"message": messages.PROPOSAL_NOT_FOUND}),
+        (400, {"message": messages.INVALID_ADDRESS}),
+        (200, {"authorized": False}),
+    ]
+
+
+def test_reloads_artifacts(tester_chain, call_id) -> None:  # pylint: disable=W0613
+    """Prueba que un artefacto reescrito se recargue sin reiniciar el servidor."""
+    path = os.path.join(tester_chain.build_dir, "CFPFactory.json")
+    asyncserver.registry.check_interval = 0
+    with open(path, encoding="utf-8") as artifact:
+        text = artifact.read()
+    address = asyncserver.registry.factory_address
+    other = Account.create().address
+    with open(path, "w", encoding="utf-8") as artifact:
+        artifact.write(text.replace(address, other))
+    mtime = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+    assert get_all(["/contract-address"]) == [(200, {"address": other})]
+
+
+def test_create(tester_chain, call_id) -> None:  # pylint: disable=W0613
+    """Prueba el alta de un usuario, su autorización y la creación de un llamado."""
+    account = Account.create()
+    chain.unlock_account(tester_chain.w3, account)
+    factory_address = asyncserver.registry.factory_address
+    new_call_id = "0x" + os.urandom(32).hex()
+    create = {
+        "callId": new_call_id,
+        "signature": sign_text(f"{factory_address}{new_call_id[2:]}", account),
+        "closingTime": datetime.fromtimestamp(time.time() + 3600).isoformat(),
+    }
+    register = {
+        "address": account.address,
+        "signature": sign_text(factory_address, account),
+    }
+    responses = request_all(
+        [
+            ("POST", "/register", {"json": register}),
+            ("POST", "/register", {"json": register}),
+            ("POST", "/create", {"json": create}),
+            ("POST", f"/authorize/{account.address}", {}),
+            ("POST", f"/authorize/{account.address}", {}),
+            ("POST", "/create", {"json": create}),
+            ("POST", "/create", {"json": create}),
+            ("POST", "/create", {"data": "{}"}),
+        ]
+    )
+    statuses = [status for status, _ in responses]
+    assert statuses == [200, 403, 403, 200, 403, 201, 403, 400]
+    assert responses[1][1] == {"message": messages.USER_ALREADY_REGISTERED}
+    assert responses[2][1] == {"message": messages.UNAUTHORIZED}
+    assert responses[4][1] == {"message": messages.ALREADY_AUTHORIZED}
+    assert "txHash" in responses[5][1]
+    assert responses[6][1] == {"message": messages.ALREADY_CREATED}
+    assert responses[7][1] == {"message": messages.INVALID_MIMETYPE}
+
+    ((status, call),) = get_all([f"/calls/{new_call_id}"])
+    assert status == 200
+    assert call["creator"] == account.address
+
+
+def test_register_proposals(call_id) -> None:
+    """Prueba el registro de propuestas, sueltas y en lote, y sus errores."""
+    proposal, other = ("0x" + os.urandom(32).hex() for _ in range(2))
+    responses = request_all(
+        [
+            (
+                "POST",
+                "/register-proposals",
+                {"json": {"callId": call_id, "proposals": [proposal, proposal, "0x12"]}},
+            ),
+            (
+                "POST",
+                "/register-proposal",
+                {"json": {"callId": call_id, "proposal": proposal}},
+            ),
+            (
+                "POST",
+                "/register-proposal",
+                {
+                    "json": {"callId": call_id, "proposal": other},
+                    "headers": {"Prefer": "respond-async"},
+                },
+            ),
+            (
+                "POST",
+                "/register-proposal",
+                {"json": {"callId": "0x" + os.urandom(32).hex(), "proposal": "0x12"}},
+            ),
+            ("GET", f"/proposal-data/{call_id}/{proposal}", {}),
+        ]
+    )
+    (batch_status, batch), (again_status, again) = responses[:2]
+    assert batch_status == 200
+    assert [result["status"] for result in batch["results"]] == [
+        "registered",
+        "duplicate",
+        "invalid",
+    ]
+    assert (again_status, again) == (403, {"message": messages.ALREADY_REGISTERED})
+    async_status, queued = responses[2]
+    assert async_status == 202
+    assert responses[3] == (404, {"message": messages.CALLID_NOT_FOUND})
+    assert responses[4][0] == 200
+
+    ((status, transaction),) = get_all([f"/transactions/{queued['txHash']}"])
+    assert status == 200
+    assert transaction["status"] in ("queued", "pending", "mined")
+
+
+def test_head_and_open_calls(call_id) -> None:
+    """Prueba el último bloque y el listado de llamados abiertos."""
+    # El indice y el calendario van detras del nodo hasta la siguiente ronda
+    deadline = time.monotonic() + 10
+    while asyncserver.schedule.open_calls() == []:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    (
+        (head_status, head),
+        (open_status, open_calls),
+        (soon_status, soon),
+        (within_status, within),
+    ) = get_all(
+        [
+            "/head",
+            "/calls/open",
+            "/calls/closing-soon?within=60",
+            "/calls/closing-soon?within=x",
+        ]
+    )
+    assert head_status == 200
+    assert head["number"] >= 1
+    assert open_status == 200
+    assert [call["callId"] for call in open_calls["callsList"]] == [call_id[2:]]
+    assert "closingTime" in open_calls["callsList"][0]
+    assert (soon_status, soon) == (200, {"callsList": []})
+    assert (within_status, within) == (400, {"message": messages.INVALID_WITHIN})
+
+
+def test_events(call_id) -> None:
+    """Prueba que /events envíe el llamado creado a un cliente que se reanuda."""
+
+    async def run():
+        async with TestClient(TestServer(asyncserver.create_app())) as client:
+            response = await client.get("/events", params={"since": "0"})
+            assert response.status == 200
+            assert response.content_type == "text/event-stream"
+            event = None
+            while True:
+                line = (await response.content.readline()).decode().strip()
+                if line.startswith("event: "):
+                    event = line.removeprefix("event: ")
+                elif line.startswith("data: ") and event == "CFPCreated":
+                    return json.loads(line.removeprefix("data: "))["callId"]
+
+    # El llamado puede no estar indexado todavia: /events lo envia al indexarlo
+    assert asyncio.run(asyncio.wait_for(run(), 20)) == call_id
+    assert get_all(["/events?since=x"]) == [
+        (400, {"message": messages.INVALID_EVENT_ID})
+    ]
@@ -0,0 +1,53 @@
+"""Pruebas de RPCBatch cuando el envío del lote falla o queda incompleto."""
+
+import pytest
+
+from batching import BatchResult, RPCBatch
+from providers import FailoverProvider
+
+
+def test_send_error_reaches_every_result(tester_chain, monkeypatch) -> None:
+    """Prueba que si falla el envío, todas las consultas pendientes devuelvan el error."""
+    w3 = tester_chain.w3
+    batch = RPCBatch(w3)
+    first = batch.get_block("latest")
+    second = batch.get_block("latest")
+    requests_sent = []
+
+    def failing(method, params):
+        requests_sent.append(method)
+        if len(requests_sent) > 1:
+            raise ConnectionError("nodo caído")
+        return {"result": w3.provider.ethereum_tester.get_block_by_number("latest")}
+
+    monkeypatch.setattr(w3.provider, "make_request", failing)
+    with pytest.raises(ConnectionError):
+        second.get()
+    # La primera se había respondido antes del error
+    assert first.get().number == w3.eth.block_number
+    with pytest.raises(ConnectionError):
+        second.get()
+
+
+def test_missing_response_fails(tester_chain, monkeypatch) -> None:
+    """Prueba que una respuesta que falta en el lote no deje la consulta sin resolver."""
+    w3 = tester_chain.w3
+    w3.provider = FailoverProvider(["http://127.0.0.1:1"])
+    batch = RPCBatch(w3)
+    answered = batch.get_block(0)
+    missing = batch.get_block(1)
+    block = {"number": "0x0", "hash": "0x" + "00" * 32, "timestamp": "0x1"}
+
+    def partial(payload):
+        return [{"jsonrpc": "2.0", "id": payload[0]["id"], "result": block}]
+
+    monkeypatch.setattr(w3.provider, "make_batch_request", partial)
+    assert answered.get().timestamp == 1
+    with pytest.raises(ValueError):
+        missing.get()
+
+
+def test_unresolved_result_raises() -> None:
+    """Prueba que leer un resultado que nunca se resolvió falle en lugar de dar None."""
+    with pytest.raises(RuntimeError):
+        BatchResult(None, None).get()
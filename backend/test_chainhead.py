@@ -0,0 +1,47 @@
+"""Pruebas del último bloque que mantiene ChainHead, sobre la cadena en memoria."""
+
+from web3.datastructures import AttributeDict
+
+from chainhead import ChainHead
+
+
+def mine(w3, blocks):
+    """Mina bloques vacíos en la cadena en memoria."""
+    w3.provider.ethereum_tester.mine_blocks(blocks)
+
+
+def test_refresh_follows_rewind(tester_chain) -> None:
+    """Prueba que el head retroceda si la cadena vuelve a un bloque anterior."""
+    w3 = tester_chain.w3
+    head = ChainHead(w3)
+    snapshot = w3.provider.make_request("evm_snapshot", [])["result"]
+    start = head.refresh().number
+
+    mine(w3, 3)
+    assert head.refresh().number == start + 3
+    seen = []
+    head.subscribe(seen.append)
+
+    w3.provider.make_request("evm_revert", [snapshot])
+    assert head.refresh().number == start
+    assert [block.number for block in seen] == [start]
+
+    # Una rama nueva a la misma altura que la anterior también reemplaza el head
+    mine(w3, 3)
+    assert head.refresh().number == start + 3
+    assert head.current().hash == w3.eth.get_block("latest").hash
+
+
+def test_observe_ignores_older_blocks(tester_chain) -> None:
+    """Prueba que un bloque viejo leído en otra consulta no haga retroceder el head."""
+    w3 = tester_chain.w3
+    head = ChainHead(w3)
+    mine(w3, 2)
+    current = head.refresh()
+    older = w3.eth.get_block(current.number - 1)
+    head.observe(
+        AttributeDict(
+            {"number": older.number, "hash": older.hash, "timestamp": older.timestamp}
+        )
+    )
+    assert head.current() == current
@@ -0,0 +1,66 @@
+"""Pruebas de la recarga en caliente de los artefactos en ContractRegistry."""
+
+import json
+import os
+
+from contracts import ContractRegistry
+
+
+def artifact_path(tester_chain, name):
+    """Ruta del artefacto de un contrato desplegado en la cadena de la prueba."""
+    return os.path.join(tester_chain.build_dir, f"{name}.json")
+
+
+def new_registry(tester_chain):
+    """Registro sobre los artefactos de la cadena, que revisa cambios en cada llamada."""
+    registry = ContractRegistry(
+        tester_chain.w3,
+        artifact_path(tester_chain, "CFPFactory"),
+        artifact_path(tester_chain, "CFP"),
+        artifact_path(tester_chain, "Multicall"),
+        network_id=tester_chain.network_id,
+        check_interval=0,
+    )
+    registry.warm()
+    return registry
+
+
+def rewrite(path, text, step):
+    """Reescribe un archivo con un mtime distinto, como lo haría `truffle migrate`."""
+    with open(path, "w", encoding="utf-8") as artifact:
+        artifact.write(text)
+    mtime = os.stat(path).st_mtime_ns + step * 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_reload_rewritten_artifact(tester_chain) -> None:
+    """Prueba que un artefacto reescrito se recargue con la nueva dirección."""
+    registry = new_registry(tester_chain)
+    path = artifact_path(tester_chain, "CFPFactory")
+    with open(path, encoding="utf-8") as artifact:
+        data = json.load(artifact)
+    moved = "0x" + "11" * 20
+    data["networks"][tester_chain.network_id] = {"address": moved}
+    rewrite(path, json.dumps(data), 1)
+    assert registry.reload_if_changed()
+    assert registry.factory_address.lower() == moved
+    assert not registry.reload_if_changed()
+
+
+def test_reload_keeps_contracts_on_error(tester_chain) -> None:
+    """Prueba que un artefacto a medio escribir no reemplace a los contratos cargados."""
+    registry = new_registry(tester_chain)
+    address = registry.factory_address
+    path = artifact_path(tester_chain, "CFPFactory")
+    with open(path, encoding="utf-8") as artifact:
+        text = artifact.read()
+
+    rewrite(path, text[: len(text) // 2], 1)
+    assert not registry.reload_if_changed()
+    assert registry.factory_address == address
+    assert registry.factory.functions.callsCount().call() == 0
+
+    # Cuando truffle termina de escribirlo se recarga
+    rewrite(path, text, 2)
+    assert registry.reload_if_changed()
+    assert registry.factory_address == address
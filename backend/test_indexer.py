@@ -0,0 +1,213 @@
+"""Pruebas del índice de llamados y propuestas, sobre la cadena en memoria."""
+
+import os
+import time
+
+import pytest
+from eth_account import Account
+
+import chain
+from contracts import ContractRegistry
+from eventhub import EventHub
+from indexer import CallIndex, ChainIndexer
+from scheduler import ClosingSchedule
+
+
+@pytest.fixture
+def registry(tester_chain):
+    """Registro de los contratos desplegados, con la cuenta del dueño desbloqueada."""
+    chain.unlock_account(tester_chain.w3, tester_chain.owner)
+    return ContractRegistry(
+        tester_chain.w3,
+        os.path.join(tester_chain.build_dir, "CFPFactory.json"),
+        os.path.join(tester_chain.build_dir, "CFP.json"),
+        network_id=tester_chain.network_id,
+    )
+
+
+def transact(tester_chain, contract_function):
+    """Envía una transacción del dueño y espera a que se mine."""
+    tx_hash = contract_function.transact({"from": tester_chain.owner.address})
+    return tester_chain.w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def create_call(tester_chain, registry, proposals=()):
+    """Crea un llamado con sus propuestas y devuelve su ID."""
+    call_id = os.urandom(32)
+    factory = registry.factory
+    transact(tester_chain, factory.functions.create(call_id, int(time.time()) + 3600))
+    for proposal in proposals:
+        transact(tester_chain, factory.functions.registerProposal(call_id, proposal))
+    return "0x" + call_id.hex()
+
+
+def sync(indexer):
+    """Procesa bloques hasta alcanzar el último."""
+    while indexer.sync_once():
+        pass
+
+
+def sync_round(indexer):
+    """Procesa bloques hasta el último y avisa a los listeners, como el hilo."""
+    sync(indexer)
+    for listener in indexer.listeners:
+        listener()
+
+
+def reorg_past_cursor(tester_chain, registry, indexer):
+    """
+    Reemplaza un llamado por otro en un reorg que el índice procesa en una sola vuelta.
+
+    La rama nueva pasa el último bloque indexado de la descartada, y su llamado queda
+    en un bloque anterior a ese. Devuelve los IDs del llamado descartado y del nuevo.
+    """
+    w3 = tester_chain.w3
+    snapshot = w3.provider.make_request("evm_snapshot", [])["result"]
+    orphaned = create_call(tester_chain, registry)
+    w3.provider.ethereum_tester.mine_blocks(3)
+    sync_round(indexer)
+    cursor = indexer.index.synced_block
+
+    w3.provider.make_request("evm_revert", [snapshot])
+    replacement = create_call(tester_chain, registry)
+    w3.provider.ethereum_tester.mine_blocks(4)
+    sync_round(indexer)
+    assert indexer.index.get_call_block(replacement) <= cursor
+    return orphaned, replacement
+
+
+def test_reorg_rolls_back_orphaned_rows(tester_chain, registry) -> None:
+    """Prueba que un reorg quite los llamados y propuestas de la rama descartada."""
+    w3 = tester_chain.w3
+    index = CallIndex()
+    indexer = ChainIndexer(w3, registry, index)
+    rollbacks = []
+    indexer.rollback_listeners.append(lambda: rollbacks.append(index.synced_block))
+    kept = create_call(tester_chain, registry)
+    sync(indexer)
+    snapshot = w3.provider.make_request("evm_snapshot", [])["result"]
+
+    proposal = os.urandom(32)
+    orphaned = create_call(tester_chain, registry, [proposal])
+    sync(indexer)
+    assert index.get_call(orphaned) is not None
+    assert index.get_proposal(orphaned, proposal) is not None
+    versions = (index.calls_version, index.proposals_version)
+
+    # La rama nueva llega más lejos que la descartada y tiene otro llamado
+    w3.provider.make_request("evm_revert", [snapshot])
+    w3.provider.ethereum_tester.mine_blocks(3)
+    replacement = create_call(tester_chain, registry)
+    sync(indexer)
+
+    assert len(rollbacks) == 1
+    assert index.get_call(kept) is not None
+    assert index.get_call(orphaned) is None
+    assert index.get_proposal(orphaned, proposal) is None
+    assert index.get_call(replacement) is not None
+    assert index.calls_version > versions[0]
+    assert index.proposals_version > versions[1]
+    assert index.checkpoints()[0] == (
+        w3.eth.block_number,
+        w3.eth.get_block("latest").hash.hex(),
+    )
+
+
+def test_restart_resumes_from_synced_block(
+    tester_chain, registry, tmp_path, monkeypatch
+) -> None:
+    """Prueba que al reiniciar se siga desde el último bloque procesado."""
+    w3 = tester_chain.w3
+    path = str(tmp_path / "index.sqlite3")
+    first = create_call(tester_chain, registry)
+    sync(ChainIndexer(w3, registry, CallIndex(path)))
+
+    second = create_call(tester_chain, registry)
+    index = CallIndex(path)
+    synced_block = index.synced_block
+    assert index.get_call(first) is not None
+    assert index.get_call(second) is None
+
+    requested = []
+    get_logs = w3.eth.get_logs
+    monkeypatch.setattr(
+        w3.eth, "get_logs", lambda params: requested.append(params) or get_logs(params)
+    )
+    sync(ChainIndexer(w3, registry, index))
+    # Los llamados y las propuestas se piden desde el bloque siguiente al procesado
+    assert {params["fromBlock"] for params in requested} == {synced_block + 1}
+    assert index.get_call(first) is not None
+    assert index.get_call(second) is not None
+
+
+def test_bind_wipes_index_of_other_factory(tester_chain, registry, tmp_path) -> None:
+    """Prueba que un índice de otra factoría se descarte sin repetir versiones."""
+    path = str(tmp_path / "index.sqlite3")
+    call_id = create_call(tester_chain, registry)
+    sync(ChainIndexer(tester_chain.w3, registry, CallIndex(path)))
+
+    index = CallIndex(path)
+    calls_version = index.calls_version
+    index.bind(registry.factory_address)
+    assert index.get_call(call_id) is not None
+
+    index.bind(Account.create().address)
+    assert index.get_call(call_id) is None
+    assert index.synced_block == -1
+    assert index.calls_version > calls_version
+
+
+def test_single_leader_writes_index(tester_chain, registry, tmp_path) -> None:
+    """Prueba que de dos indexadores sobre el mismo archivo solo uno escriba."""
+    w3 = tester_chain.w3
+    path = str(tmp_path / "index.sqlite3")
+    leader = ChainIndexer(w3, registry, CallIndex(path), lock_path=f"{path}.lock")
+    follower = ChainIndexer(w3, registry, CallIndex(path), lock_path=f"{path}.lock")
+
+    assert leader.is_leader()
+    assert not follower.is_leader()
+    # Quien ya tiene el lock lo conserva en las rondas siguientes
+    assert leader.is_leader()
+
+    call_id = create_call(tester_chain, registry)
+    sync(leader)
+    follower.follow_once()
+    assert follower.index.synced_block == leader.index.synced_block
+    assert follower.is_synced()
+    assert follower.index.get_call(call_id) is not None
+
+    # Si el proceso que escribe termina, el lock queda libre para otro
+    leader._lock_file.close()  # pylint: disable=W0212
+    assert follower.is_leader()
+    follower._lock_file.close()  # pylint: disable=W0212
+
+
+def test_reorg_republishes_reindexed_blocks(tester_chain, registry) -> None:
+    """Prueba que se publiquen los bloques reindexados tras un reorg de una vuelta."""
+    index = CallIndex()
+    indexer = ChainIndexer(tester_chain.w3, registry, index)
+    hub = EventHub(index, str)
+    indexer.listeners.append(hub.poll)
+    indexer.rollback_listeners.append(hub.rewind)
+    sync_round(indexer)
+    subscription, _ = hub.subscribe()
+
+    orphaned, replacement = reorg_past_cursor(tester_chain, registry, indexer)
+    published = []
+    while (block := subscription.get(timeout=0)) is not None:
+        published.extend(event.call_id for event in block[1])
+    assert published == [orphaned, replacement]
+
+
+def test_reorg_drops_orphaned_open_calls(tester_chain, registry) -> None:
+    """Prueba que un llamado descartado en un reorg de una vuelta no siga abierto."""
+    index = CallIndex()
+    indexer = ChainIndexer(tester_chain.w3, registry, index)
+    schedule = ClosingSchedule(index)
+    indexer.listeners.append(schedule.poll)
+    indexer.rollback_listeners.append(schedule.reset)
+    kept = create_call(tester_chain, registry)
+    sync_round(indexer)
+
+    _, replacement = reorg_past_cursor(tester_chain, registry, indexer)
+    assert {call.call_id for call in schedule.open_calls()} == {kept, replacement}
@@ -0,0 +1,43 @@
+"""Pruebas de la suma de métricas entre procesos, como con varios workers."""
+
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+WORKERS = 2
+
+
+def run(code, metrics_dir):
+    """Corre código en un proceso nuevo que comparte el directorio de métricas."""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(metrics_dir))
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def test_render_adds_up_processes(tmp_path) -> None:
+    """Prueba que /metrics de cualquier worker cuente lo que hicieron todos."""
+    for _ in range(WORKERS):
+        run(
+            "import types, metrics\n"
+            "metrics.RPC_CALLS.inc(method='eth_call')\n"
+            "metrics.CACHES.watch('flags', types.SimpleNamespace(hits=3, misses=1))\n"
+            "metrics.start_request()\n"
+            "metrics.finish_request('/calls', 'GET', 200)\n",
+            tmp_path,
+        )
+
+    text = run("import metrics; print(metrics.render())", tmp_path)
+    assert f'rpc_calls_total{{method="eth_call"}} {float(WORKERS)}' in text
+    assert f'api_cache_hits_total{{cache="flags"}} {3.0 * WORKERS}' in text
+    assert f'api_cache_misses_total{{cache="flags"}} {float(WORKERS)}' in text
+    assert (
+        'api_request_duration_seconds_count{endpoint="/calls",method="GET",'
+        f'status="200"}} {float(WORKERS)}'
+    ) in text
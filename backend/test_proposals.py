@@ -0,0 +1,53 @@
+"""Pruebas del registro de propuestas en lote, con la cadena en memoria.
+
+Usan el servidor importado por `conftest.py`, así que solo corren con
+`CHAIN_BACKEND=tester`.
+"""
+
+import os
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("CHAIN_BACKEND") != "tester",
+    reason="Necesita el servidor con la cadena en memoria",
+)
+
+
+@pytest.fixture
+def server():
+    """El módulo del servidor, con los servicios ya levantados."""
+    import apiserver  # pylint: disable=C0415
+
+    return apiserver
+
+
+def test_competing_registration_is_not_reported(server, monkeypatch) -> None:
+    """Prueba que no se informe como propia una propuesta registrada por otro."""
+    call_id = "0x" + os.urandom(32).hex()
+    factory = server.registry.factory
+    create = factory.functions.createFor(
+        bytes.fromhex(call_id[2:]), int(time.time()) + 3600, server.owner.address
+    )
+    server.tx_manager.wait(server.tx_manager.submit(create))
+    cfp_address = factory.functions.calls(call_id).call()[1]
+    taken, new = os.urandom(32), os.urandom(32)
+    server.tx_manager.wait(
+        server.tx_manager.submit(
+            server.registry.cfp(cfp_address).functions.registerProposals([taken])
+        )
+    )
+
+    # Ni el índice ni la lectura previa la ven, como si se registrara recién después
+    monkeypatch.setattr(server.call_index, "get_proposal", lambda *_: None)
+    monkeypatch.setattr(
+        server, "read_all", lambda w3, functions, _: [None] * len(functions)
+    )
+    response = server.app.test_client().post(
+        "/register-proposals",
+        json={"callId": call_id, "proposals": ["0x" + taken.hex(), "0x" + new.hex()]},
+    )
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.get_json()["results"]]
+    assert statuses == ["alreadyRegistered", "registered"]
@@ -0,0 +1,147 @@
+"""Pruebas de la conmutación por error de FailoverProvider, con nodos HTTP falsos."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from providers import FailoverProvider, NodeUnavailable
+
+
+class FakeNode:
+    """
+    Nodo JSON-RPC local que responde el nombre del método pedido.
+
+    `delay` demora cada respuesta y `status` responde con ese código de error.
+    """
+
+    def __init__(self):
+        self.methods = []
+        self.delay = 0.0
+        self.status = 200
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Responde cada petición con el estado actual del nodo."""
+
+            def do_POST(self):  # pylint: disable=C0103
+                """Atiende una petición JSON-RPC."""
+                length = int(self.headers["Content-Length"])
+                request = json.loads(self.rfile.read(length))
+                node.methods.append(request["method"])
+                time.sleep(node.delay)
+                body = json.dumps(
+                    {"jsonrpc": "2.0", "id": request["id"], "result": request["method"]}
+                ).encode()
+                self.send_response(node.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=W0221
+                """No escribe cada petición en la salida de las pruebas."""
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        """Detiene el servidor."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def nodes():
+    """Un nodo primario y uno secundario."""
+    primary, secondary = FakeNode(), FakeNode()
+    yield primary, secondary
+    primary.close()
+    secondary.close()
+
+
+def test_read_fails_over_on_timeout(nodes) -> None:
+    """Prueba que una lectura lenta pase al otro nodo sin esperar el timeout largo."""
+    primary, secondary = nodes
+    primary.delay = 2.0
+    provider = FailoverProvider(
+        [primary.url, secondary.url], read_timeout=0.2, timeout=10.0
+    )
+    # Sin latencia medida el primario es el primero en recibir la lectura
+    provider.nodes[1].latency = 1.0
+
+    start = time.monotonic()
+    assert provider.make_request("eth_blockNumber", [])["result"] == "eth_blockNumber"
+    assert time.monotonic() - start < 1.0
+    assert primary.methods == ["eth_blockNumber"]
+    assert secondary.methods == ["eth_blockNumber"]
+
+
+def test_breaker_skips_failing_node(nodes) -> None:
+    """Prueba que un nodo que falla quede fuera hasta que pase el cooldown."""
+    primary, secondary = nodes
+    secondary.status = 500
+    provider = FailoverProvider(
+        [primary.url, secondary.url], failure_threshold=2, cooldown=0.3
+    )
+    # El secundario parece el más rápido, así que se lo prueba primero
+    provider.nodes[0].latency = 1.0
+
+    for _ in range(2):
+        assert provider.make_request("eth_chainId", [])["result"] == "eth_chainId"
+    assert len(secondary.methods) == 2
+    assert provider.nodes[1].opened_at is not None
+
+    # Con el circuito abierto las lecturas no lo tocan
+    provider.make_request("eth_chainId", [])
+    assert len(secondary.methods) == 2
+
+    # Pasado el cooldown una sola prueba vuelve a cerrarlo
+    secondary.status = 200
+    time.sleep(0.3)
+    provider.make_request("eth_chainId", [])
+    assert len(secondary.methods) == 3
+    assert provider.nodes[1].opened_at is None
+
+
+def test_every_node_failing_raises(nodes) -> None:
+    """Prueba que sin ningún nodo disponible la lectura falle tras los reintentos."""
+    primary, secondary = nodes
+    primary.status = secondary.status = 503
+    provider = FailoverProvider([primary.url, secondary.url], retries=2, backoff=0)
+    with pytest.raises(NodeUnavailable):
+        provider.make_request("eth_blockNumber", [])
+    assert len(primary.methods) + len(secondary.methods) == 3
+
+
+def test_reads_prefer_primary_after_write(nodes, tmp_path) -> None:
+    """Prueba que tras una escritura las lecturas de cada proceso vayan al primario."""
+    primary, secondary = nodes
+    mark = str(tmp_path / "write")
+    urls = [primary.url, secondary.url]
+    writer = FailoverProvider(urls, write_pin=1.0, write_mark=mark)
+    reader = FailoverProvider(urls, write_pin=1.0, write_mark=mark, mark_interval=0.2)
+    for provider in (writer, reader):
+        provider.nodes[0].latency = 1.0
+
+    reader.make_request("eth_call", [])
+    assert secondary.methods == ["eth_call"]
+
+    writer.make_request("eth_sendRawTransaction", ["0x00"])
+    writer.make_request("eth_call", [])
+    assert primary.methods == ["eth_sendRawTransaction", "eth_call"]
+
+    # El otro proceso no vuelve a leer la marca hasta que pasa mark_interval
+    reader.make_request("eth_call", [])
+    assert secondary.methods == ["eth_call", "eth_call"]
+    time.sleep(0.2)
+    reader.make_request("eth_call", [])
+    assert primary.methods == ["eth_sendRawTransaction", "eth_call", "eth_call"]
+
+    # Pasado el rato las lecturas vuelven al nodo más sano
+    time.sleep(1.0)
+    reader.make_request("eth_call", [])
+    assert secondary.methods == ["eth_call", "eth_call", "eth_call"]
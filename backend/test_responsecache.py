@@ -0,0 +1,88 @@
+"""Pruebas de las respuestas cacheadas del servidor, con la cadena en memoria.
+
+Usan el servidor importado por `conftest.py`, así que solo corren con
+`CHAIN_BACKEND=tester`.
+"""
+
+import os
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("CHAIN_BACKEND") != "tester",
+    reason="Necesita el servidor con la cadena en memoria",
+)
+
+
+@pytest.fixture
+def server():
+    """El módulo del servidor, con su caché de respuestas vacía y el índice al día."""
+    import apiserver  # pylint: disable=C0415
+
+    wait_until(apiserver.indexer.is_synced)
+    apiserver.response_cache.clear()
+    return apiserver
+
+
+def wait_until(condition, timeout=10):
+    """Espera a que los hilos del servidor cumplan una condición."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def create_call(server):
+    """Crea un llamado del dueño y espera a que el índice lo tenga."""
+    call_id = "0x" + os.urandom(32).hex()
+    factory = server.registry.factory
+    tx_hash = server.tx_manager.submit(
+        factory.functions.createFor(
+            bytes.fromhex(call_id[2:]), int(time.time()) + 3600, server.owner.address
+        )
+    )
+    server.tx_manager.wait(tx_hash)
+    wait_until(lambda: server.call_index.get_call(call_id) is not None)
+    return call_id
+
+
+def test_listing_key_ignores_query_spelling(server) -> None:
+    """Prueba que el mismo listado pedido con otra query string use la misma entrada."""
+    client = server.app.test_client()
+    first = client.get("/calls?offset=0&limit=5&expand=closingTime")
+    hits = server.response_cache.hits
+    second = client.get("/calls?expand=closingTime,&limit=5&offset=00")
+    assert first.status_code == second.status_code == 200
+    assert server.response_cache.hits == hits + 1
+    assert second.get_data() == first.get_data()
+
+
+def test_immutable_once_final(server) -> None:
+    """Prueba que un llamado nuevo se revalide hasta que su bloque sea final."""
+    client = server.app.test_client()
+    call_id = create_call(server)
+
+    response = client.get(f"/calls/{call_id}")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == server.LISTING_CACHE_CONTROL
+    assert "ETag" in response.headers
+
+    server.w3.provider.ethereum_tester.mine_blocks(server.settings.final_depth)
+    server.chain_head.refresh()
+    response = client.get(f"/calls/{call_id.upper().replace('0X', '0x')}")
+    assert response.headers["Cache-Control"] == server.IMMUTABLE_CACHE_CONTROL
+    hits = server.response_cache.hits
+    assert client.get(f"/calls/{call_id}").get_data() == response.get_data()
+    assert server.response_cache.hits == hits + 1
+
+
+def test_rollback_clears_cache(server) -> None:
+    """Prueba que las respuestas cacheadas se descarten cuando el índice retrocede."""
+    client = server.app.test_client()
+    assert client.get("/calls").status_code == 200
+    assert len(server.response_cache) == 1
+
+    # Un retroceso sin filas descartadas alcanza para que el indexador avise
+    server.call_index.rollback(server.call_index.synced_block)
+    wait_until(lambda: len(server.response_cache) == 0)
@@ -0,0 +1,74 @@
+"""Pruebas del envío en segundo plano de TransactionManager y de sus nonces."""
+
+import threading
+
+import pytest
+from eth_account import Account
+
+from contracts import ContractRegistry
+from txmanager import FileNonces, TransactionFailed, TransactionManager
+
+
+def factory(tester_chain):
+    """La factoría desplegada en la cadena de la prueba."""
+    registry = ContractRegistry(
+        tester_chain.w3,
+        f"{tester_chain.build_dir}/CFPFactory.json",
+        f"{tester_chain.build_dir}/CFP.json",
+        network_id=tester_chain.network_id,
+    )
+    return registry.factory
+
+
+def authorize(contract):
+    """Una transacción del dueño que siempre se puede enviar."""
+    return contract.functions.authorize(Account.create().address)
+
+
+def test_failed_send_releases_queued_nonces(tester_chain, monkeypatch) -> None:
+    """Prueba que tras un envío fallido las encoladas fallen y no quede un hueco."""
+    w3 = tester_chain.w3
+    contract = factory(tester_chain)
+    send = w3.eth.send_raw_transaction
+    release = threading.Event()
+    calls = []
+
+    def failing_send(raw_transaction):
+        calls.append(raw_transaction)
+        if len(calls) == 1:
+            release.wait(10)
+            raise ValueError("El nodo rechazó la transacción")
+        return send(raw_transaction)
+
+    monkeypatch.setattr(w3.eth, "send_raw_transaction", failing_send)
+    tx_manager = TransactionManager(w3, tester_chain.owner)
+    start = w3.eth.get_transaction_count(tester_chain.owner.address)
+
+    failed = tx_manager.submit(authorize(contract))
+    queued = [tx_manager.submit(authorize(contract)) for _ in range(2)]
+    release.set()
+    for tx_hash in [failed, *queued]:
+        with pytest.raises(TransactionFailed):
+            tx_manager.wait(tx_hash, timeout=10)
+        assert tx_manager.status(tx_hash)["status"] == "failed"
+    assert len(calls) == 1
+
+    # La siguiente reutiliza el nonce de la que falló en lugar de quedar detrás
+    receipt = tx_manager.wait(tx_manager.submit(authorize(contract)), timeout=10)
+    assert receipt.status == 1
+    assert w3.eth.get_transaction_count(tester_chain.owner.address) == start + 1
+
+
+def test_file_nonces_release_keeps_other_processes(tmp_path) -> None:
+    """Prueba que liberar nonces no descarte los que tomó otro proceso."""
+    path = str(tmp_path / "nonces.json")
+    first, second = FileNonces(path), FileNonces(path)
+
+    assert first.allocate(lambda: 7) == 7
+    assert second.allocate(lambda: 0) == 8
+    assert first.allocate(lambda: 0) == 9
+
+    first.release([7, 9])
+    assert second.allocate(lambda: 0) == 7
+    assert first.allocate(lambda: 0) == 9
+    assert second.allocate(lambda: 0) == 10
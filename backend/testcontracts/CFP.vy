@@ -0,0 +1,112 @@
+# pragma version ~=0.4.3
+# Version en Vyper de contract/contracts/CFP.sol para la cadena en memoria de las
+# pruebas: misma ABI (salvo setName/getName de ENS), mismos eventos y mensajes de error.
+
+event ProposalRegistered:
+    proposal: bytes32
+    sender: address
+    blockNumber: uint256
+
+struct ProposalData:
+    sender: address
+    blockNumber: uint256
+    timestamp: uint256
+
+MAX_PROPOSALS: constant(uint256) = 1000000
+MAX_BATCH: constant(uint256) = 1000
+
+CFPId: bytes32
+CFPClosingTime: uint256
+CFPCreator: address
+revRegistrar: address
+pubResolver: address
+
+proposalsMapping: HashMap[bytes32, ProposalData]
+proposalsIndex: DynArray[bytes32, MAX_PROPOSALS]
+
+
+@deploy
+def __init__(_callId: bytes32, _closingTime: uint256, revReg: address, pubRes: address):
+    assert _closingTime > block.timestamp, "El cierre de la convocatoria no puede estar en el pasado"
+    self.CFPId = _callId
+    self.CFPClosingTime = _closingTime
+    self.CFPCreator = msg.sender
+    self.revRegistrar = revReg
+    self.pubResolver = pubRes
+
+
+@external
+@view
+def proposalData(proposal: bytes32) -> ProposalData:
+    return self.proposalsMapping[proposal]
+
+
+@external
+@view
+def proposals(index: uint256) -> bytes32:
+    return self.proposalsIndex[index]
+
+
+@external
+@view
+def closingTime() -> uint256:
+    return self.CFPClosingTime
+
+
+@external
+@view
+def callId() -> bytes32:
+    return self.CFPId
+
+
+@external
+@view
+def creator() -> address:
+    return self.CFPCreator
+
+
+@external
+@view
+def proposalCount() -> uint256:
+    return len(self.proposalsIndex)
+
+
+@external
+@view
+def proposalTimestamp(proposal: bytes32) -> uint256:
+    return self.proposalsMapping[proposal].timestamp
+
+
+@internal
+def _storeProposal(proposal: bytes32, sender: address):
+    self.proposalsMapping[proposal] = ProposalData(
+        sender=sender, blockNumber=block.number, timestamp=block.timestamp
+    )
+    self.proposalsIndex.append(proposal)
+    log ProposalRegistered(proposal=proposal, sender=sender, blockNumber=block.number)
+
+
+@internal
+def _registerProposal(proposal: bytes32, sender: address):
+    assert self.proposalsMapping[proposal].timestamp == 0, "La propuesta ya ha sido registrada"
+    assert block.timestamp < self.CFPClosingTime, "Convocatoria cerrada"
+    self._storeProposal(proposal, sender)
+
+
+@external
+def registerProposal(proposal: bytes32):
+    self._registerProposal(proposal, msg.sender)
+
+
+@external
+def registerProposals(_proposals: DynArray[bytes32, MAX_BATCH]):
+    assert block.timestamp < self.CFPClosingTime, "Convocatoria cerrada"
+    for proposal: bytes32 in _proposals:
+        if self.proposalsMapping[proposal].timestamp == 0:
+            self._storeProposal(proposal, msg.sender)
+
+
+@external
+def registerProposalFor(proposal: bytes32, sender: address):
+    assert msg.sender == self.CFPCreator, "Solo el creador puede hacer esta llamada"
+    self._registerProposal(proposal, sender)
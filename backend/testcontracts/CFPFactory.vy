@@ -0,0 +1,236 @@
+# pragma version ~=0.4.3
+# Version en Vyper de contract/contracts/CFPFactory.sol para la cadena en memoria de las
+# pruebas: misma ABI (salvo setName/getName de ENS), mismos eventos y mensajes de error.
+# build.py reemplaza CFP_INITCODE por el bytecode de CFP.vy antes de compilarlo.
+
+event CFPCreated:
+    creator: address
+    callId: bytes32
+    cfp: address
+
+struct CallForProposals:
+    creator: address
+    cfp: address
+    callId: bytes32
+    timestamp: uint256
+
+UNREGISTERED: constant(uint8) = 0
+PENDING: constant(uint8) = 1
+UNAUTHORIZED: constant(uint8) = 2
+AUTHORIZED: constant(uint8) = 3
+
+MAX_CALLS: constant(uint256) = 1000
+MAX_PENDING: constant(uint256) = 1000
+
+CFP_INITCODE: constant(Bytes[CFP_INITCODE_SIZE]) = CFP_INITCODE_VALUE
+
+factoryOwner: address
+revRegistrar: address
+pubResolver: address
+
+callsMapping: HashMap[bytes32, CallForProposals]
+statusMapping: HashMap[address, uint8]
+CFPMapping: HashMap[address, DynArray[bytes32, MAX_CALLS]]
+creatorsArray: DynArray[address, MAX_CALLS]
+registerPendingArray: DynArray[address, MAX_PENDING]
+CFPList: DynArray[CallForProposals, MAX_CALLS]
+
+
+@deploy
+def __init__(revReg: address, pubRes: address):
+    self.factoryOwner = msg.sender
+    self.revRegistrar = revReg
+    self.pubResolver = pubRes
+    self.statusMapping[msg.sender] = AUTHORIZED
+
+
+@internal
+@view
+def _isAuthorized(account: address) -> bool:
+    return self.statusMapping[account] == AUTHORIZED
+
+
+@internal
+def _createFor(callId: bytes32, timestamp: uint256, creator: address) -> address:
+    cfp: address = raw_create(
+        CFP_INITCODE, callId, timestamp, self.revRegistrar, self.pubResolver
+    )
+    newCFP: CallForProposals = CallForProposals(
+        creator=creator, cfp=cfp, callId=callId, timestamp=timestamp
+    )
+    self.callsMapping[callId] = newCFP
+    self.CFPList.append(newCFP)
+    if len(self.CFPMapping[creator]) == 0:
+        self.creatorsArray.append(creator)
+    self.CFPMapping[creator].append(callId)
+    log CFPCreated(creator=creator, callId=callId, cfp=cfp)
+    return cfp
+
+
+@internal
+def _removePending(creator: address):
+    pending: DynArray[address, MAX_PENDING] = []
+    for account: address in self.registerPendingArray:
+        if account != creator:
+            pending.append(account)
+    self.registerPendingArray = pending
+
+
+@internal
+@pure
+def _pageEnd(offset: uint256, limit: uint256, length: uint256) -> uint256:
+    if offset >= length:
+        return offset
+    if limit > length - offset:
+        return length
+    return offset + limit
+
+
+@external
+@view
+def owner() -> address:
+    return self.factoryOwner
+
+
+@external
+@view
+def calls(callId: bytes32) -> CallForProposals:
+    return self.callsMapping[callId]
+
+
+@external
+@view
+def creators(index: uint256) -> address:
+    return self.creatorsArray[index]
+
+
+@external
+def create(callId: bytes32, timestamp: uint256) -> address:
+    assert self.callsMapping[callId].creator == empty(address), "El llamado ya existe"
+    assert self._isAuthorized(msg.sender), "No autorizado"
+    return self._createFor(callId, timestamp, msg.sender)
+
+
+@external
+def createFor(callId: bytes32, timestamp: uint256, creator: address) -> address:
+    assert self.callsMapping[callId].creator == empty(address), "El llamado ya existe"
+    assert msg.sender == self.factoryOwner, "Solo el creador puede hacer esta llamada"
+    assert self._isAuthorized(creator), "No autorizado"
+    return self._createFor(callId, timestamp, creator)
+
+
+@external
+@view
+def creatorsCount() -> uint256:
+    return len(self.creatorsArray)
+
+
+@external
+@view
+def createdBy(creator: address, index: uint256) -> bytes32:
+    return self.CFPMapping[creator][index]
+
+
+@external
+@view
+def createdByCount(creator: address) -> uint256:
+    return len(self.CFPMapping[creator])
+
+
+@external
+def registerProposal(callId: bytes32, proposal: bytes32):
+    assert self.callsMapping[callId].creator != empty(address), "El llamado no existe"
+    extcall CFP(self.callsMapping[callId].cfp).registerProposalFor(proposal, msg.sender)
+
+
+@external
+def register():
+    assert self.statusMapping[msg.sender] == UNREGISTERED, "Ya se ha registrado"
+    self.statusMapping[msg.sender] = PENDING
+    self.registerPendingArray.append(msg.sender)
+
+
+@external
+def authorize(creator: address):
+    assert msg.sender == self.factoryOwner, "Solo el creador puede hacer esta llamada"
+    self.statusMapping[creator] = AUTHORIZED
+    self._removePending(creator)
+
+
+@external
+def unauthorize(creator: address):
+    assert msg.sender == self.factoryOwner, "Solo el creador puede hacer esta llamada"
+    self.statusMapping[creator] = UNAUTHORIZED
+    self._removePending(creator)
+
+
+@external
+@view
+def getAllPending() -> DynArray[address, MAX_PENDING]:
+    assert msg.sender == self.factoryOwner, "Solo el creador puede hacer esta llamada"
+    return self.registerPendingArray
+
+
+@external
+@view
+def getPending(index: uint256) -> address:
+    assert msg.sender == self.factoryOwner, "Solo el creador puede hacer esta llamada"
+    return self.registerPendingArray[index]
+
+
+@external
+@view
+def pendingCount() -> uint256:
+    assert msg.sender == self.factoryOwner, "Solo el creador puede hacer esta llamada"
+    return len(self.registerPendingArray)
+
+
+@external
+@view
+def isRegistered(account: address) -> bool:
+    status: uint8 = self.statusMapping[account]
+    return status == PENDING or status == AUTHORIZED
+
+
+@external
+@view
+def isAuthorized(account: address) -> bool:
+    return self._isAuthorized(account)
+
+
+@external
+@view
+def callsList() -> DynArray[CallForProposals, MAX_CALLS]:
+    return self.CFPList
+
+
+@external
+@view
+def callsCount() -> uint256:
+    return len(self.CFPList)
+
+
+@external
+@view
+def callsPage(offset: uint256, limit: uint256) -> DynArray[CallForProposals, MAX_CALLS]:
+    end: uint256 = self._pageEnd(offset, limit, len(self.CFPList))
+    page: DynArray[CallForProposals, MAX_CALLS] = []
+    for i: uint256 in range(offset, end, bound=MAX_CALLS):
+        page.append(self.CFPList[i])
+    return page
+
+
+@external
+@view
+def createdByPage(
+    creator: address, offset: uint256, limit: uint256
+) -> DynArray[CallForProposals, MAX_CALLS]:
+    end: uint256 = self._pageEnd(offset, limit, len(self.CFPMapping[creator]))
+    page: DynArray[CallForProposals, MAX_CALLS] = []
+    for i: uint256 in range(offset, end, bound=MAX_CALLS):
+        page.append(self.callsMapping[self.CFPMapping[creator][i]])
+    return page
+
+
+interface CFP:
+    def registerProposalFor(proposal: bytes32, sender: address): nonpayable
@@ -0,0 +1,34 @@
+# pragma version ~=0.4.3
+# Version en Vyper de contract/contracts/Multicall.sol para la cadena en memoria de las
+# pruebas. Las respuestas se acotan a MAX_RETURN bytes, suficiente para las vistas que
+# agrupa la API (enteros, direcciones y booleanos).
+
+struct Call:
+    target: address
+    callData: Bytes[MAX_CALLDATA]
+
+struct Result:
+    success: bool
+    returnData: Bytes[MAX_RETURN]
+
+MAX_CALLS: constant(uint256) = 500
+MAX_CALLDATA: constant(uint256) = 256
+MAX_RETURN: constant(uint256) = 128
+
+
+@external
+@view
+def tryAggregate(calls: DynArray[Call, MAX_CALLS]) -> (uint256, DynArray[Result, MAX_CALLS]):
+    results: DynArray[Result, MAX_CALLS] = []
+    for call: Call in calls:
+        success: bool = False
+        returnData: Bytes[MAX_RETURN] = b""
+        success, returnData = raw_call(
+            call.target,
+            call.callData,
+            max_outsize=MAX_RETURN,
+            is_static_call=True,
+            revert_on_failure=False,
+        )
+        results.append(Result(success=success, returnData=returnData))
+    return block.number, results
@@ -0,0 +1,71 @@
+"""Compila las versiones en Vyper de los contratos a artefactos con formato de truffle.
+
+Las pruebas con `CHAIN_BACKEND=tester` despliegan estos artefactos cuando no hay un
+build de truffle (`contract/build/contracts`), así corren sin solc ni Ganache. Los
+artefactos compilados se versionan junto a las fuentes; solo hace falta volver a
+generarlos si cambian los `.vy`, con Vyper instalado:
+
+    python testcontracts/build.py
+"""
+
+import json
+import os
+
+import vyper
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def compile_source(source):
+    """
+    Compile a Vyper contract.
+
+    Args:
+        source (str): The source code.
+
+    Returns:
+        dict: The `abi` and the hex `bytecode` (with its `0x` prefix).
+    """
+    output = vyper.compile_code(source, output_formats=["abi", "bytecode"])
+    return {"abi": output["abi"], "bytecode": output["bytecode"]}
+
+
+def read_source(name):
+    """Read the source of a contract of this directory."""
+    with open(os.path.join(HERE, f"{name}.vy"), encoding="utf-8") as source:
+        return source.read()
+
+
+def write_artifact(name, compiled):
+    """Write a contract as a truffle artifact, without deployed networks."""
+    artifact = {
+        "contractName": name,
+        "abi": compiled["abi"],
+        "bytecode": compiled["bytecode"],
+        "networks": {},
+        "compiler": {"name": "vyper", "version": vyper.__version__},
+    }
+    with open(os.path.join(HERE, f"{name}.json"), "w", encoding="utf-8") as output:
+        json.dump(artifact, output, indent=2)
+        output.write("\n")
+
+
+def build():
+    """Compile every contract and write its artifact."""
+    cfp = compile_source(read_source("CFP"))
+    write_artifact("CFP", cfp)
+
+    # La factoria despliega cada CFP con raw_create, a partir de su bytecode
+    initcode = bytes.fromhex(cfp["bytecode"].removeprefix("0x"))
+    factory_source = (
+        read_source("CFPFactory")
+        .replace("CFP_INITCODE_SIZE", str(len(initcode)))
+        .replace("CFP_INITCODE_VALUE", f'x"{initcode.hex()}"')
+    )
+    write_artifact("CFPFactory", compile_source(factory_source))
+    write_artifact("Multicall", compile_source(read_source("Multicall")))
+
+
+if __name__ == "__main__":
+    build()
+    print(f"Artefactos de prueba compilados con Vyper {vyper.__version__} en {HERE}")
@@ -0,0 +1,76 @@
+"""Formato de los timestamps de la cadena en las respuestas de la API.
+
+Las fechas se devuelven en ISO 8601 en una zona horaria configurable (`--timezone`).
+La zona se resuelve una sola vez y el texto de cada segundo se recuerda, porque los
+mismos timestamps (cierres de llamados, bloques con varias propuestas) se repiten en
+muchas respuestas.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+from pytz import timezone
+
+DEFAULT_ZONE = "America/Argentina/Buenos_Aires"
+
+
+class TimestampFormatter:
+    """
+    Formats unix timestamps as ISO 8601 dates in a fixed time zone.
+
+    Usage:
+        timestamps = TimestampFormatter("America/Argentina/Buenos_Aires")
+        timestamps.iso(block.timestamp)
+        timestamps.iso_many(call[3] for call in calls)
+
+    Args:
+        zone (str): IANA name of the time zone.
+        max_size (int): Maximum number of formatted timestamps remembered.
+
+    Raises:
+        pytz.UnknownTimeZoneError: If the zone does not exist.
+    """
+
+    def __init__(self, zone=DEFAULT_ZONE, max_size=65536):
+        self.zone = timezone(zone)
+        # lru_cache esta en C: un acierto no ejecuta codigo Python
+        self._iso = lru_cache(maxsize=max_size)(self.to_datetime_iso)
+
+    def to_datetime_iso(self, timestamp):
+        """Format a timestamp without looking it up in the cache."""
+        return datetime.fromtimestamp(timestamp, self.zone).isoformat()
+
+    def iso(self, timestamp):
+        """
+        Format a timestamp.
+
+        Args:
+            timestamp (int): Seconds since the unix epoch.
+
+        Returns:
+            str: The ISO 8601 date in the configured zone.
+        """
+        return self._iso(timestamp)
+
+    def iso_many(self, timestamps):
+        """
+        Format a list of timestamps at once, e.g. the closing times of a listing.
+
+        Args:
+            timestamps (Iterable): Seconds since the unix epoch.
+
+        Returns:
+            list: The ISO 8601 date of each timestamp, in the same order.
+        """
+        # map llama directamente a la cache en C, sin una vuelta de Python por valor
+        return list(map(self._iso, timestamps))
+
+    @property
+    def hits(self):
+        """Number of timestamps served from the cache."""
+        return self._iso.cache_info().hits
+
+    @property
+    def misses(self):
+        """Number of timestamps that had to be formatted."""
+        return self._iso.cache_info().misses
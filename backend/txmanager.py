@@ -0,0 +1,333 @@
+"""Firma local de transacciones del dueño de la factoría y envío en segundo plano."""
+
+import contextlib
+import fcntl
+import heapq
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from time import monotonic
+
+from web3.exceptions import TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+GAS_MARGIN = 1.2
+GAS_PRICE_TTL = 60.0
+
+
+class TransactionFailed(Exception):
+    """Raised when a transaction could not be sent or was reverted."""
+
+
+class LocalNonces:
+    """Nonce counter of an account that only this process sends transactions from."""
+
+    def __init__(self):
+        self._next = None
+        self._free = []
+
+    def allocate(self, fetch):
+        """
+        Take the lowest released nonce, or else the next one.
+
+        Args:
+            fetch (callable): Returns the pending transaction count from the node.
+
+        Returns:
+            int: The nonce to use.
+        """
+        if self._free:
+            return heapq.heappop(self._free)
+        if self._next is None:
+            self._next = fetch()
+        nonce = self._next
+        self._next += 1
+        return nonce
+
+    def release(self, nonces):
+        """
+        Give back nonces whose transactions never reached the node.
+
+        They are handed out again before any new one, so the next transactions fill
+        the gap they left.
+
+        Args:
+            nonces (Iterable): The unused nonces.
+        """
+        for nonce in nonces:
+            heapq.heappush(self._free, nonce)
+
+
+class FileNonces:
+    """
+    Nonce counter shared by every process that sends transactions from an account.
+
+    The next nonce, and the nonces released by any process, are kept in a JSON file
+    guarded by an exclusive `flock`. After `ttl` seconds without transactions the
+    stored value is replaced by the node's count, so a nonce lost in a crash does
+    not leave a gap forever.
+
+    Args:
+        path (str): Path of the counter file.
+        ttl (float): Seconds after which the stored value is checked against the node.
+    """
+
+    def __init__(self, path, ttl=30.0):
+        self.path = path
+        self.ttl = ttl
+
+    def allocate(self, fetch):
+        """
+        Take the lowest released nonce, or else the next one.
+
+        Args:
+            fetch (callable): Returns the pending transaction count from the node.
+
+        Returns:
+            int: The nonce to use.
+        """
+        with self._state() as state:
+            stale = time.time() - state.get("time", 0) > self.ttl
+            if state.get("next") is None or stale:
+                # El nodo ya cuenta todo lo enviado: los liberados quedan por debajo
+                state.update(next=fetch(), free=[])
+            free = state.setdefault("free", [])
+            if free:
+                nonce = heapq.heappop(free)
+            else:
+                nonce = state["next"]
+                state["next"] = nonce + 1
+            state["time"] = time.time()
+            return nonce
+
+    def release(self, nonces):
+        """
+        Give back nonces whose transactions never reached the node.
+
+        Only those nonces are returned: the ones other processes hold are kept.
+        They are handed out again before any new one, so the next transactions of
+        any process fill the gap they left.
+
+        Args:
+            nonces (Iterable): The unused nonces.
+        """
+        with self._state() as state:
+            free = state.setdefault("free", [])
+            for nonce in nonces:
+                if nonce < state.get("next", 0) and nonce not in free:
+                    heapq.heappush(free, nonce)
+
+    @contextlib.contextmanager
+    def _state(self):
+        # Lee el estado con el lock tomado y lo vuelve a escribir al salir
+        with open(self.path, "a+", encoding="utf-8") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            file.seek(0)
+            try:
+                state = json.loads(file.read() or "{}")
+            except ValueError:
+                state = {}
+
+            yield state
+
+            file.seek(0)
+            file.truncate()
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class TransactionManager:
+    """
+    Signs transactions with a local account and sends them from a background queue.
+
+    Nonces are tracked locally (in-process, or in a file shared by every worker
+    process with `FileNonces`), so concurrent requests never race for the same
+    nonce and `submit` returns the transaction hash as soon as the transaction is
+    signed, without waiting for the node. A single worker thread sends the raw
+    transactions in nonce order.
+
+    If a transaction can not be sent, the ones queued after it are failed too,
+    since their nonces would sit behind a gap, and the unused nonces are released
+    to be taken again by the next transactions.
+
+    Args:
+        w3 (Web3): The Web3 instance used to reach the node.
+        account (LocalAccount): The account that signs and pays for the transactions.
+        max_tracked (int): Maximum number of transactions whose status is kept.
+        nonces (LocalNonces): Where the nonces are allocated; in-process if None.
+    """
+
+    def __init__(self, w3, account, max_tracked=10000, nonces=None):
+        self.w3 = w3
+        self.account = account
+        self.max_tracked = max_tracked
+        self.nonces = nonces or LocalNonces()
+
+        self._lock = threading.Lock()
+        self._chain_id = None
+        self._gas_price = None
+        self._gas_price_time = 0.0
+
+        self._queue = queue.Queue()
+        self._status_lock = threading.Lock()
+        self._status = OrderedDict()
+        self._sent = {}
+        self._thread = threading.Thread(
+            target=self._run, name="tx-manager", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, contract_function):
+        """
+        Sign a contract transaction and queue it to be sent.
+
+        The gas is estimated first, so transactions that would revert are rejected
+        here and never consume a nonce.
+
+        Args:
+            contract_function (ContractFunction): The bound function to call.
+
+        Returns:
+            str: The hash of the signed transaction.
+
+        Raises:
+            ContractLogicError: If the transaction would revert.
+        """
+        gas = contract_function.estimate_gas({"from": self.account.address})
+        with self._lock:
+            transaction = contract_function.build_transaction(
+                {
+                    "from": self.account.address,
+                    "nonce": self._next_nonce(),
+                    "gas": int(gas * GAS_MARGIN),
+                    "gasPrice": self._current_gas_price(),
+                    "chainId": self._current_chain_id(),
+                }
+            )
+            signed = self.account.sign_transaction(transaction)
+            tx_hash = signed.hash.hex()
+            self._track(tx_hash, {"status": "queued"})
+            self._sent[tx_hash] = threading.Event()
+            self._queue.put((tx_hash, transaction["nonce"], signed.rawTransaction))
+        return tx_hash
+
+    def wait(self, tx_hash, timeout=120):
+        """
+        Wait until a queued transaction is mined.
+
+        Args:
+            tx_hash (str): The hash returned by `submit`.
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            AttributeDict: The transaction receipt.
+
+        Raises:
+            TransactionFailed: If the transaction could not be sent or was reverted.
+        """
+        sent = self._sent.get(tx_hash)
+        if sent is not None:
+            sent.wait(timeout)
+        status = self._status.get(tx_hash, {})
+        if status.get("status") == "failed":
+            raise TransactionFailed(status["error"])
+
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+        if receipt.status == 0:
+            raise TransactionFailed("La transacción fue revertida")
+        return receipt
+
+    def status(self, tx_hash):
+        """
+        Get the status of a transaction.
+
+        Args:
+            tx_hash (str): The transaction hash.
+
+        Returns:
+            dict: The status (`queued`, `failed`, `pending`, `mined` or `reverted`)
+            and, once mined, the `blockNumber`; None if the transaction is unknown.
+        """
+        status = self._status.get(tx_hash)
+        if status is not None and status["status"] in ("queued", "failed"):
+            return dict(status)
+
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return {"status": "pending"} if status is not None else None
+        return {
+            "status": "mined" if receipt.status == 1 else "reverted",
+            "blockNumber": receipt.blockNumber,
+        }
+
+    def _run(self):
+        while True:
+            tx_hash, nonce, raw_transaction = self._queue.get()
+            try:
+                self.w3.eth.send_raw_transaction(raw_transaction)
+                self._track(tx_hash, {"status": "sent"})
+            except Exception as error:  # pylint: disable=W0718
+                logger.warning("No se pudo enviar la transacción %s: %s", tx_hash, error)
+                self._track(tx_hash, {"status": "failed", "error": str(error)})
+                self._discard_queued(nonce, error)
+            finally:
+                self._notify_sent(tx_hash)
+
+    def _discard_queued(self, failed_nonce, error):
+        # Con el lock tomado no se firma nada nuevo mientras se vacia la cola
+        with self._lock:
+            nonces = [failed_nonce]
+            while True:
+                try:
+                    tx_hash, nonce, _ = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                nonces.append(nonce)
+                self._track(
+                    tx_hash,
+                    {"status": "failed", "error": f"Descartada tras un error: {error}"},
+                )
+                self._notify_sent(tx_hash)
+            try:
+                used = self._pending_count()
+            except Exception:  # pylint: disable=W0718
+                # Si el nodo no responde, ninguna de estas llego a el
+                used = 0
+            # Los nonces debajo de la cuenta del nodo ya se usaron ("nonce too low")
+            self.nonces.release(nonce for nonce in nonces if nonce >= used)
+
+    def _notify_sent(self, tx_hash):
+        event = self._sent.pop(tx_hash, None)
+        if event is not None:
+            event.set()
+
+    def _track(self, tx_hash, status):
+        with self._status_lock:
+            self._status[tx_hash] = status
+            self._status.move_to_end(tx_hash)
+            while len(self._status) > self.max_tracked:
+                self._status.popitem(last=False)
+
+    def _next_nonce(self):
+        return self.nonces.allocate(self._pending_count)
+
+    def _pending_count(self):
+        return self.w3.eth.get_transaction_count(self.account.address, "pending")
+
+    def _current_chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _current_gas_price(self):
+        if monotonic() - self._gas_price_time > GAS_PRICE_TTL:
+            self._gas_price = self.w3.eth.gas_price
+            self._gas_price_time = monotonic()
+        return self._gas_price
@@ -0,0 +1,101 @@
+"""Micro-benchmark de la validación de los datos recibidos por el servidor de API.
+
+Compara el camino anterior (regex sin compilar, recorrido de la firma caracter por
+caracter y conversiones repetidas en cada handler) con los `parse_*` de
+`validators.py`, valor por valor y para el cuerpo completo de `/create`:
+
+    python validation_benchmark.py --number 100000
+"""
+
+import argparse
+import re
+import timeit
+from datetime import datetime
+
+from eth_account import Account
+from eth_utils import to_checksum_address
+
+from validators import parse_address, parse_bytes32, parse_signature, parse_timestamp
+
+ADDRESS = Account.create().address.lower()
+CALL_ID = "0x" + "ab" * 32
+SIGNATURE = "0x" + "1c" * 65
+CLOSING_TIME = "2030-01-01T12:00:00-03:00"
+
+
+def legacy_address(address):
+    """Address check and conversion as the handlers did it before."""
+    if not re.match(r"^0x[a-fA-F0-9]{40}$", address):
+        raise ValueError(address)
+    return to_checksum_address(address.lower())
+
+
+def legacy_call_id(call_id):
+    """Call ID check as the handlers did it before."""
+    if not isinstance(call_id, str) or not call_id.startswith("0x"):
+        raise ValueError(call_id)
+    if not re.match(r"^0x[0-9a-fA-F]{64}$", call_id):
+        raise ValueError(call_id)
+    # web3 decodificaba el string a bytes en cada llamada al contrato
+    return bytes.fromhex(call_id[2:])
+
+
+def legacy_signature(signature):
+    """Signature check as the handlers did it before."""
+    if not (
+        all(c in "0123456789abcdefABCDEF" for c in signature[2:])
+        and len(signature[2:]) == 130
+    ):
+        raise ValueError(signature)
+    return signature
+
+
+def legacy_create(body):
+    """Validation of the `/create` body as the handler did it before."""
+    legacy_signature(body["signature"])
+    legacy_call_id(body["callId"])
+    return datetime.fromisoformat(body["closingTime"])
+
+
+def fast_create(body):
+    """Validation of the `/create` body with the parsers."""
+    parse_signature(body["signature"])
+    parse_bytes32(body["callId"])
+    return parse_timestamp(body["closingTime"])
+
+
+CASES = {
+    "address": (legacy_address, parse_address, ADDRESS),
+    "callId": (legacy_call_id, parse_bytes32, CALL_ID),
+    "signature": (legacy_signature, parse_signature, SIGNATURE),
+    "create body": (
+        legacy_create,
+        fast_create,
+        {"signature": SIGNATURE, "callId": CALL_ID, "closingTime": CLOSING_TIME},
+    ),
+}
+
+
+def measure(function, value, number):
+    """
+    Time a validation function.
+
+    Returns:
+        float: The best time of five repetitions, in microseconds per call.
+    """
+    timer = timeit.Timer(lambda: function(value))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--number", type=int, default=20000, help="Llamadas por repetición"
+    )
+    args = parser.parse_args()
+
+    print(f"{'valor':<14}{'antes µs':>10}{'ahora µs':>10}{'speedup':>10}")
+    for name, (legacy, fast, sample) in CASES.items():
+        before = measure(legacy, sample, args.number)
+        after = measure(fast, sample, args.number)
+        print(f"{name:<14}{before:>10.2f}{after:>10.2f}{before / after:>9.1f}x")
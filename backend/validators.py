@@ -0,0 +1,337 @@
+"""Validaciones de los datos recibidos por el servidor de API.
+
+Las funciones `parse_*` validan un valor y lo devuelven ya convertido (direcciones en
+formato checksum, hashes y firmas decodificados a bytes, fechas como `datetime`), así
+los handlers no vuelven a convertirlo. Un `Field` asocia cada una al mensaje de error
+del endpoint, para declarar en un solo lugar qué recibe.
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+from eth_utils import to_checksum_address
+
+import messages
+
+_ADDRESS = re.compile(r"0x[0-9a-fA-F]{40}")
+
+EXPANDABLE_FIELDS = {"closingTime", "proposalCount"}
+# Parametros de /calls ya validados, que identifican la respuesta en la cache
+ListingQuery = namedtuple(
+    "ListingQuery", ("expand", "creator", "offset", "limit", "paginated")
+)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_PROPOSALS = 5000
+
+
+class ValidationError(ValueError):
+    """
+    Raised when a request value is not valid.
+
+    Args:
+        message (str): The message returned to the client.
+        status (int): The status code of the response.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class HexValue(str):
+    """
+    A validated `0x` prefixed hex string that keeps its decoded bytes in `raw`.
+
+    It is still a `str`, so it can be formatted, compared and used as a key like the
+    value received, while `raw` can be sent to the contracts without decoding it again.
+    """
+
+    def __new__(cls, text, raw):
+        value = super().__new__(cls, text)
+        value.raw = raw
+        return value
+
+    def __getnewargs__(self):
+        # Para que se pueda enviar a otro proceso (p. ej. el pool de firmas)
+        return (str(self), self.raw)
+
+
+class Field:
+    """
+    A value received by an endpoint: how it is parsed and the error reported if it
+    is not valid.
+
+    Args:
+        parse (callable): Returns the typed value, raising ValueError if not valid.
+        message (str): Error message when the value is not valid.
+        missing (str): Error message when the value is absent; `message` if None.
+        missing_status (int): Status code when the value is absent.
+        check (callable): Optional check of the typed value, run before the next
+            field is parsed (e.g. that a call exists); raises `ValidationError`.
+    """
+
+    def __init__(self, parse, message, missing=None, missing_status=400, check=None):
+        self.parse = parse
+        self.message = message
+        self.missing = missing or message
+        self.missing_status = missing_status
+        self.check = check
+
+    def load(self, value):
+        """
+        Parse a value.
+
+        Args:
+            value: The value received, or None if it is absent.
+
+        Returns:
+            The typed value.
+
+        Raises:
+            ValidationError: If the value is absent or not valid.
+        """
+        if value is None:
+            raise ValidationError(self.missing, self.missing_status)
+        try:
+            typed = self.parse(value)
+        except (TypeError, ValueError):
+            raise ValidationError(self.message) from None
+        if self.check is not None:
+            self.check(typed)
+        return typed
+
+
+def parse_fields(fields, values):
+    """
+    Parse several values, in the order the fields are declared.
+
+    Args:
+        fields (dict): The `Field` of each name.
+        values (dict): The values received, by name.
+
+    Returns:
+        dict: The typed value of each field.
+
+    Raises:
+        ValidationError: For the first value that is absent or not valid.
+    """
+    return {name: field.load(values.get(name)) for name, field in fields.items()}
+
+
+def _parse_hex(value, size):
+    if not isinstance(value, str) or len(value) != 2 + 2 * size or value[:2] != "0x":
+        raise ValueError(value)
+    # bytes.fromhex valida y decodifica en C; el largo descarta los espacios que acepta
+    raw = bytes.fromhex(value[2:])
+    if len(raw) != size:
+        raise ValueError(value)
+    return HexValue(value, raw)
+
+
+# Las mismas direcciones se repiten en muchas peticiones y el checksum es un keccak
+_checksum = lru_cache(maxsize=4096)(to_checksum_address)
+
+
+def parse_address(value):
+    """
+    Parse an Ethereum address.
+
+    Args:
+        value (str): The address, in any case.
+
+    Returns:
+        str: The checksummed address.
+
+    Raises:
+        ValueError: If the value is not a 20 bytes hex address.
+    """
+    if not isinstance(value, str) or _ADDRESS.fullmatch(value) is None:
+        raise ValueError(value)
+    return _checksum(value.lower())
+
+
+def parse_bytes32(value):
+    """
+    Parse a 32 bytes hex value, like a call ID, a proposal or a transaction hash.
+
+    Args:
+        value (str): The `0x` prefixed hex string.
+
+    Returns:
+        HexValue: The value, with its 32 decoded bytes in `raw`.
+
+    Raises:
+        ValueError: If the value is not 32 bytes of hex.
+    """
+    return _parse_hex(value, 32)
+
+
+def parse_signature(value):
+    """
+    Parse a hex encoded 65-byte signature.
+
+    Args:
+        value (str): The `0x` prefixed hex string.
+
+    Returns:
+        HexValue: The signature, with its 65 decoded bytes in `raw`.
+
+    Raises:
+        ValueError: If the value is not 65 bytes of hex.
+    """
+    return _parse_hex(value, 65)
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 date and time.
+
+    Args:
+        value (str): The ISO formatted date.
+
+    Returns:
+        datetime: The parsed date.
+
+    Raises:
+        ValueError: If the value is not an ISO formatted date.
+    """
+    if not isinstance(value, str):
+        raise ValueError(value)
+    return datetime.fromisoformat(value)
+
+
+def parse_proposal_batch(value):
+    """
+    Check that a batch of proposals is a list of 1 to `MAX_BATCH_PROPOSALS` items.
+
+    The items are validated one by one by the handler, which reports each invalid one
+    instead of rejecting the whole batch.
+    """
+    if not isinstance(value, list) or not value or len(value) > MAX_BATCH_PROPOSALS:
+        raise ValueError(value)
+    return value
+
+
+def parse_listing_query(args):
+    """
+    Parse the query string of the `/calls` listing.
+
+    Args:
+        args (Mapping): The query parameters of the request.
+
+    Returns:
+        ListingQuery: The expanded fields, the creator (or None), the page and
+        whether the listing is paginated.
+
+    Raises:
+        ValidationError: If any parameter is not valid.
+    """
+    expand = frozenset(filter(None, args.get("expand", "").split(",")))
+    if not expand <= EXPANDABLE_FIELDS:
+        raise ValidationError(messages.INVALID_EXPAND)
+
+    paginated = any(arg in args for arg in ("creator", "offset", "limit"))
+    creator = args.get("creator")
+    if creator is not None:
+        try:
+            creator = parse_address(creator)
+        except ValueError as error:
+            raise ValidationError(messages.INVALID_ADDRESS) from error
+
+    offset = args.get("offset", "0")
+    limit = args.get("limit", str(DEFAULT_PAGE_SIZE))
+    if not (offset.isdigit() and limit.isdigit()) or not (
+        0 < int(limit) <= MAX_PAGE_SIZE
+    ):
+        raise ValidationError(messages.INVALID_PAGE)
+    return ListingQuery(expand, creator, int(offset), int(limit), paginated)
+
+
+def does_exist(element):
+    """
+    Check if the given element exists.
+
+    Parameters:
+    element (str): The element to check.
+
+    Returns:
+    bool: True if the element exists, False otherwise.
+    """
+    return element != "0x0000000000000000000000000000000000000000"
+
+
+def is_valid_mimetype(mimetype):
+    """
+    Check if the given mimetype is valid.
+
+    Args:
+        mimetype (str): The mimetype to check.
+
+    Returns:
+        bool: True if the mimetype is "application/json", False otherwise.
+    """
+    return mimetype == "application/json"
+
+
+def is_valid_address(address):
+    """
+    Check if the given address is a valid Ethereum address.
+
+    Args:
+        address (str): The address to be checked.
+
+    Returns:
+        bool: True if the address is valid, False otherwise.
+    """
+    return isinstance(address, str) and _ADDRESS.fullmatch(address) is not None
+
+
+def is_valid_call_id(call_id):
+    """
+    Check if a given call ID is valid.
+
+    Parameters:
+    - call_id (str): The call ID to be validated.
+
+    Returns:
+    - bool: True if the call ID is valid, False otherwise.
+    """
+    try:
+        parse_bytes32(call_id)
+    except ValueError:
+        return False
+    return True
+
+
+def is_valid_signature(signature):
+    """
+    Check if the given signature is a valid hex encoded 65-byte signature.
+
+    Args:
+        signature (str): The signature to be checked.
+
+    Returns:
+        bool: True if the signature is valid, False otherwise.
+    """
+    try:
+        parse_signature(signature)
+    except ValueError:
+        return False
+    return True
+
+
+def is_valid_mnemonic(mnemonic_value):
+    """
+    Checks if a given mnemonic is valid.
+
+    Args:
+        mnemonic_value (str): The mnemonic to be checked.
+
+    Returns:
+        bool: True if the mnemonic is valid (contains exactly 12 words), False otherwise.
+    """
+    return len(mnemonic_value.split()) == 12
@@ -99,6 +99,10 @@ contract CFP {
     }
 
     function _registerProposal(bytes32 proposal, address sender) private proposalNotRegistered(proposal) isOpen() {
+        _storeProposal(proposal, sender);
+    }
+
+    function _storeProposal(bytes32 proposal, address sender) private {
         // Genero una nueva propuesta en base a la propuesta que me envian
         ProposalData memory newProposal = ProposalData({
             sender: sender,
@@ -122,6 +126,22 @@ contract CFP {
         _registerProposal(proposal, msg.sender);
     }
 
+    /** Permite registrar varias propuestas en una sola transacción.
+     *  Registra al emisor del mensaje como emisor de todas las propuestas.
+     *  Las propuestas que ya han sido registradas se ignoran, de modo que una
+     *  propuesta repetida no revierte el lote completo.
+     *  Si el timestamp del bloque actual es mayor que el del cierre del llamado,
+     *  revierte con el error "Convocatoria cerrada"
+     *  Emite el evento `ProposalRegistered` por cada propuesta registrada
+     */
+    function registerProposals(bytes32[] calldata _proposals) public isOpen() {
+        for (uint i = 0; i < _proposals.length; i++) {
+            if (proposalTimestamp(_proposals[i]) == 0) {
+                _storeProposal(_proposals[i], msg.sender);
+            }
+        }
+    }
+
     /** Permite registrar una propuesta especificando un emisor.
      *  Sólo puede ser ejecutada por el creador del llamado. Si no es así, revierte
      *  con el mensaje "Solo el creador puede hacer esta llamada"
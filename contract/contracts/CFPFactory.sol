@@ -241,4 +241,50 @@ contract CFPFactory {
     function callsList() public view returns (CallForProposals[] memory) {
         return CFPList;
     }
+
+    // Devuelve la cantidad de llamados creados
+    function callsCount() public view returns (uint256) {
+        return CFPList.length;
+    }
+
+    /** Devuelve hasta `limit` llamados a partir de la posición `offset` de la lista de llamados creados.
+     *  Permite a la API paginar el listado sin leer la lista completa.
+     */
+    function callsPage(
+        uint256 offset,
+        uint256 limit
+    ) public view returns (CallForProposals[] memory page) {
+        uint256 end = pageEnd(offset, limit, CFPList.length);
+        page = new CallForProposals[](end - offset);
+        for (uint i = offset; i < end; i++) {
+            page[i - offset] = CFPList[i];
+        }
+    }
+
+    /** Devuelve hasta `limit` llamados creados por `creator`, a partir de la posición `offset`
+     *  de su lista de llamados.
+     */
+    function createdByPage(
+        address creator,
+        uint256 offset,
+        uint256 limit
+    ) public view returns (CallForProposals[] memory page) {
+        bytes32[] storage callIds = CFPMapping[creator];
+        uint256 end = pageEnd(offset, limit, callIds.length);
+        page = new CallForProposals[](end - offset);
+        for (uint i = offset; i < end; i++) {
+            page[i - offset] = callsMapping[callIds[i]];
+        }
+    }
+
+    // Devuelve el final (exclusivo) de una página, acotado a la longitud de la lista
+    function pageEnd(uint256 offset, uint256 limit, uint256 length) private pure returns (uint256) {
+        if (offset >= length) {
+            return offset;
+        }
+        if (limit > length - offset) {
+            return length;
+        }
+        return offset + limit;
+    }
 }
@@ -0,0 +1,33 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.19;
+
+// Agrupa varias llamadas de solo lectura en una sola, para que la API pueda
+// resolverlas con un unico eth_call
+contract Multicall {
+    // Llamada a realizar: contrato destino y datos ABI-codificados
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    // Resultado de una llamada
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    /** Ejecuta todas las llamadas y devuelve sus resultados junto con el bloque actual.
+     *  Si una llamada revierte no se revierte el conjunto: su resultado se devuelve
+     *  con `success` en falso.
+     */
+    function tryAggregate(
+        Call[] memory calls
+    ) public view returns (uint256 blockNumber, Result[] memory results) {
+        blockNumber = block.number;
+        results = new Result[](calls.length);
+        for (uint i = 0; i < calls.length; i++) {
+            (bool success, bytes memory returnData) = calls[i].target.staticcall(calls[i].callData);
+            results[i] = Result(success, returnData);
+        }
+    }
+}
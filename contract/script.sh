@@ -6,3 +6,6 @@ rm -R build
 # Desplegar usando truffle
 truffle deploy
 
+
+# Generar el paquete compacto de ABI que lee el servidor
+(cd ../backend && python abibundle.py)
@@ -162,6 +162,27 @@ contract('Call for Proposals', (accounts) => {
             assert.equal(blockNumber, eventLog.args.blockNumber, "Evento con número de bloque incorrecto");
             assert.equal(accounts[1], eventLog.args.sender, "Evento con número de votantes incorrecto");
         });
+        it('debe permitir registrar varias propuestas con registerProposals', async () => {
+            let batch = [gen.next(), gen.next(), gen.next()];
+            let tx = await cfp.registerProposals(batch, { from: accounts[2] });
+            let events = tx.logs.filter(log => log.event == "ProposalRegistered");
+            assert.equal(batch.length, events.length, "Cantidad de eventos incorrecta");
+            for (let i = 0; i < batch.length; i++) {
+                assert.equal(batch[i], events[i].args.proposal, "Evento con propuesta incorrecta");
+                let proposalData = await cfp.proposalData(batch[i]);
+                assert.equal(accounts[2], proposalData.sender);
+                assert.equal(tx.receipt.blockNumber, proposalData.blockNumber);
+            }
+        });
+        it('debe ignorar las propuestas ya registradas en registerProposals', async () => {
+            let proposal = gen.next();
+            let count = await cfp.proposalCount();
+            let tx = await cfp.registerProposals([proposals[0], proposal, proposal]);
+            let events = tx.logs.filter(log => log.event == "ProposalRegistered");
+            assert.equal(1, events.length, "Cantidad de eventos incorrecta");
+            assert.equal(proposal, events[0].args.proposal);
+            assert.equal(count.toNumber() + 1, (await cfp.proposalCount()).toNumber());
+        });
         it('debe devolver información correcta para una propuesta no registrada', async () => {
             let proposal = gen.next();
             let proposalData = await cfp.proposalData(proposal);
@@ -181,6 +202,9 @@ contract('Call for Proposals', (accounts) => {
             await verifyThrows(async () => {
                 await cfp.registerProposal(gen.next());
             }, "Convocatoria cerrada")
+            await verifyThrows(async () => {
+                await cfp.registerProposals([gen.next()]);
+            }, "Convocatoria cerrada")
         })
 
     });
@@ -177,6 +177,27 @@ contract('CFP Factory', (accounts) => {
                 assert.equal(callIds[accounts.length + i], await factory.createdBy(accounts[i], 1));
             }
         });
+        it('debe devolver la cantidad total de llamados', async () => {
+            assert.equal(callIds.length, await factory.callsCount());
+        });
+        it('debe paginar correctamente la lista de llamados', async () => {
+            let page = await factory.callsPage(1, 3);
+            assert.equal(3, page.length);
+            for (let i = 0; i < page.length; i++) {
+                assert.equal(callIds[i + 1], page[i].callId);
+            }
+            page = await factory.callsPage(callIds.length - 1, 10);
+            assert.equal(1, page.length);
+            assert.equal(0, (await factory.callsPage(callIds.length, 10)).length);
+        });
+        it('debe paginar correctamente los llamados de cada creador', async () => {
+            for (let i = 0; i < accounts.length; i++) {
+                let page = await factory.createdByPage(accounts[i], 1, 10);
+                assert.equal(1, page.length);
+                assert.equal(callIds[accounts.length + i], page[0].callId);
+                assert.equal(accounts[i], page[0].creator);
+            }
+        });
         it('debe devolver el creador correcto para cada llamado', async () => {
             for (let i = 0; i < callIds.length; i++) {
                 let cfp = await factory.calls(callIds[i]);
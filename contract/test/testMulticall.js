@@ -0,0 +1,38 @@
+const Multicall = artifacts.require("Multicall");
+const CFP = artifacts.require("CFP");
+
+const shared = require("./shared")
+
+const now = shared.now;
+const gen = new shared.HashGenerator();
+
+contract('Multicall', (accounts) => {
+    var multicall;
+    var cfp;
+    var closingTime;
+    before(async function () {
+        multicall = await Multicall.new();
+        closingTime = now() + 3600;
+        cfp = await CFP.new(gen.next(), closingTime, accounts[0], accounts[0]);
+        await cfp.registerProposal(gen.next());
+    });
+    it("debe devolver el resultado de cada llamada", async () => {
+        let calls = [
+            { target: cfp.address, callData: cfp.contract.methods.closingTime().encodeABI() },
+            { target: cfp.address, callData: cfp.contract.methods.proposalCount().encodeABI() },
+        ];
+        let result = await multicall.tryAggregate(calls);
+        assert.equal(2, result.results.length);
+        assert.equal(closingTime, web3.eth.abi.decodeParameter("uint256", result.results[0].returnData));
+        assert.equal(1, web3.eth.abi.decodeParameter("uint256", result.results[1].returnData));
+    });
+    it("no debe revertir si una llamada falla", async () => {
+        let calls = [
+            { target: cfp.address, callData: cfp.contract.methods.proposals(5).encodeABI() },
+            { target: cfp.address, callData: cfp.contract.methods.proposalCount().encodeABI() },
+        ];
+        let result = await multicall.tryAggregate(calls);
+        assert.equal(false, result.results[0].success);
+        assert.equal(true, result.results[1].success);
+    });
+});